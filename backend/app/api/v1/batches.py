@@ -0,0 +1,158 @@
+import os
+from typing import List
+
+from fastapi import APIRouter, UploadFile, File, HTTPException
+
+from app.print_logging import log
+
+from app.schemas.batch import (
+    BatchItemStatus,
+    BatchProcessRequest,
+    BatchStatusResponse,
+    BatchUploadResponse,
+)
+from app.schemas.process import ProcessRouteRequest
+
+from app.core.storage import ROUTES, BATCHES, create_batch, create_route, route_progress
+from app.core.image_loader import save_image
+from app.core.jobs import check_process_request, queue_route_job, start_batch_jobs
+
+router = APIRouter()
+
+MAX_BATCH_FILES = int(os.getenv("MAX_BATCH_FILES", "100"))
+
+
+@router.post("/upload", response_model=BatchUploadResponse)
+async def upload_batch(files: List[UploadFile] = File(...)):
+    log(f"upload_batch called files={len(files)}")
+    if len(files) > MAX_BATCH_FILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_BATCH_FILES} images per batch"
+        )
+
+    # A bad image fails its own item, not the whole batch
+    items = []
+    for file in files:
+        route_id = create_route()
+        try:
+            saved = await save_image(file, route_id)
+        except HTTPException as e:
+            ROUTES.pop(route_id, None)
+            items.append({"filename": file.filename, "route_id": None, "error": e.detail})
+            continue
+
+        ROUTES[route_id].update({
+            "image_path": saved.path,
+            "image_bytes": saved.data,
+            "image_hash": saved.sha256,
+            "status": "uploaded"
+        })
+        items.append({"filename": file.filename, "route_id": route_id, "error": None})
+
+    batch_id = create_batch(items)
+    return BatchUploadResponse(batch_id=batch_id, status="uploaded", items=_item_statuses(items))
+
+
+@router.post("/{batch_id}/process", response_model=BatchStatusResponse)
+async def process_batch(batch_id: str, payload: BatchProcessRequest):
+    log(f"process_batch called batch_id={batch_id}")
+    batch = BATCHES.get(batch_id)
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    route_ids = [item["route_id"] for item in batch["items"] if item["route_id"]]
+    overrides = {item.route_id: item for item in payload.items}
+    unknown = set(overrides) - set(route_ids)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Routes not in this batch: {', '.join(sorted(unknown))}"
+        )
+
+    # Validate every item before queueing any of them
+    shared = payload.model_dump(exclude={"items"})
+    requests = {}
+    for route_id in route_ids:
+        override = overrides.get(route_id)
+        options = shared if override is None else {
+            **shared, **override.model_dump(exclude={"route_id"}, exclude_none=True)
+        }
+        request = ProcessRouteRequest.model_validate(options)
+        try:
+            check_process_request(request)
+        except HTTPException as e:
+            raise HTTPException(status_code=400, detail=f"{route_id}: {e.detail}")
+        requests[route_id] = request
+
+    jobs = []
+    for route_id, request in requests.items():
+        job_id, job_args = queue_route_job(route_id, request)
+        jobs.append((route_id, job_id, job_args))
+
+    batch["status"] = "processing"
+    start_batch_jobs(batch_id, jobs)
+
+    return _batch_status(batch_id, batch)
+
+
+@router.get("/{batch_id}", response_model=BatchStatusResponse)
+async def get_batch_status(batch_id: str):
+    batch = BATCHES.get(batch_id)
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return _batch_status(batch_id, batch)
+
+
+# -------------------------
+# Helpers
+# -------------------------
+
+def _item_statuses(items: List[dict]) -> List[BatchItemStatus]:
+    statuses = []
+    for item in items:
+        route = ROUTES.get(item["route_id"]) if item["route_id"] else None
+        if route is None:
+            statuses.append(BatchItemStatus(
+                filename=item["filename"],
+                route_id=item["route_id"],
+                status="rejected",
+                message=item["error"] or "Route not found"
+            ))
+            continue
+
+        progress, message = route_progress(route)
+        statuses.append(BatchItemStatus(
+            filename=item["filename"],
+            route_id=item["route_id"],
+            status=route["status"],
+            progress=progress,
+            message=message
+        ))
+    return statuses
+
+
+def _batch_status(batch_id: str, batch: dict) -> BatchStatusResponse:
+    items = _item_statuses(batch["items"])
+    completed = sum(item.status == "completed" for item in items)
+    failed = sum(item.status in ("failed", "rejected") for item in items)
+
+    if batch["status"] == "uploaded":
+        status = "uploaded"
+    elif completed + failed < len(items):
+        status = "processing"
+    elif failed == 0:
+        status = "completed"
+    elif completed == 0:
+        status = "failed"
+    else:
+        status = "partial"
+
+    return BatchStatusResponse(
+        batch_id=batch_id,
+        status=status,
+        total=len(items),
+        completed=completed,
+        failed=failed,
+        items=items
+    )
@@ -0,0 +1,85 @@
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+
+from app.print_logging import log
+from app.core.storage import ROUTES
+from app.core.route_geometry import DEFAULT_RESOLUTION
+from app.core.exporters import (
+    EXPORT_CACHE,
+    EXPORT_MEDIA_TYPES,
+    export_chunks,
+    export_etag,
+    iter_bytes,
+)
+
+router = APIRouter()
+
+
+@router.get("/{route_id}.{fmt}")
+def download_route(
+    route_id: str,
+    fmt: str,
+    resolution: str = Query(
+        DEFAULT_RESOLUTION, pattern="^(full|simplified)$",
+        description="Polyline to serve: \"simplified\" (default) or \"full\" resolution",
+    ),
+    gzip: Optional[bool] = Query(None),
+    accept_encoding: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+):
+    if fmt not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=404, detail=f"Unknown export format: {fmt}")
+
+    route = ROUTES.get(route_id)
+    geometry = route.get("geometry") if route else None
+    if not geometry:
+        raise HTTPException(status_code=404, detail="Route not ready")
+
+    # gzip unless the client opts out or does not accept it
+    compress = _accepts_gzip(accept_encoding) if gzip is None else gzip
+
+    points = geometry.geo_points(resolution)
+    etag = export_etag(fmt, points, route_id, gzip=compress)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+
+    if _etag_matches(if_none_match, etag):
+        log(f"download_route route_id={route_id} fmt={fmt} not modified")
+        return Response(status_code=304, headers=headers)
+
+    headers["Content-Disposition"] = f'attachment; filename="{route_id}.{fmt}"'
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+
+    body = EXPORT_CACHE.get(etag)
+    if body is not None:
+        headers["Content-Length"] = str(len(body))
+        chunks = iter_bytes(body)
+    else:
+        log(f"download_route route_id={route_id} fmt={fmt} generating points={len(points)}")
+        chunks = EXPORT_CACHE.stream(etag, export_chunks(fmt, points, route_id, gzip=compress))
+
+    return StreamingResponse(chunks, media_type=EXPORT_MEDIA_TYPES[fmt], headers=headers)
+
+
+def _accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    for coding in (accept_encoding or "").split(","):
+        name, _, params = coding.strip().partition(";")
+        if name.strip().lower() in ("gzip", "*"):
+            return params.replace(" ", "").lower() not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses weak comparison: W/ prefixes are ignored."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = (tag.strip() for tag in if_none_match.split(","))
+    return etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
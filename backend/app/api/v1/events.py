@@ -0,0 +1,73 @@
+import json
+
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+
+from app.core.job_events import job_updates
+from app.core.storage import ROUTES, TERMINAL_JOB_STATES
+from app.print_logging import log
+
+router = APIRouter()
+
+# Pushed job progress, instead of polling /status. Every message is the
+# job snapshot {job_id, route_id, status, stage, progress, error} tagged
+# with an event name: "progress" until the job ends, then "completed" or
+# "failed", after which the server closes the stream.
+
+
+def _event_name(snapshot: dict) -> str:
+    return snapshot["status"] if snapshot["status"] in TERMINAL_JOB_STATES else "progress"
+
+
+def _route_job(route_id: str) -> str:
+    route = ROUTES.get(route_id)
+    if not route:
+        raise HTTPException(status_code=404, detail="Route not found")
+    if not route.get("job_id"):
+        raise HTTPException(status_code=409, detail="Route has not been processed")
+    return route["job_id"]
+
+
+@router.get("/{route_id}/events")
+async def stream_route_events(route_id: str):
+    """Server-Sent Events stream of the route's current job."""
+    job_id = _route_job(route_id)
+    log(f"progress stream opened route_id={route_id} job_id={job_id}", level="debug")
+
+    async def events():
+        async for snapshot in job_updates(job_id):
+            if snapshot is None:
+                yield b": keep-alive\n\n"
+            else:
+                yield f"event: {_event_name(snapshot)}\ndata: {json.dumps(snapshot)}\n\n".encode()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # nginx buffers proxied responses by default
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
+@router.websocket("/{route_id}/ws")
+async def route_events_socket(websocket: WebSocket, route_id: str):
+    """WebSocket variant of /events: one JSON message per update."""
+    try:
+        job_id = _route_job(route_id)
+    except HTTPException as e:
+        await websocket.close(code=4000 + e.status_code, reason=e.detail)
+        return
+
+    await websocket.accept()
+    try:
+        async for snapshot in job_updates(job_id):
+            if snapshot is None:
+                await websocket.send_json({"event": "heartbeat"})
+            else:
+                await websocket.send_json({"event": _event_name(snapshot), **snapshot})
+    except WebSocketDisconnect:
+        return
+    await websocket.close()
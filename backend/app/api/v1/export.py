@@ -2,6 +2,7 @@ from fastapi import APIRouter, Query, HTTPException
 from app.print_logging import log
 from app.schemas.export import ExportRouteResponse
 from app.core.storage import ROUTES
+from app.core.exporters import EXPORT_MEDIA_TYPES, google_maps_url
 
 router = APIRouter()
 
@@ -9,23 +10,23 @@ router = APIRouter()
 @router.get("/{route_id}/export", response_model=ExportRouteResponse)
 async def export_route(
     route_id: str,
-    format: str = Query(..., pattern="^(gpx|google_maps|polyline)$")
+    format: str = Query(..., pattern="^(gpx|geojson|tcx|google_maps|polyline)$")
 ):
     log(f"export_route called route_id={route_id} format={format}")
     route = ROUTES.get(route_id)
-    if not route or not route["polyline"]:
+    if not route or not route.get("geometry"):
         raise HTTPException(status_code=404, detail="Route not ready")
 
     if format == "google_maps":
         return ExportRouteResponse(
             type="google_maps",
-            url="https://www.google.com/maps/dir/?api=1"
+            url=google_maps_url(route["geometry"].geo)
         )
 
-    if format == "gpx":
+    if format in EXPORT_MEDIA_TYPES:
         return ExportRouteResponse(
-            type="gpx",
-            download_url=f"/downloads/{route_id}.gpx"
+            type=format,
+            download_url=f"/downloads/{route_id}.{format}"
         )
 
     return ExportRouteResponse(type="polyline")
@@ -1,10 +1,26 @@
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
 from app.print_logging import log
+from app.core.result_cache import RESULT_CACHE
+from app.core.exporters import EXPORT_CACHE
+from app.core.warmup import WARMUP_STATE, is_ready
 
 router = APIRouter()
 
 
 @router.get("/health")
 def health_check():
-    log("health_check called")
+    """Liveness: the process is up and serving."""
+    log("health_check called", level="debug")
     return {"status": "ok"}
+
+
+@router.get("/ready")
+def readiness_check():
+    """Readiness: 503 until the worker pool has been warmed up."""
+    return JSONResponse(WARMUP_STATE, status_code=200 if is_ready() else 503)
+
+
+@router.get("/cache/stats")
+def cache_stats():
+    return {**RESULT_CACHE.stats(), "exports": EXPORT_CACHE.stats()}
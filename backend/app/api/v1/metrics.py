@@ -0,0 +1,57 @@
+import sys
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.core.exporters import EXPORT_CACHE
+from app.core.job_events import subscriber_count
+from app.core.metrics import REGISTRY
+from app.core.result_cache import RESULT_CACHE
+from app.core.storage import JOBS, TERMINAL_JOB_STATES
+from app.print_logging import dropped_log_count
+
+router = APIRouter()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _road_stat(name: str):
+    # The provider (and its module, which pulls in httpx) is loaded on
+    # first use; report nothing until then
+    road_provider = sys.modules.get("app.matching.road_provider")
+    provider = road_provider and road_provider._provider
+    return getattr(provider, name) if provider is not None else None
+
+
+# Caches keep their own counters; read them at scrape time
+REGISTRY.callback("result_cache_hits_total", "Pipeline result cache hits (memory or disk)",
+                  lambda: RESULT_CACHE.hits, kind="counter")
+REGISTRY.callback("result_cache_disk_hits_total", "Pipeline result cache hits served from disk",
+                  lambda: RESULT_CACHE.disk_hits, kind="counter")
+REGISTRY.callback("result_cache_misses_total", "Pipeline result cache misses",
+                  lambda: RESULT_CACHE.misses, kind="counter")
+REGISTRY.callback("export_cache_hits_total", "Export bodies served from cache",
+                  lambda: EXPORT_CACHE.hits, kind="counter")
+REGISTRY.callback("export_cache_misses_total", "Exports generated",
+                  lambda: EXPORT_CACHE.misses, kind="counter")
+REGISTRY.callback("export_cache_bytes", "Bytes held by the export cache",
+                  lambda: EXPORT_CACHE.stats()["bytes"])
+REGISTRY.callback("result_cache_memory_entries", "Pipeline results held in memory",
+                  lambda: RESULT_CACHE.stats()["memory_entries"])
+REGISTRY.callback("road_tile_memory_hits_total", "Road tiles served from memory",
+                  lambda: _road_stat("memory_hits"), kind="counter")
+REGISTRY.callback("road_tile_disk_hits_total", "Road tiles loaded from the disk cache",
+                  lambda: _road_stat("disk_hits"), kind="counter")
+REGISTRY.callback("road_tile_fetches_total", "Road tiles fetched from the backend",
+                  lambda: _road_stat("fetches"), kind="counter")
+REGISTRY.callback("job_progress_subscribers", "Open SSE/WebSocket progress subscriptions",
+                  subscriber_count)
+REGISTRY.callback("log_records_dropped_total", "Log records dropped because the log queue was full",
+                  dropped_log_count, kind="counter")
+REGISTRY.callback("route_jobs_in_progress", "Route jobs queued or running",
+                  lambda: sum(job["status"] not in TERMINAL_JOB_STATES for job in list(JOBS.values())))
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type=PROMETHEUS_CONTENT_TYPE)
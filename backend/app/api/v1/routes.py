@@ -1,20 +1,22 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
+import asyncio
+import json
+from pathlib import Path
+
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query, Response
+from fastapi.responses import FileResponse
 
 from app.print_logging import log
 
 from app.schemas.upload import UploadResponse
 from app.schemas.process import ProcessRouteRequest, ProcessRouteResponse
 from app.schemas.status import RouteStatusResponse
-from app.schemas.route import RoutePreviewResponse, Polyline, ImageSpacePolyline
+from app.schemas.route import RoutePreviewResponse, Polyline, ImageSpacePolyline, DebugArtifactsResponse
 from app.schemas.refine import RefineRouteRequest, RefineRouteResponse
-from app.schemas.common import LatLng
 
-from app.core.storage import ROUTES, JOBS, create_route, create_job
+from app.core.storage import ROUTES, create_route, route_progress
+from app.core.route_geometry import DEFAULT_RESOLUTION
 from app.core.image_loader import save_image
-from app.core.geo_utils import expand_bbox, normalize_bbox
-from app.core.route_extractor import extract_image_space_polyline
-from app.matching.pixel_to_geo import pixel_polyline_to_geo
-from app.core.polyline_utils import encode_polyline, tuples_to_latlng
+from app.core.jobs import check_process_request, queue_route_job, start_route_job
 
 router = APIRouter()
 
@@ -23,10 +25,18 @@ router = APIRouter()
 async def upload_route_image(file: UploadFile = File(...)):
     log("upload_route_image called")
     route_id = create_route()
-    image_path = await save_image(file, route_id)
+    try:
+        saved = await save_image(file, route_id)
+    except HTTPException:
+        ROUTES.pop(route_id, None)
+        raise
 
-    ROUTES[route_id]["image_path"] = image_path
-    ROUTES[route_id]["status"] = "uploaded"
+    ROUTES[route_id].update({
+        "image_path": saved.path,
+        "image_bytes": saved.data,
+        "image_hash": saved.sha256,
+        "status": "uploaded"
+    })
 
     return UploadResponse(route_id=route_id, status="uploaded")
 
@@ -38,98 +48,114 @@ async def process_route(route_id: str, payload: ProcessRouteRequest):
     if not route:
         raise HTTPException(status_code=404, detail="Route not found")
 
-    if not payload.search_scope:
-        raise HTTPException(
-            status_code=400,
-            detail="search_scope (bounding box) is required"
-        )
+    check_process_request(payload)
+    job_id, job_args = queue_route_job(route_id, payload)
 
-    job_id = create_job(route_id)
-
-    
-    raw_bbox = expand_bbox(
-        payload.search_scope.bbox.model_dump(),
-        payload.search_scope.padding_meters
-    )
-
-    expanded_bbox = normalize_bbox(raw_bbox)
-
-    ROUTES[route_id]["search_scope"] = expanded_bbox
-    ROUTES[route_id]["status"] = "processing"
-
-    # --- CV PIPELINE ---
-    image_polyline, image_size = extract_image_space_polyline(
-        route["image_path"]
-    )
-
-
-    geo_polyline_raw = pixel_polyline_to_geo(image_polyline, image_size, expanded_bbox)
-
-    geo_polyline = [LatLng(lat=lat, lng=lng) for lat, lng in geo_polyline_raw]  # Convert tuples to LatLng
-
-    ROUTES[route_id].update({
-        "image_polyline": image_polyline,
-        "polyline": geo_polyline,
-        "encoded_polyline": encode_polyline([(p.lat, p.lng) for p in geo_polyline]),
-        "confidence": 0.85,
-        "status": "completed"
-    })
-
-    JOBS[job_id].update({
-        "status": "completed",
-        "progress": 1.0
-    })
+    # --- CV PIPELINE (runs on the worker pool) ---
+    start_route_job(route_id, job_id, **job_args)
 
     return ProcessRouteResponse(
         route_id=route_id,
         job_id=job_id,
-        status="completed"
+        status="processing"
     )
 
 
 @router.get("/{route_id}/status", response_model=RouteStatusResponse)
 async def get_route_status(route_id: str):
-    log(f"get_route_status called route_id={route_id}")
+    log(f"get_route_status called route_id={route_id}", level="debug")
     route = ROUTES.get(route_id)
     if not route:
         raise HTTPException(status_code=404, detail="Route not found")
 
-    progress = 1.0 if route["status"] == "completed" else 0.3
+    progress, message = route_progress(route)
 
     return RouteStatusResponse(
         route_id=route_id,
         status=route["status"],
-        progress=progress
+        progress=progress,
+        message=message
     )
 
 
 @router.get("/{route_id}/preview", response_model=RoutePreviewResponse)
-async def get_route_preview(route_id: str):
-    log(f"get_route_preview called route_id={route_id}")
+async def get_route_preview(
+    route_id: str,
+    resolution: str = Query(
+        DEFAULT_RESOLUTION, pattern="^(full|simplified)$",
+        description="Polyline to serve: \"simplified\" (default) or \"full\" resolution",
+    )
+):
+    log(f"get_route_preview called route_id={route_id} resolution={resolution}")
     route = ROUTES.get(route_id)
     if not route or route["status"] != "completed":
         raise HTTPException(status_code=404, detail="Route not ready")
-    geo_points = [LatLng(lat=pt[1], lng=pt[3]) if isinstance(pt, tuple) else pt for pt in route["polyline"]]
 
-    return RoutePreviewResponse(
-        route_id=route_id,
-        confidence=route["confidence"],
-        polyline={
-            "geo": geo_points,
-            "encoded": route.get("encoded_polyline")
-        },
-        polyline_image_space={
-            "points": route.get("image_polyline", [])
-        }
+    # Written straight from the route's arrays instead of building a
+    # RoutePreviewResponse per point; the model still documents the shape
+    geometry = route["geometry"]
+    body = (
+        f'{{"route_id":{json.dumps(route_id)},"confidence":{json.dumps(route["confidence"])},'
+        f'"polyline":{{"geo":{geometry.geo_json(resolution)},'
+        f'"encoded":{json.dumps(geometry.encoded_at(resolution))}}},'
+        f'"polyline_image_space":{{"points":{geometry.pixels_json(resolution)}}},'
+        f'"resolution":{json.dumps(resolution)},"stats":{json.dumps(route.get("stats"))}}}'
     )
+    return Response(content=body, media_type="application/json")
 
 
+@router.get("/{route_id}/debug", response_model=DebugArtifactsResponse)
+async def list_debug_artifacts(route_id: str):
+    log(f"list_debug_artifacts called route_id={route_id}")
+    route = ROUTES.get(route_id)
+    if not route:
+        raise HTTPException(status_code=404, detail="Route not found")
+
+    artifacts = {}
+    if route.get("debug_dir"):
+        # In-progress writes end in .png.part and never match
+        for path in sorted(Path(route["debug_dir"]).glob("*.png")):
+            artifacts[path.stem] = f"/api/v1/routes/{route_id}/debug/{path.stem}"
+
+    return DebugArtifactsResponse(route_id=route_id, artifacts=artifacts)
+
+
+@router.get("/{route_id}/debug/{name}")
+async def get_debug_artifact(route_id: str, name: str):
+    log(f"get_debug_artifact called route_id={route_id} name={name}")
+    route = ROUTES.get(route_id)
+    if not route or not route.get("debug_dir"):
+        raise HTTPException(status_code=404, detail="No debug artifacts for route")
+
+    path = Path(route["debug_dir"]) / f"{Path(name).name}.png"
+    if not path.is_file():
+        raise HTTPException(status_code=404, detail="Artifact not found")
+
+    return FileResponse(path, media_type="image/png")
+
 
 @router.post("/{route_id}/refine", response_model=RefineRouteResponse)
 async def refine_route(route_id: str, payload: RefineRouteRequest):
-    log(f"refine_route called route_id={route_id}")
-    if route_id not in ROUTES:
+    log(f"refine_route called route_id={route_id} anchors={len(payload.anchor_points)}")
+    route = ROUTES.get(route_id)
+    if not route:
         raise HTTPException(status_code=404, detail="Route not found")
-
-    # Placeholder: refinement comes later
-    return RefineRouteResponse(status="refinement_not_enabled")
+    if route["status"] != "completed" or not route.get("intermediates"):
+        raise HTTPException(status_code=409, detail="Route has no processed result to refine")
+    if not payload.anchor_points:
+        raise HTTPException(status_code=400, detail="anchor_points is empty")
+
+    from app.core.refine import apply_anchors  # scipy; loaded by warm-up or first use
+
+    anchors = [(p.lat, p.lng) for p in payload.anchor_points]
+    try:
+        # Local recomputation only: milliseconds, but keep it off the loop
+        summary = await asyncio.to_thread(apply_anchors, route, anchors)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    log(
+        f"route refined route_id={route_id} points={summary['points_full']} "
+        + " ".join(f"{k}={v}ms" for k, v in summary["timings_ms"].items())
+    )
+    return RefineRouteResponse(route_id=route_id, status="refined", **summary)
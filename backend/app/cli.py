@@ -0,0 +1,280 @@
+"""
+Offline bulk conversion: route images -> GPX / GeoJSON, no API server.
+
+Run from backend/:
+    python -m app.cli IMAGES_DIR --bbox 12.97,12.95,77.65,77.63 -o out/
+    python -m app.cli manifest.csv -o out/ --formats gpx,geojson,tcx
+
+A manifest is a CSV with columns image,north,south,east,west and
+optionally projection and padding_meters; image paths are relative to
+the manifest. Results are written as they finish and recorded in
+OUT/summary.csv, so an interrupted run picks up where it stopped.
+"""
+import argparse
+import csv
+import multiprocessing as mp
+import os
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".gif", ".bmp", ".tif", ".tiff", ".webp"}
+
+# Summary columns for per-stage times, in pipeline order: the pipeline's
+# own stats["timings_ms"], plus the export, timed here.
+STAGES = ("segment", "cleanup", "components", "centerline", "ordering",
+          "simplify", "georeference", "encode", "write")
+
+SUMMARY_FIELDS = (
+    ["image", "status", "points", "points_simplified", "width", "height", "seconds"]
+    + [f"{stage}_ms" for stage in STAGES]
+    + ["outputs", "error"]
+)
+
+REPORT_EVERY_S = 5.0
+
+
+@dataclass
+class ConvertTask:
+    image: str          # path to the image
+    name: str           # output path relative to the output dir, no suffix
+    bbox: dict
+    georeference: dict
+
+
+# -------------------------
+# Inputs
+# -------------------------
+
+def parse_bbox(value: str) -> dict:
+    """"north,south,east,west" -> BoundingBox-style dict."""
+    parts = [float(v) for v in value.split(",")]
+    if len(parts) != 4:
+        raise argparse.ArgumentTypeError("bbox must be north,south,east,west")
+    return dict(zip(("north", "south", "east", "west"), parts))
+
+
+def _search_bbox(bbox: dict, padding_meters: int) -> dict:
+    from app.core.geo_utils import expand_bbox, normalize_bbox
+    return normalize_bbox(expand_bbox(bbox, padding_meters))
+
+
+def directory_tasks(root: Path, bbox: dict, padding: int, projection: str) -> Iterator[ConvertTask]:
+    search = _search_bbox(bbox, padding)
+    for path in sorted(root.rglob("*")):
+        if path.suffix.lower() in IMAGE_SUFFIXES and path.is_file():
+            yield ConvertTask(
+                image=str(path),
+                name=str(path.relative_to(root).with_suffix("")),
+                bbox=search,
+                georeference={"projection": projection},
+            )
+
+
+def manifest_tasks(manifest: Path, bbox: Optional[dict], padding: int, projection: str) -> Iterator[ConvertTask]:
+    with open(manifest, newline="", encoding="utf-8") as f:
+        for line, row in enumerate(csv.DictReader(f), start=2):
+            if row.get("north"):
+                row_bbox = {k: float(row[k]) for k in ("north", "south", "east", "west")}
+            elif bbox is not None:
+                row_bbox = bbox
+            else:
+                raise ValueError(f"{manifest}:{line}: no bbox and no --bbox default")
+
+            image = manifest.parent / row["image"]
+            yield ConvertTask(
+                image=str(image),
+                name=str(Path(row["image"]).with_suffix("")),
+                bbox=_search_bbox(row_bbox, int(row.get("padding_meters") or padding)),
+                georeference={"projection": row.get("projection") or projection},
+            )
+
+
+def read_summary(path: Path) -> Dict[str, dict]:
+    """Rows of an earlier run, by image path."""
+    if not path.exists():
+        return {}
+    with open(path, newline="", encoding="utf-8") as f:
+        return {row["image"]: row for row in csv.DictReader(f)}
+
+
+# -------------------------
+# Worker
+# -------------------------
+
+def _init_worker(quiet: bool) -> None:
+    # One process per core; OpenCV's own thread pool would oversubscribe
+    import cv2
+    cv2.setNumThreads(1)
+    if quiet:
+        from app.print_logging import set_log_level
+        set_log_level("warning")
+
+
+def convert_one(task: ConvertTask, out_dir: str, formats: List[str], config: dict, simplify: dict) -> dict:
+    """Runs the pipeline for one image and writes its exports. Never raises."""
+    from app.core.exporters import export_chunks
+    from app.core.route_extractor import run_route_pipeline
+
+    row = {"image": task.image, "status": "failed"}
+    start = time.perf_counter()
+    try:
+        result = run_route_pipeline(
+            task.image, task.bbox,
+            config=config, simplify=simplify, georeference=task.georeference,
+            progress=_no_progress
+        )
+        points = result["geometry"].geo
+        name = Path(task.name).name
+
+        write_start = time.perf_counter()
+        outputs = []
+        for fmt in formats:
+            path = Path(out_dir) / f"{task.name}.{fmt}"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(path.name + ".tmp")
+            with open(tmp, "wb") as f:
+                for chunk in export_chunks(fmt, points, name):
+                    f.write(chunk)
+            tmp.replace(path)
+            outputs.append(str(path.relative_to(out_dir)))
+
+        write_ms = (time.perf_counter() - write_start) * 1e3
+
+        stats = result["stats"]
+        for stage in STAGES:
+            if stage in stats["timings_ms"]:
+                row[f"{stage}_ms"] = stats["timings_ms"][stage]
+        row["write_ms"] = round(write_ms, 2)
+        row.update({
+            "status": "ok",
+            "points": stats["points_full"],
+            "points_simplified": stats["points_simplified"],
+            "width": result["image_size"][0],
+            "height": result["image_size"][1],
+            "outputs": ";".join(outputs),
+        })
+    except Exception as e:
+        row["error"] = f"{type(e).__name__}: {e}"
+
+    row["seconds"] = round(time.perf_counter() - start, 4)
+    return row
+
+
+def _no_progress(stage: str, fraction: float) -> None:
+    pass
+
+
+def _convert_star(args) -> dict:
+    return convert_one(*args)
+
+
+# -------------------------
+# Driver
+# -------------------------
+
+def run(args) -> int:
+    from app.core.route_extractor import DEFAULT_SIMPLIFY, EXTRACTOR_CONFIG
+
+    source = Path(args.input)
+    out_dir = Path(args.out)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    formats = [f.strip() for f in args.formats.split(",") if f.strip()]
+
+    if source.is_dir():
+        if args.bbox is None:
+            print("--bbox is required when converting a directory", file=sys.stderr)
+            return 2
+        tasks = list(directory_tasks(source, args.bbox, args.padding, args.projection))
+    else:
+        try:
+            tasks = list(manifest_tasks(source, args.bbox, args.padding, args.projection))
+        except (OSError, KeyError, ValueError) as e:
+            print(f"bad manifest: {e!r}", file=sys.stderr)
+            return 2
+
+    summary_path = out_dir / "summary.csv"
+    done = read_summary(summary_path)
+    skip = {"ok"} if args.retry_failed else {"ok", "failed"}
+    pending = [t for t in tasks if done.get(t.image, {}).get("status") not in skip]
+    print(f"{len(tasks)} images, {len(tasks) - len(pending)} already done, {len(pending)} to convert")
+    if not pending:
+        return 0
+
+    config = dict(EXTRACTOR_CONFIG)
+    simplify = {**DEFAULT_SIMPLIFY, "tolerance": args.simplify_tolerance, "units": args.simplify_units}
+    workers = args.workers or os.cpu_count() or 1
+
+    new_file = not summary_path.exists()
+    stage_totals = dict.fromkeys(STAGES, 0.0)
+    ok = failed = 0
+    start = last_report = time.perf_counter()
+
+    ctx = mp.get_context("spawn")
+    with open(summary_path, "a", newline="", encoding="utf-8") as f, \
+            ctx.Pool(workers, initializer=_init_worker, initargs=(not args.verbose,)) as pool:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS)
+        if new_file:
+            writer.writeheader()
+
+        jobs = ((task, str(out_dir), formats, config, simplify) for task in pending)
+        for row in pool.imap_unordered(_convert_star, jobs):
+            # One flushed row per image: the resume point after a crash
+            writer.writerow(row)
+            f.flush()
+
+            if row["status"] == "ok":
+                ok += 1
+                for stage in STAGES:
+                    stage_totals[stage] += row.get(f"{stage}_ms", 0.0)
+            else:
+                failed += 1
+                print(f"failed {row['image']}: {row['error']}", file=sys.stderr)
+
+            now = time.perf_counter()
+            if now - last_report >= REPORT_EVERY_S:
+                last_report = now
+                count = ok + failed
+                rate = count / (now - start)
+                print(f"{count}/{len(pending)} images  {rate:.2f} images/s  "
+                      f"eta {(len(pending) - count) / rate:.0f}s")
+
+    elapsed = time.perf_counter() - start
+    print(f"converted {ok} ok, {failed} failed in {elapsed:.1f}s "
+          f"({(ok + failed) / elapsed:.2f} images/s, {workers} workers)")
+    if ok:
+        print("mean per-stage time (ms):")
+        for stage in STAGES:
+            print(f"  {stage:<13}{stage_totals[stage] / ok:10.1f}")
+    print(f"summary: {summary_path}")
+    return 1 if failed else 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("input", help="directory of images or a manifest CSV")
+    parser.add_argument("-o", "--out", required=True, help="output directory")
+    parser.add_argument("--bbox", type=parse_bbox, help="north,south,east,west (default for all images)")
+    parser.add_argument("--padding", type=int, default=0, help="search bbox padding in metres")
+    parser.add_argument("--projection", choices=("linear", "mercator"), default="linear")
+    parser.add_argument("--formats", default="gpx,geojson", help="comma list of gpx, geojson, tcx")
+    parser.add_argument("--workers", type=int, default=0, help="processes (default: CPU count)")
+    parser.add_argument("--simplify-tolerance", type=float, default=1.0)
+    parser.add_argument("--simplify-units", choices=("px", "m"), default="px")
+    parser.add_argument("--retry-failed", action="store_true", help="convert images that failed last run again")
+    parser.add_argument("--verbose", action="store_true", help="keep pipeline log output from workers")
+    args = parser.parse_args(argv)
+
+    unknown = set(args.formats.split(",")) - {"gpx", "geojson", "tcx"}
+    if unknown:
+        parser.error(f"unknown formats: {', '.join(sorted(unknown))}")
+
+    return run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,248 @@
+import hashlib
+import json
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Iterator, Optional
+from urllib.parse import urlencode
+from xml.sax.saxutils import escape
+
+import numpy as np
+
+from app.core.geo_utils import cumulative_distance
+
+# Bump when the output of any generator changes, so old ETags stop matching
+EXPORT_VERSION = 1
+
+# Points formatted per yielded chunk
+EXPORT_CHUNK_POINTS = 2000
+
+# Google Maps directions URLs accept at most 9 intermediate waypoints
+GOOGLE_MAPS_WAYPOINTS = 9
+
+# TCX trackpoints need a time; courses get a nominal pace from a fixed
+# start so the file (and its ETag) is deterministic
+TCX_SPEED_MPS = 2.8
+TCX_START = np.datetime64("2000-01-01T00:00:00", "s")
+
+EXPORT_MEDIA_TYPES = {
+    "gpx": "application/gpx+xml",
+    "geojson": "application/geo+json",
+    "tcx": "application/vnd.garmin.tcx+xml",
+}
+
+
+# -------------------------
+# Generators
+# -------------------------
+
+def _blocks(points: np.ndarray, row: Callable[..., str], *columns: np.ndarray) -> Iterator[str]:
+    """Formats rows EXPORT_CHUNK_POINTS at a time, one string per block."""
+    for i in range(0, len(points), EXPORT_CHUNK_POINTS):
+        cols = [c[i:i + EXPORT_CHUNK_POINTS].tolist() for c in (points[:, 0], points[:, 1], *columns)]
+        yield "".join(row(*values) for values in zip(*cols))
+
+
+def gpx_chunks(points: np.ndarray, name: str) -> Iterator[str]:
+    yield (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<gpx version="1.1" creator="WorkoutMapCreator" '
+        'xmlns="http://www.topografix.com/GPX/1/1">\n'
+        f"  <trk>\n    <name>{escape(name)}</name>\n    <trkseg>\n"
+    )
+    yield from _blocks(points, lambda lat, lng: f'      <trkpt lat="{lat:.7f}" lon="{lng:.7f}"/>\n')
+    yield "    </trkseg>\n  </trk>\n</gpx>\n"
+
+
+def geojson_chunks(points: np.ndarray, name: str) -> Iterator[str]:
+    distance = float(cumulative_distance(points)[-1]) if len(points) else 0.0
+    yield (
+        '{"type":"FeatureCollection","features":[{"type":"Feature",'
+        f'"properties":{{"name":{json.dumps(name)},"distance_m":{distance:.1f}}},'
+        '"geometry":{"type":"LineString","coordinates":['
+    )
+    first = True
+    for block in _blocks(points, lambda lat, lng: f",[{lng:.7f},{lat:.7f}]"):
+        yield block[1:] if first else block
+        first = False
+    yield "]}}]}\n"
+
+
+def tcx_chunks(points: np.ndarray, name: str) -> Iterator[str]:
+    distance = cumulative_distance(points)
+    seconds = np.round(distance / TCX_SPEED_MPS).astype(np.int64)
+    times = np.datetime_as_string(TCX_START + seconds.astype("timedelta64[s]"), unit="s")
+    total = float(distance[-1]) if len(points) else 0.0
+
+    def degrees(lat, lng):
+        return (
+            f"<LatitudeDegrees>{lat:.7f}</LatitudeDegrees>"
+            f"<LongitudeDegrees>{lng:.7f}</LongitudeDegrees>"
+        )
+
+    def trackpoint(lat, lng, dist, time):
+        return (
+            f"        <Trackpoint><Time>{time}Z</Time><Position>{degrees(lat, lng)}</Position>"
+            f"<DistanceMeters>{dist:.1f}</DistanceMeters></Trackpoint>\n"
+        )
+
+    lap = ""
+    if len(points):
+        lap = (
+            f"      <Lap><TotalTimeSeconds>{int(seconds[-1])}</TotalTimeSeconds>"
+            f"<DistanceMeters>{total:.1f}</DistanceMeters>"
+            f"<BeginPosition>{degrees(*points[0])}</BeginPosition>"
+            f"<EndPosition>{degrees(*points[-1])}</EndPosition>"
+            "<Intensity>Active</Intensity></Lap>\n"
+        )
+
+    yield (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<TrainingCenterDatabase '
+        'xmlns="http://www.garmin.com/xmlschemas/TrainingCenterDatabase/v2">\n'
+        "  <Courses>\n    <Course>\n"
+        # Garmin devices truncate course names to 15 characters
+        f"      <Name>{escape(name[:15])}</Name>\n{lap}"
+        "      <Track>\n"
+    )
+    yield from _blocks(points, trackpoint, distance, times)
+    yield "      </Track>\n    </Course>\n  </Courses>\n</TrainingCenterDatabase>\n"
+
+
+EXPORTERS: Dict[str, Callable[[np.ndarray, str], Iterator[str]]] = {
+    "gpx": gpx_chunks,
+    "geojson": geojson_chunks,
+    "tcx": tcx_chunks,
+}
+
+
+def export_chunks(fmt: str, points: np.ndarray, name: str, gzip: bool = False) -> Iterator[bytes]:
+    """Encoded (optionally gzip-compressed) byte chunks of one export."""
+    chunks = (chunk.encode("utf-8") for chunk in EXPORTERS[fmt](points, name))
+    return gzip_chunks(chunks) if gzip else chunks
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    # wbits=31: gzip container. mtime stays 0 so output is reproducible.
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_etag(fmt: str, points: np.ndarray, name: str, gzip: bool = False) -> str:
+    """
+    Strong ETag of an export, derived from its inputs so it can be checked
+    without generating the file. Generators are deterministic, so equal
+    inputs give byte-identical output.
+    """
+    digest = hashlib.sha256(f"{EXPORT_VERSION}:{fmt}:{name}:{int(gzip)}:".encode())
+    digest.update(np.ascontiguousarray(points, dtype=np.float64).tobytes())
+    return f'"{fmt}-{digest.hexdigest()[:32]}"'
+
+
+# -------------------------
+# Google Maps
+# -------------------------
+
+def downsample_waypoints(points: np.ndarray, count: int = GOOGLE_MAPS_WAYPOINTS) -> np.ndarray:
+    """count points spaced evenly by distance along the route, ends excluded."""
+    if len(points) < 3 or count <= 0:
+        return np.empty((0, 2))
+    distance = cumulative_distance(points)
+    targets = distance[-1] * np.arange(1, count + 1) / (count + 1)
+    idx = np.unique(np.clip(np.searchsorted(distance, targets), 1, len(points) - 2))
+    return points[idx]
+
+
+def google_maps_url(points: np.ndarray, travelmode: str = "walking") -> str:
+    if len(points) == 0:
+        return "https://www.google.com/maps/dir/?api=1"
+    params = {
+        "api": "1",
+        "origin": _latlng(points[0]),
+        "destination": _latlng(points[-1]),
+        "travelmode": travelmode,
+    }
+    waypoints = downsample_waypoints(points)
+    if len(waypoints):
+        params["waypoints"] = "|".join(_latlng(p) for p in waypoints)
+    return "https://www.google.com/maps/dir/?" + urlencode(params, safe=",|")
+
+
+def _latlng(point) -> str:
+    return f"{point[0]:.6f},{point[1]:.6f}"
+
+
+# -------------------------
+# Cache
+# -------------------------
+
+class ExportCache:
+    """
+    Generated export bodies keyed by ETag, LRU bounded by total bytes.
+    The ETag covers route content, format and encoding, so a route that is
+    reprocessed simply stops hitting its old entries.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, etag: str) -> Optional[bytes]:
+        with self._lock:
+            body = self._entries.get(etag)
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(etag)
+            self.hits += 1
+            return body
+
+    def put(self, etag: str, body: bytes) -> None:
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(etag, None)
+            self._bytes -= len(old) if old is not None else 0
+            self._entries[etag] = body
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def stream(self, etag: str, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """Passes chunks through and caches the body once it is complete."""
+        parts = []
+        for chunk in chunks:
+            parts.append(chunk)
+            yield chunk
+        self.put(etag, b"".join(parts))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+def iter_bytes(body: bytes, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    for i in range(0, len(body), chunk_size):
+        yield body[i:i + chunk_size]
+
+
+EXPORT_CACHE = ExportCache(
+    max_bytes=int(os.getenv("EXPORT_CACHE_MB", "64")) * 1024 * 1024,
+)
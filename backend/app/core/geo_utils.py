@@ -1,7 +1,9 @@
-from shapely.geometry import box
-from shapely.affinity import scale
+import math
+
+import numpy as np
 
 METERS_PER_DEGREE = 111_320  # approx at equator
+EARTH_RADIUS_M = 6_371_000  # mean radius, for haversine
 
 
 def expand_bbox(bbox: dict, padding_meters: int) -> dict:
@@ -45,3 +47,40 @@ def normalize_bbox(bbox: dict) -> dict:
         }
 
     raise ValueError(f"Unsupported bbox format: {bbox}")
+
+
+
+def to_local_meters(latlon, origin) -> np.ndarray:
+    """
+    (N, 2) lat/lon -> (N, 2) x/y metres on an equirectangular plane
+    around origin (lat, lon). Accurate at city scale.
+    """
+    latlon = np.asarray(latlon, dtype=np.float64).reshape(-1, 2)
+    kx = METERS_PER_DEGREE * math.cos(math.radians(origin[0]))
+    return np.column_stack([
+        (latlon[:, 1] - origin[1]) * kx,
+        (latlon[:, 0] - origin[0]) * METERS_PER_DEGREE,
+    ])
+
+
+def from_local_meters(xy, origin) -> np.ndarray:
+    xy = np.asarray(xy, dtype=np.float64).reshape(-1, 2)
+    kx = METERS_PER_DEGREE * math.cos(math.radians(origin[0]))
+    return np.column_stack([
+        xy[:, 1] / METERS_PER_DEGREE + origin[0],
+        xy[:, 0] / kx + origin[1],
+    ])
+
+
+def cumulative_distance(latlon) -> np.ndarray:
+    """(N,) haversine distance in metres from the first point."""
+    pts = np.radians(np.asarray(latlon, dtype=np.float64).reshape(-1, 2))
+    if len(pts) < 2:
+        return np.zeros(len(pts))
+    lat, lon = pts[:, 0], pts[:, 1]
+    a = (
+        np.sin(np.diff(lat) / 2) ** 2
+        + np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin(np.diff(lon) / 2) ** 2
+    )
+    step = 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+    return np.concatenate([[0.0], np.cumsum(step)])
@@ -1,14 +1,173 @@
-from fastapi import UploadFile
+import asyncio
+import hashlib
+import json
+import os
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Dict
+
+from fastapi import HTTPException, UploadFile
 
 UPLOAD_DIR = Path("uploads")
-UPLOAD_DIR.mkdir(exist_ok=True)
 
+UPLOAD_CHUNK = 1024 * 1024
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_MB", "25")) * 1024 * 1024
+# Multipart framing (boundaries, part headers, form fields) per file
+MULTIPART_OVERHEAD = 64 * 1024
+# "disk" writes uploads to UPLOAD_DIR; "memory" keeps the bytes and the
+# extractor decodes them with cv2.imdecode, skipping the disk round-trip.
+UPLOAD_STORAGE = os.getenv("UPLOAD_STORAGE", "disk")
+
+_IMAGE_SIGNATURES = (
+    b"\x89PNG\r\n\x1a\n",
+    b"\xff\xd8\xff",        # JPEG
+    b"GIF87a",
+    b"GIF89a",
+    b"BM",                  # BMP
+    b"II*\x00",             # TIFF, little endian
+    b"MM\x00*",             # TIFF, big endian
+)
+
+
+@dataclass
+class SavedImage:
+    sha256: str
+    size: int
+    path: str | None = None
+    data: bytearray | None = None
+
+
+def looks_like_image(head: bytes) -> bool:
+    if head.startswith(_IMAGE_SIGNATURES):
+        return True
+    return head[:4] == b"RIFF" and head[8:12] == b"WEBP"
+
+
+async def save_image(file: UploadFile, route_id: str, in_memory: bool | None = None) -> SavedImage:
+    """
+    Copies an upload in chunks, hashing as it goes; disk writes run in a
+    thread. Rejects files over MAX_UPLOAD_BYTES (413) or without a known
+    image signature (415).
+
+    Starlette has spooled the request body by the time this runs, so the
+    bound on what reaches the server is UploadLimitMiddleware.
+    """
+    if in_memory is None:
+        in_memory = UPLOAD_STORAGE == "memory"
+
+    if file.size is not None and file.size > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="Image too large")
+
+    path = UPLOAD_DIR / f"{route_id}_{Path(file.filename or 'image').name}"
+    digest = hashlib.sha256()
+    buffer = bytearray() if in_memory else None
+    size = 0
+
+    out = None if in_memory else await asyncio.to_thread(_open_upload, path)
+    try:
+        while chunk := await file.read(UPLOAD_CHUNK):
+            if size == 0 and not looks_like_image(chunk[:16]):
+                raise HTTPException(status_code=415, detail="Unsupported image type")
+
+            size += len(chunk)
+            if size > MAX_UPLOAD_BYTES:
+                raise HTTPException(status_code=413, detail="Image too large")
+
+            digest.update(chunk)
+            if in_memory:
+                buffer += chunk
+            else:
+                await asyncio.to_thread(out.write, chunk)
+    except BaseException:
+        if out:
+            await asyncio.to_thread(_discard_upload, out, path)
+        raise
+    else:
+        if out:
+            await asyncio.to_thread(out.close)
+
+    if size == 0:
+        if not in_memory:
+            await asyncio.to_thread(path.unlink, missing_ok=True)
+        raise HTTPException(status_code=400, detail="Empty upload")
+
+    return SavedImage(
+        sha256=digest.hexdigest(),
+        size=size,
+        path=None if in_memory else str(path),
+        # Handed over as is: a bytes() copy would double peak memory
+        data=buffer if in_memory else None,
+    )
+
+
+def _open_upload(path: Path):
+    # Created on first use, not at import, so startup stays side-effect free
+    UPLOAD_DIR.mkdir(exist_ok=True)
+    return open(path, "wb")
+
+
+def _discard_upload(out, path: Path) -> None:
+    out.close()
+    path.unlink(missing_ok=True)
+
+
+# -------------------------
+# Request size limit
+# -------------------------
+
+def upload_request_limit(files: int = 1) -> int:
+    """Largest acceptable request body for an upload of `files` images."""
+    return files * (MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD)
+
+
+class UploadLimitMiddleware:
+    """
+    Caps request bodies on the upload endpoints before the app reads them.
+
+    A Content-Length over the path's limit is answered with 413 without
+    reading the body at all; chunked bodies are counted as they arrive and
+    cut off with 413 once they pass it, so an oversized upload never gets
+    spooled to disk in full.
+    """
+
+    def __init__(self, app, limits: Dict[str, int]):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        length = dict(scope["headers"]).get(b"content-length")
+        if length is not None and length.isdigit() and int(length) > limit:
+            await _reject(send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise HTTPException(status_code=413, detail="Image too large")
+            return message
 
-async def save_image(file: UploadFile, route_id: str) -> str:
-    path = UPLOAD_DIR / f"{route_id}_{file.filename}"
+        await self.app(scope, limited_receive, send)
 
-    with open(path, "wb") as f:
-        f.write(await file.read())
 
-    return str(path)
+async def _reject(send) -> None:
+    body = json.dumps({"detail": "Image too large"}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 413,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"connection", b"close"),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,99 @@
+import asyncio
+from typing import AsyncIterator, Dict, Optional
+
+from app.core.storage import JOBS, TERMINAL_JOB_STATES
+
+# Seconds between keep-alive events on an otherwise idle subscription, so
+# proxies keep the connection open and dead clients get noticed.
+HEARTBEAT_SECONDS = 15.0
+
+
+class JobChannel:
+    """
+    Broadcast point for one job. Publishing sets a single asyncio.Event
+    that every subscriber awaits, then swaps in a fresh one, so a publish
+    costs the same with one listener or a thousand. Subscribers read the
+    latest JOBS state when woken: bursts of progress updates collapse into
+    one message and a slow client never builds up a backlog.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.changed = asyncio.Event()
+        self.subscribers = 0
+
+    def wake(self) -> None:
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+
+# job id -> channel; only jobs someone is listening to have one
+_channels: Dict[str, JobChannel] = {}
+
+
+def publish_job(job_id: str) -> None:
+    """
+    Tells subscribers that JOBS[job_id] changed. Safe to call from any
+    thread (the progress drain thread publishes worker updates); free when
+    nobody is subscribed.
+    """
+    channel = _channels.get(job_id)
+    if channel is None:
+        return
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is channel.loop:
+        channel.wake()
+    else:
+        channel.loop.call_soon_threadsafe(channel.wake)
+
+
+def job_snapshot(job_id: str) -> dict:
+    job = JOBS[job_id]
+    return {
+        "job_id": job_id,
+        "route_id": job["route_id"],
+        "status": job["status"],
+        "stage": job["stage"],
+        "progress": round(job["progress"], 3),
+        "error": job["error"],
+    }
+
+
+async def job_updates(job_id: str, heartbeat: float = HEARTBEAT_SECONDS) -> AsyncIterator[Optional[dict]]:
+    """
+    Yields a job snapshot now and on every change until the job completes
+    or fails (the terminal snapshot is the last item). Yields None after
+    `heartbeat` idle seconds.
+    """
+    channel = _channels.get(job_id)
+    if channel is None:
+        channel = _channels[job_id] = JobChannel(asyncio.get_running_loop())
+    channel.subscribers += 1
+
+    try:
+        last = None
+        while True:
+            # Take the event before reading state: a publish in between
+            # sets this event, so no change can be missed
+            changed = channel.changed
+            snapshot = job_snapshot(job_id)
+            if snapshot != last:
+                last = snapshot
+                yield snapshot
+            if snapshot["status"] in TERMINAL_JOB_STATES:
+                return
+            try:
+                await asyncio.wait_for(changed.wait(), heartbeat)
+            except asyncio.TimeoutError:
+                yield None
+    finally:
+        channel.subscribers -= 1
+        if channel.subscribers == 0 and _channels.get(job_id) is channel:
+            del _channels[job_id]
+
+
+def subscriber_count() -> int:
+    return sum(channel.subscribers for channel in list(_channels.values()))
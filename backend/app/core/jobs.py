@@ -0,0 +1,207 @@
+import asyncio
+import os
+import time
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import List
+
+from fastapi import HTTPException
+
+from app.core.storage import ROUTES, JOBS, create_job
+from app.core.job_events import publish_job
+from app.core.workers import MAX_WORKERS, discard_executor, get_executor
+from app.core.geo_utils import expand_bbox, normalize_bbox
+from app.core.route_extractor import run_route_pipeline, EXTRACTOR_CONFIG
+from app.core.result_cache import RESULT_CACHE, hash_file, make_cache_key
+from app.core.metrics import IMAGES_PROCESSED, ROUTE_JOB_SECONDS, ROUTE_POINTS, observe_stages
+from app.core.image_loader import UPLOAD_DIR
+from app.schemas.process import ProcessRouteRequest
+from app.print_logging import log
+
+# Keep references to running jobs so they are not garbage collected.
+_running: set[asyncio.Task] = set()
+
+# Batch items allowed on the worker pool at once, across all batches, so a
+# large batch queues behind itself instead of crowding out single routes.
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "0")) or MAX_WORKERS
+_batch_slots: asyncio.Semaphore | None = None
+
+
+def check_process_request(payload: ProcessRouteRequest) -> None:
+    """Raises 400 for process requests the pipeline cannot run."""
+    if not payload.search_scope:
+        raise HTTPException(
+            status_code=400,
+            detail="search_scope (bounding box) is required"
+        )
+
+    georef = payload.georeference
+    if georef.control_points is not None:
+        needed = 4 if georef.model == "homography" else 3
+        if len(georef.control_points) < needed:
+            raise HTTPException(
+                status_code=400,
+                detail=f"{georef.model} georeferencing needs at least {needed} control points"
+            )
+
+
+def queue_route_job(route_id: str, payload: ProcessRouteRequest) -> tuple[str, dict]:
+    """
+    Creates a job for the route and marks it processing. Returns the job
+    id and the keyword arguments for start_route_job.
+    """
+    job_id = create_job(route_id)
+
+    raw_bbox = expand_bbox(
+        payload.search_scope.bbox.model_dump(),
+        payload.search_scope.padding_meters
+    )
+
+    expanded_bbox = normalize_bbox(raw_bbox)
+
+    ROUTES[route_id]["search_scope"] = expanded_bbox
+    ROUTES[route_id]["status"] = "processing"
+    ROUTES[route_id]["job_id"] = job_id
+
+    return job_id, {
+        "bbox": expanded_bbox,
+        "debug": payload.debug,
+        "simplify": payload.simplification.model_dump(),
+        "georeference": payload.georeference.model_dump(),
+    }
+
+
+def start_route_job(
+    route_id: str,
+    job_id: str,
+    bbox: dict,
+    debug: bool = False,
+    simplify: dict | None = None,
+    georeference: dict | None = None
+) -> asyncio.Task:
+    """Schedules the CV pipeline for a route on the worker pool and
+    returns immediately; results land in ROUTES / JOBS when done."""
+    task = asyncio.create_task(_run_route_job(route_id, job_id, bbox, debug, simplify, georeference))
+    _running.add(task)
+    task.add_done_callback(_running.discard)
+    return task
+
+
+def start_batch_jobs(batch_id: str, jobs: List[tuple[str, str, dict]]) -> asyncio.Task:
+    """
+    Runs (route_id, job_id, job_args) items on the worker pool, at most
+    BATCH_CONCURRENCY at a time; the rest wait in the "queued" stage.
+    """
+    task = asyncio.create_task(_run_batch(batch_id, jobs))
+    _running.add(task)
+    task.add_done_callback(_running.discard)
+    return task
+
+
+async def _run_batch(batch_id: str, jobs: List[tuple[str, str, dict]]) -> None:
+    global _batch_slots
+    if _batch_slots is None:
+        _batch_slots = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def run_one(route_id: str, job_id: str, job_args: dict) -> None:
+        async with _batch_slots:
+            await _run_route_job(route_id, job_id, **job_args)
+
+    log(f"batch started batch_id={batch_id} items={len(jobs)} concurrency={BATCH_CONCURRENCY}")
+    await asyncio.gather(*(run_one(*job) for job in jobs))
+    log(f"batch finished batch_id={batch_id}")
+
+
+def debug_dir_for(route_id: str) -> str:
+    return str(UPLOAD_DIR / "debug" / route_id)
+
+
+async def _run_route_job(
+    route_id: str,
+    job_id: str,
+    bbox: dict,
+    debug: bool,
+    simplify: dict | None,
+    georeference: dict | None
+) -> None:
+    loop = asyncio.get_running_loop()
+    route = ROUTES[route_id]
+    # Either a path on disk or the raw upload bytes (UPLOAD_STORAGE=memory)
+    image = route["image_path"] or route["image_bytes"]
+    config = dict(EXTRACTOR_CONFIG)
+    debug_dir = debug_dir_for(route_id) if debug else None
+    route["debug_dir"] = debug_dir
+    started = time.perf_counter()
+    outcome = "cached"
+
+    try:
+        if not route.get("image_hash"):
+            route["image_hash"] = await asyncio.to_thread(hash_file, image)
+        cache_key = make_cache_key(
+            route["image_hash"], bbox, {"extractor": config, "simplify": simplify, "georeference": georeference}
+        )
+
+        # Debug runs always execute the pipeline so artifacts get written.
+        result = None if debug else await asyncio.to_thread(RESULT_CACHE.get, cache_key)
+        if result is not None:
+            log(f"result cache hit route_id={route_id}")
+        else:
+            outcome = "computed"
+            executor = get_executor()
+            try:
+                result = await loop.run_in_executor(
+                    executor, partial(
+                        run_route_pipeline, image, bbox, job_id, config, debug_dir,
+                        simplify, georeference, keep_intermediates=True
+                    )
+                )
+            except BrokenProcessPool:
+                # Fails the jobs that were on the dead pool, not later ones
+                discard_executor(executor)
+                raise
+            await asyncio.to_thread(RESULT_CACHE.put, cache_key, result)
+    except Exception as e:
+        log(f"route job failed route_id={route_id} job_id={job_id}: {e!r}", level="error")
+        route["status"] = "failed"
+        JOBS[job_id].update({
+            "status": "failed",
+            "stage": "failed",
+            "error": str(e)
+        })
+        publish_job(job_id)
+        _record_job("failed", started)
+        return
+
+    _store_result(route_id, job_id, result)
+    _record_job(outcome, started, result["stats"])
+
+
+def _record_job(outcome: str, started: float, stats: dict | None = None) -> None:
+    ROUTE_JOB_SECONDS.observe(time.perf_counter() - started, outcome=outcome)
+    IMAGES_PROCESSED.inc(outcome=outcome)
+    if stats is not None:
+        ROUTE_POINTS.observe(stats["points_full"])
+        # Cached stats describe the run that produced them, not this one
+        if outcome == "computed":
+            observe_stages(stats["timings_ms"])
+
+
+def _store_result(route_id: str, job_id: str, result: dict) -> None:
+    ROUTES[route_id].update({
+        # Shared with the result cache; never modified in place
+        "geometry": result["geometry"],
+        "stats": result["stats"],
+        # Packed mask/centerline for /refine; the context is rebuilt from
+        # them on the next edit
+        "intermediates": result.get("intermediates"),
+        "refine_context": None,
+        "confidence": result["confidence"],
+        "status": "completed"
+    })
+
+    JOBS[job_id].update({
+        "status": "completed",
+        "stage": "completed",
+        "progress": 1.0
+    })
+    publish_job(job_id)
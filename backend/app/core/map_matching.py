@@ -1,11 +1,39 @@
-def match_to_map(image_polyline, search_scope):
+from typing import List
+
+from app.matching.hmm_matcher import HMMMatcher
+from app.matching.segment_graph import SegmentGraph
+from app.print_logging import log
+
+
+def match_to_map(
+    geo_polyline,
+    road_ways: List[dict] | None = None,
+    graph: SegmentGraph | None = None,
+    config: dict | None = None
+) -> dict:
     """
-    Placeholder for map matching logic.
-    For now, returns a fake geo polyline.
+    Snaps a (lat, lon) polyline onto the road network with the HMM
+    matcher.
+
+    road_ways are Overpass-style ways (e.g. RoadProvider.ways_near);
+    pass a prebuilt graph instead to reuse it across routes. config
+    overrides hmm_matcher.HMM_CONFIG.
     """
+    if graph is None:
+        graph = SegmentGraph.from_ways(road_ways or [])
+
+    result = HMMMatcher(graph, config).match(geo_polyline)
+
+    log(
+        f"match_to_map points={len(result.segments)} "
+        f"matched={result.matched_fraction:.2f} breaks={result.breaks} "
+        + " ".join(f"{k}={v * 1e3:.1f}ms" for k, v in result.timings.items())
+    )
 
-    return [
-        {"lat": 12.9611, "lng": 77.6387},
-        {"lat": 12.9620, "lng": 77.6402},
-        {"lat": 12.9635, "lng": 77.6420}
-    ]
+    return {
+        "polyline": [{"lat": lat, "lng": lng} for lat, lng in result.polyline],
+        "way_ids": sorted(set(result.way_ids[result.way_ids >= 0].tolist())),
+        "matched_fraction": result.matched_fraction,
+        "breaks": result.breaks,
+        "timings_ms": {k: round(v * 1e3, 2) for k, v in result.timings.items()},
+    }
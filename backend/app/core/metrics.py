@@ -0,0 +1,245 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Seconds; spans sub-millisecond handlers to multi-second CV jobs
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+POINTS_BUCKETS = (100, 250, 500, 1_000, 2_500, 5_000, 10_000, 25_000, 50_000, 100_000)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ""
+    escaped = (
+        (k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in pairs
+    )
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+# -------------------------
+# Metric types
+# -------------------------
+
+class Counter:
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self.kind = "counter"
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0.0)
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(key)} {_format_value(value)}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram, Prometheus style."""
+
+    def __init__(self, name: str, help: str, buckets: Iterable[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.kind = "histogram"
+        self.buckets = tuple(sorted(buckets))
+        # label key -> [per-bucket counts..., +Inf count, sum]
+        self._series: Dict[LabelKey, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(labels)
+        slot = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            series[slot] += 1
+            series[-1] += value
+
+    def count(self, **labels) -> int:
+        series = self._series.get(_label_key(labels))
+        return int(sum(series[:-1])) if series else 0
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = [(key, list(series)) for key, series in self._series.items()]
+        for key, series in items:
+            running = 0.0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                running += count
+                le = (("le", _format_value(bound)),)
+                yield f"{self.name}_bucket{_format_labels(key, le)} {_format_value(running)}"
+            yield f"{self.name}_sum{_format_labels(key)} {_format_value(series[-1])}"
+            yield f"{self.name}_count{_format_labels(key)} {_format_value(running)}"
+
+
+class CallbackMetric:
+    """Value read at scrape time from state another module already keeps."""
+
+    def __init__(self, name: str, help: str, kind: str, read: Callable[[], Optional[float]]):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.read = read
+
+    def samples(self) -> Iterable[str]:
+        value = self.read()
+        if value is not None:
+            yield f"{self.name} {_format_value(value)}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"metric {metric.name} already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str) -> Counter:
+        return self.register(Counter(name, help))
+
+    def histogram(self, name: str, help: str, buckets: Iterable[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, buckets))
+
+    def callback(self, name: str, help: str, read: Callable[[], Optional[float]], kind: str = "gauge") -> CallbackMetric:
+        return self.register(CallbackMetric(name, help, kind, read))
+
+    def render(self) -> str:
+        """Prometheus text exposition format 0.0.4."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds", "API request latency by route template"
+)
+STAGE_SECONDS = REGISTRY.histogram(
+    "pipeline_stage_duration_seconds", "Route pipeline time per stage"
+)
+ROUTE_JOB_SECONDS = REGISTRY.histogram(
+    "route_job_duration_seconds", "Route job wall time from scheduling to result"
+)
+IMAGES_PROCESSED = REGISTRY.counter(
+    "images_processed_total", "Route jobs finished, by outcome"
+)
+ROUTE_POINTS = REGISTRY.histogram(
+    "route_points", "Full-resolution points per extracted route", POINTS_BUCKETS
+)
+
+
+# -------------------------
+# Spans
+# -------------------------
+
+@contextmanager
+def span(name: str, sink: Optional[Dict[str, float]] = None, metric: Optional[Histogram] = None, **labels):
+    """
+    Times a block. The duration (seconds) is added to sink[name] and/or
+    observed on metric with the given labels.
+
+    Spans inside CV worker processes should use a sink and ship it back
+    with the result: each process has its own registry, and only the API
+    process's is scraped.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        if sink is not None:
+            sink[name] = sink.get(name, 0.0) + elapsed
+        if metric is not None:
+            metric.observe(elapsed, **labels)
+
+
+def observe_stages(timings_ms: Dict[str, float]) -> None:
+    """Records a finished pipeline's per-stage timings (ms) in the API process."""
+    for stage, ms in timings_ms.items():
+        STAGE_SECONDS.observe(ms / 1e3, stage=stage)
+
+
+# -------------------------
+# ASGI middleware
+# -------------------------
+
+def _route_template(scope) -> str:
+    # Routers are included lazily here, so scope["route"] is the router's
+    # own APIRoute without its prefix; the effective context has the full path
+    context = scope.get("fastapi", {}).get("effective_route_context")
+    if context is not None:
+        return context.path
+    route = scope.get("route")
+    return getattr(route, "path", "unmatched")
+
+
+class MetricsMiddleware:
+    """
+    Times every HTTP request until its response is fully sent, labelled
+    with the matched route template (not the raw path, which would give
+    one series per route id).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=_route_template(scope),
+                status=status,
+            )
@@ -0,0 +1,152 @@
+from typing import Iterable, Sequence
+
+import numpy as np
+
+# Google polyline alphabet: 5-bit chunk, 0x20 continuation flag, +63
+_ENCODE_TABLE = np.arange(63, 127, dtype=np.uint8)
+_MAX_CHUNKS = 13  # 64-bit zigzag value / 5 bits
+
+
+# -------------------------
+# Quantize / delta
+# -------------------------
+
+def quantize_deltas(points, precision: int = 5) -> np.ndarray:
+    """
+    (N, 2) lat/lng -> (2N,) interleaved integer deltas, rounded to
+    `precision` decimal digits (5 for Google/Strava, 6 for OSRM/Valhalla).
+    """
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    if not np.isfinite(pts).all():
+        raise ValueError("Polyline contains non-finite coordinates")
+
+    fixed = np.rint(pts * 10.0 ** precision).astype(np.int64)
+    deltas = np.diff(fixed, axis=0, prepend=np.zeros((1, 2), dtype=np.int64))
+    return deltas.ravel()
+
+
+# -------------------------
+# Encode
+# -------------------------
+
+def _encode_values(values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Signed ints -> (encoded bytes, chunk count per value), all values at
+    once: zigzag, count 5-bit chunks, then fill chunk k of every value
+    that still has one and look it up in the table.
+    """
+    zigzag = (values << 1) ^ (values >> 63)
+
+    counts = np.ones(len(zigzag), dtype=np.uint8)
+    limit = 0x20
+    while limit <= 1 << 60 and (zigzag >= limit).any():
+        counts += zigzag >= limit
+        limit <<= 5
+
+    ends = np.cumsum(counts, dtype=np.int64)
+    offsets = ends - counts
+    out = np.empty(int(ends[-1]) if len(ends) else 0, dtype=np.uint8)
+
+    # Chunk 0 for every value, then only the values that still have more
+    more = counts > 1
+    out[offsets] = _ENCODE_TABLE[(zigzag & 0x1F) | (more << 5)]
+
+    active = np.flatnonzero(more)
+    k = 1
+    while len(active):
+        more = counts[active] > k + 1
+        code = ((zigzag[active] >> (5 * k)) & 0x1F) | (more << 5)
+        out[offsets[active] + k] = _ENCODE_TABLE[code]
+        active = active[more]
+        k += 1
+
+    return out, counts
+
+
+def encode_polyline(points, precision: int = 5) -> str:
+    """
+    Encodes a polyline using Google's polyline encoding algorithm.
+    Compatible with Google Maps, Strava, Garmin, etc.
+    """
+    encoded, _ = _encode_values(quantize_deltas(points, precision))
+    return encoded.tobytes().decode("ascii")
+
+
+def encode_many(
+    polylines: Sequence,
+    precisions: Iterable[int] = (5,)
+) -> dict[int, list[str]]:
+    """
+    Encodes a batch of polylines at one or more precisions in a single
+    vectorized pass per precision.
+
+    Returns {precision: [encoded, ...]} in input order.
+    """
+    arrays = [np.asarray(p, dtype=np.float64).reshape(-1, 2) for p in polylines]
+    sizes = np.array([len(a) for a in arrays], dtype=np.int64)
+    if not arrays or sizes.sum() == 0:
+        return {p: ["" for _ in arrays] for p in precisions}
+
+    stacked = np.concatenate(arrays)
+    if not np.isfinite(stacked).all():
+        raise ValueError("Polyline contains non-finite coordinates")
+
+    starts = np.cumsum(sizes) - sizes
+    firsts = starts[sizes > 0]
+
+    result = {}
+    for precision in precisions:
+        fixed = np.rint(stacked * 10.0 ** precision).astype(np.int64)
+        deltas = np.diff(fixed, axis=0, prepend=np.zeros((1, 2), dtype=np.int64))
+        # Each polyline starts again from (0, 0)
+        deltas[firsts] = fixed[firsts]
+
+        encoded, counts = _encode_values(deltas.ravel())
+
+        # Byte offsets of polyline boundaries
+        value_ends = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=value_ends[1:])
+        bounds = value_ends[2 * np.append(starts, len(stacked))].tolist()
+        text = encoded.tobytes().decode("ascii")
+        result[precision] = [text[a:b] for a, b in zip(bounds[:-1], bounds[1:])]
+
+    return result
+
+
+# -------------------------
+# Decode
+# -------------------------
+
+def decode_polyline(encoded: str, precision: int = 5) -> np.ndarray:
+    """
+    Inverse of encode_polyline. Returns an (N, 2) lat/lng array.
+    """
+    try:
+        raw = np.frombuffer(encoded.encode("ascii"), dtype=np.uint8)
+    except UnicodeEncodeError:
+        raise ValueError("Encoded polyline must be ASCII") from None
+
+    if len(raw) == 0:
+        return np.empty((0, 2))
+
+    codes = raw.astype(np.int64) - 63
+    if codes.min() < 0 or codes.max() > 0x3F:
+        raise ValueError("Invalid character in encoded polyline")
+
+    last = (codes & 0x20) == 0
+    if not last[-1]:
+        raise ValueError("Encoded polyline is truncated")
+
+    # Chunk position within its value, then sum shifted chunks per value
+    ends = np.flatnonzero(last)
+    starts = np.concatenate([[0], ends[:-1] + 1])
+    position = np.arange(len(codes)) - np.repeat(starts, ends - starts + 1)
+    if position.max() >= _MAX_CHUNKS:
+        raise ValueError("Encoded value is too long")
+
+    zigzag = np.add.reduceat((codes & 0x1F) << (5 * position), starts)
+    if len(zigzag) % 2:
+        raise ValueError("Encoded polyline has an odd number of values")
+
+    deltas = (zigzag >> 1) ^ -(zigzag & 1)
+    return np.cumsum(deltas.reshape(-1, 2), axis=0) / 10.0 ** precision
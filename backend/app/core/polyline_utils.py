@@ -1,5 +1,7 @@
 from typing import List, Tuple, Dict
 
+from app.core import polyline_codec
+
 LatLng = Tuple[float, float]
 
 
@@ -8,38 +10,13 @@ def encode_polyline(points: List[LatLng]) -> str:
     Encodes a polyline using Google's polyline encoding algorithm.
     Compatible with Google Maps, Strava, Garmin, etc.
     """
-    result = []
-    prev_lat = 0
-    prev_lng = 0
-
-    for lat, lng in points:
-        lat_i = int(round(lat * 1e5))
-        lng_i = int(round(lng * 1e5))
-
-        d_lat = lat_i - prev_lat
-        d_lng = lng_i - prev_lng
-
-        result.append(_encode_value(d_lat))
-        result.append(_encode_value(d_lng))
-
-        prev_lat = lat_i
-        prev_lng = lng_i
-
-    return "".join(result)
-
+    return polyline_codec.encode_polyline(points)
 
-def _encode_value(value: int) -> str:
-    value = value << 1
-    if value < 0:
-        value = ~value
 
-    encoded = ""
-    while value >= 0x20:
-        encoded += chr((0x20 | (value & 0x1F)) + 63)
-        value >>= 5
+def decode_polyline(encoded: str) -> List[LatLng]:
+    """Google/Strava encoded polyline -> [(lat, lng), ...]."""
+    return list(map(tuple, polyline_codec.decode_polyline(encoded).tolist()))
 
-    encoded += chr(value + 63)
-    return encoded
 
 def tuples_to_latlng(
     polyline: List[Tuple[float, float]]
@@ -0,0 +1,367 @@
+"""
+Incremental route refinement from user anchor points.
+
+An anchor says "the route passes here". Each one is snapped onto the
+current pixel polyline, and only a window of the polyline around the snap
+point is recomputed: a shortest path from the window start through the
+anchor to the window end over the cached centerline and route mask,
+then georeferencing, simplification and the splice. Nothing outside the
+window is touched, so an edit costs milliseconds instead of a full
+pipeline run.
+
+The pipeline stores what this needs (route_intermediates) with its result:
+the route mask and centerline as bit-packed bitmaps plus the georeference
+and simplification settings.
+"""
+import base64
+import threading
+import zlib
+from dataclasses import dataclass, field
+from typing import Dict, Tuple
+
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import dijkstra
+from scipy.spatial import cKDTree
+
+from app.core.metrics import span
+from app.core.polyline_codec import encode_many
+from app.core.route_geometry import RouteGeometry
+from app.core.simplify import simplify_mask
+from app.cv.skeleton_graph import build_skeleton_graph
+from app.cv.utils import pack_mask, unpack_mask
+from app.matching.georeference import Georeferencer, make_georeferencer
+from app.matching.marker_projection import PolylineIndex
+from app.schemas.common import LatLng
+
+REFINE_CONFIG: dict = {
+    # Polyline length (px) replaced on each side of a snapped anchor:
+    # max(window_min_px, window_factor * anchor distance from the route)
+    "window_min_px": 40,
+    "window_factor": 3.0,
+    # Crop padding around the window for the local path search
+    "margin_px": 24,
+    # Centerline gaps up to this long (px) may be bridged
+    "bridge_px": 30,
+    # Cost per pixel of a straight bridge, relative to 1 along the
+    # centerline: on the route mask, and off it
+    "bridge_cost": 2.0,
+    "off_route_cost": 8.0,
+    # Centerline pixels each window end / anchor is linked to
+    "terminal_links": 8,
+}
+
+
+# -------------------------
+# Intermediates (pipeline side)
+# -------------------------
+
+def route_intermediates(components, image_size: Tuple[int, int]) -> dict:
+    """
+    Mask and centerline of every extracted component composited at image
+    size, bit-packed and compressed so they stay JSON-serializable for the
+    result cache.
+    """
+    w, h = image_size
+    mask = np.zeros((h, w), dtype=bool)
+    centerline = np.zeros((h, w), dtype=bool)
+    for c in components:
+        if c.mask is not None:
+            _paste(mask, c.mask, c.offset)
+        if c.centerline is not None:
+            _paste(centerline, c.centerline, c.offset)
+    return {
+        "size": [w, h],
+        "mask": _encode_bitmap(mask),
+        "centerline": _encode_bitmap(centerline),
+    }
+
+
+def _paste(canvas: np.ndarray, local: np.ndarray, offset: Tuple[int, int]) -> None:
+    # Component crops carry a 1px border, so offsets can be -1
+    ox, oy = offset
+    h, w = local.shape
+    x0, y0 = max(ox, 0), max(oy, 0)
+    x1, y1 = min(ox + w, canvas.shape[1]), min(oy + h, canvas.shape[0])
+    if x1 > x0 and y1 > y0:
+        canvas[y0:y1, x0:x1] |= local[y0 - oy:y1 - oy, x0 - ox:x1 - ox] > 0
+
+
+def _encode_bitmap(bitmap: np.ndarray) -> str:
+    return base64.b64encode(zlib.compress(pack_mask(bitmap).tobytes(), 1)).decode("ascii")
+
+
+def _decode_bitmap(data: str, width: int, height: int) -> np.ndarray:
+    raw = zlib.decompress(base64.b64decode(data))
+    return np.frombuffer(raw, dtype=np.uint8).reshape(height, (width + 7) // 8)
+
+
+# -------------------------
+# Refinement state (API side)
+# -------------------------
+
+@dataclass
+class RefineContext:
+    """
+    Decoded intermediates and the current route geometry, built on a
+    route's first edit and kept on the route for the following ones.
+    """
+    width: int
+    height: int
+    mask: np.ndarray          # pack_mask() bitmaps, unpacked per window
+    centerline: np.ndarray
+    georef: Georeferencer
+    meters_per_pixel: float
+    simplify_method: str
+    tolerance_px: float
+    geometry: RouteGeometry   # replaced, never modified, by each splice
+    anchors: np.ndarray       # (K, 2) pixel anchors applied so far
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @classmethod
+    def from_route(cls, route: dict) -> "RefineContext":
+        data = route["intermediates"]
+        w, h = data["size"]
+        georef = make_georeferencer(data["bbox"], (w, h), data["georeference"])
+        return cls(
+            width=w,
+            height=h,
+            mask=_decode_bitmap(data["mask"], w, h),
+            centerline=_decode_bitmap(data["centerline"], w, h),
+            georef=georef,
+            meters_per_pixel=georef.meters_per_pixel((w, h)),
+            simplify_method=data["simplify_method"],
+            tolerance_px=data["tolerance_px"],
+            geometry=route["geometry"],
+            anchors=np.empty((0, 2)),
+        )
+
+    @property
+    def pixels(self) -> np.ndarray:
+        return self.geometry.pixels
+
+
+# Serializes building contexts, so concurrent first edits of a route
+# share one context (and its lock) instead of each splicing their own
+_CONTEXT_LOCK = threading.Lock()
+
+
+def _refine_context(route: dict) -> RefineContext:
+    ctx = route.get("refine_context")
+    if ctx is None:
+        with _CONTEXT_LOCK:
+            ctx = route.get("refine_context")
+            if ctx is None:
+                ctx = route["refine_context"] = RefineContext.from_route(route)
+    return ctx
+
+
+# -------------------------
+# Refinement
+# -------------------------
+
+def apply_anchors(route: dict, anchors_latlon, config: dict | None = None) -> dict:
+    """
+    Routes the polyline of a completed route through each (lat, lon)
+    anchor, in order, and replaces the route's geometry and stats.
+    Anchors from earlier edits stay on the route.
+
+    Returns {"anchors": [...], "points_full", "points_simplified",
+    "timings_ms"}. Raises ValueError for anchors outside the image.
+    """
+    config = {**REFINE_CONFIG, **(config or {})}
+    timings: Dict[str, float] = {}
+
+    with span("load", timings):
+        ctx = _refine_context(route)
+
+    with ctx.lock:
+        anchors_px = ctx.georef.geo_to_pixels(anchors_latlon)
+        inside = (
+            (anchors_px[:, 0] >= 0) & (anchors_px[:, 0] <= ctx.width - 1)
+            & (anchors_px[:, 1] >= 0) & (anchors_px[:, 1] <= ctx.height - 1)
+        )
+        if not inside.all():
+            raise ValueError(f"anchor {int(np.argmin(inside))} is outside the route image")
+
+        results = []
+        for anchor in anchors_px:
+            with span("snap", timings):
+                i0, i1, snapped, offset_px = _window(ctx, anchor, config)
+
+            with span("ordering", timings):
+                path = _local_path(ctx, i0, i1, anchor, config)
+            with span("georeference", timings):
+                geo = ctx.georef.pixels_to_geo(path)
+            with span("simplify", timings):
+                keep = simplify_mask(path, ctx.simplify_method, ctx.tolerance_px)
+                keep[[0, -1]] = True
+
+            # A new geometry: the old one may be shared with the result cache
+            ctx.geometry = ctx.geometry.splice(i0, i1, path, geo, keep)
+            ctx.anchors = np.vstack([ctx.anchors, anchor])
+
+            lat, lng = ctx.georef.pixels_to_geo(snapped)[0].tolist()
+            results.append({
+                "snapped": LatLng(lat=lat, lng=lng),
+                "offset_m": round(offset_px * ctx.meters_per_pixel, 2),
+                "window": [i0, i1],
+                "points": int(len(path)),
+            })
+
+        with span("encode", timings):
+            geometry = ctx.geometry
+            geometry.encoded, geometry.encoded_simplified = encode_many(
+                [geometry.geo, geometry.geo_points("simplified")]
+            )[5]
+
+        points_full, points_simplified = len(geometry), geometry.points_simplified
+        timings_ms = {k: round(v * 1e3, 2) for k, v in timings.items()}
+        stats = route.get("stats") or {}
+        route.update({
+            "geometry": geometry,
+            "stats": {
+                **stats,
+                "points_full": points_full,
+                "points_simplified": points_simplified,
+                "reduction": 1.0 - points_simplified / points_full if points_full else 0.0,
+                "refine": {
+                    "anchors": len(ctx.anchors),
+                    "edits": stats.get("refine", {}).get("edits", 0) + 1,
+                    "timings_ms": timings_ms,
+                },
+            },
+        })
+
+    return {
+        "anchors": results,
+        "points_full": points_full,
+        "points_simplified": points_simplified,
+        "timings_ms": timings_ms,
+    }
+
+
+def _window(ctx: RefineContext, anchor: np.ndarray, config: dict):
+    """
+    Vertex range [i0, i1] to recompute around the anchor's snap point,
+    never reaching past an earlier anchor so those stay on the route.
+    Also returns the snap point and the anchor's distance from it (px).
+    """
+    index = PolylineIndex(ctx.pixels)
+    proj = index.project(np.vstack([anchor, ctx.anchors]))
+    seg, along = int(proj.segment[0]), float(proj.along[0])
+    reach = max(config["window_min_px"], config["window_factor"] * float(proj.distance[0]))
+
+    cumulative = index.cumulative
+    last = len(ctx.pixels) - 1
+    i0 = min(max(int(np.searchsorted(cumulative, along - reach, side="right")) - 1, 0), seg)
+    i1 = max(min(int(np.searchsorted(cumulative, along + reach, side="left")), last), min(seg + 1, last))
+
+    # Earlier anchors sit on vertices of the current polyline
+    pinned = proj.segment[1:] + np.rint(proj.fraction[1:]).astype(np.int64)
+    before, after = pinned[pinned <= seg], pinned[pinned > seg]
+    if len(before):
+        i0 = max(i0, int(before.max()))
+    if len(after):
+        i1 = min(i1, int(after.min()))
+
+    return i0, i1, proj.point[0], float(proj.distance[0])
+
+
+def _local_path(ctx: RefineContext, i0: int, i1: int, anchor: np.ndarray, config: dict) -> np.ndarray:
+    """
+    Cheapest pixel path pixels[i0] -> anchor -> pixels[i1] over the
+    centerline inside the window's crop. Gaps may be bridged with straight
+    steps, costed by how much of each step leaves the route mask.
+    """
+    start, end = ctx.pixels[i0], ctx.pixels[i1]
+    anchor = np.rint(anchor).astype(np.int64)
+    window = np.vstack([ctx.pixels[i0:i1 + 1], anchor])
+    margin = config["margin_px"]
+    x0, y0 = np.maximum(window.min(axis=0) - margin, 0).tolist()
+    x1 = min(int(window[:, 0].max()) + margin + 1, ctx.width)
+    y1 = min(int(window[:, 1].max()) + margin + 1, ctx.height)
+
+    centerline = unpack_mask(ctx.centerline, ctx.width, x0, y0, x1, y1)
+    mask = unpack_mask(ctx.mask, ctx.width, x0, y0, x1, y1) | centerline
+    graph = build_skeleton_graph(centerline)
+    n = graph.size
+
+    # Nodes: centerline pixels, then start, end and anchor (crop coordinates)
+    terminals = np.vstack([start, end, anchor]) - (x0, y0)
+    xy = np.vstack([np.column_stack([graph.xs, graph.ys]), terminals]).astype(np.float64)
+    s_node, e_node, a_node = n, n + 1, n + 2
+
+    # Centerline adjacency
+    valid = graph.neighbors >= 0
+    rows = [np.repeat(np.arange(n), valid.sum(axis=1))]
+    cols = [graph.neighbors[valid].astype(np.int64)]
+
+    # Bridges: start/end/anchor to nearby centerline pixels, centerline
+    # endpoints across gaps, and direct start-anchor-end so a path always exists
+    rows.append(np.array([s_node, a_node]))
+    cols.append(np.array([a_node, e_node]))
+    if n:
+        tree = cKDTree(xy[:n])
+        k = min(config["terminal_links"], n)
+        _, nearest = tree.query(terminals, k=k)
+        nearest = np.asarray(nearest).reshape(3, k)
+        rows.append(np.repeat([s_node, e_node, a_node], k))
+        cols.append(nearest.ravel())
+
+        ends = graph.endpoints()
+        if len(ends):
+            for end_node, near in zip(ends.tolist(), tree.query_ball_point(xy[ends], config["bridge_px"])):
+                near = np.asarray(near, dtype=np.int64)
+                rows.append(np.full(len(near), end_node))
+                cols.append(near)
+
+    rows, cols = np.concatenate(rows), np.concatenate(cols)
+    keep = rows != cols
+    rows, cols = rows[keep], cols[keep]
+    weights = _bridge_costs(xy[rows], xy[cols], mask, config["bridge_cost"], config["off_route_cost"])
+    # Centerline steps cost their length, so the walk beats a chord
+    skeleton = (rows < n) & (cols < n) & (np.abs(xy[rows] - xy[cols]).max(axis=1) <= 1)
+    weights[skeleton] = np.hypot(*(xy[rows[skeleton]] - xy[cols[skeleton]]).T)
+
+    # Bridges may duplicate centerline edges; keep the cheapest of each pair
+    lo, hi = np.minimum(rows, cols), np.maximum(rows, cols)
+    order = np.lexsort((weights, hi, lo))
+    lo, hi, weights = lo[order], hi[order], weights[order]
+    first = np.ones(len(lo), dtype=bool)
+    first[1:] = (lo[1:] != lo[:-1]) | (hi[1:] != hi[:-1])
+    size = n + 3
+    # csgraph drops explicit zeros, so zero-length links get a tiny cost
+    graph_matrix = coo_matrix(
+        (np.maximum(weights[first], 1e-6), (lo[first], hi[first])), shape=(size, size)
+    ).tocsr()
+
+    _, predecessors = dijkstra(graph_matrix, directed=False, indices=a_node, return_predecessors=True)
+    to_start = _walk(predecessors, s_node)          # start ... anchor
+    to_end = _walk(predecessors, e_node)[::-1]      # anchor ... end
+    nodes = np.concatenate([to_start, to_end[1:]])
+
+    path = np.rint(xy[nodes]).astype(np.int64) + (x0, y0)
+    # Terminals usually coincide with a centerline pixel; drop the repeats
+    moved = np.ones(len(path), dtype=bool)
+    moved[1:] = np.any(path[1:] != path[:-1], axis=1)
+    return path[moved]
+
+
+def _bridge_costs(a: np.ndarray, b: np.ndarray, mask: np.ndarray,
+                  bridge_cost: float, off_route_cost: float) -> np.ndarray:
+    """Length of each straight a->b step, weighted by how much of it leaves the mask."""
+    length = np.hypot(*(b - a).T)
+    t = np.linspace(0.0, 1.0, 8)
+    samples = np.rint(a[:, None, :] + t[None, :, None] * (b - a)[:, None, :]).astype(np.int64)
+    off = (~mask[samples[..., 1], samples[..., 0]]).mean(axis=1)
+    return length * (bridge_cost + (off_route_cost - bridge_cost) * off)
+
+
+def _walk(predecessors: np.ndarray, node: int) -> np.ndarray:
+    """Nodes from `node` back to the Dijkstra source."""
+    nodes = [node]
+    while predecessors[node] >= 0:
+        node = int(predecessors[node])
+        nodes.append(node)
+    return np.asarray(nodes, dtype=np.int64)
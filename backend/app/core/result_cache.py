@@ -0,0 +1,199 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from app.core.route_geometry import RouteGeometry
+from app.print_logging import log
+
+HASH_CHUNK = 1024 * 1024
+
+# Part of every cache key: bump when the shape of pipeline results changes
+# so entries written by older code are never read back
+RESULT_FORMAT = 3
+
+# Marker key of an encoded RouteGeometry in the disk tier's JSON
+_GEOMETRY_KEY = "__route_geometry__"
+
+
+def hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def make_cache_key(image_hash: str, bbox: dict, config: dict) -> str:
+    """
+    Content address of a pipeline result: same image bytes, same
+    (normalized) search bbox and same extractor config give the same key.
+    """
+    payload = {
+        "format": RESULT_FORMAT,
+        "image": image_hash,
+        "bbox": {k: round(float(v), 7) for k, v in sorted(bbox.items())},
+        "config": config,
+    }
+    return hashlib.sha256(
+        json.dumps(payload, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+class ResultCache:
+    """
+    Two-tier cache for pipeline results.
+
+    - memory: LRU bounded by entry count
+    - disk (optional): gzipped JSON files, oldest-accessed evicted first
+      once the directory grows past disk_max_bytes; RouteGeometry values
+      are stored as their base64 arrays (RouteGeometry.to_dict)
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 128,
+        disk_dir: str | None = None,
+        disk_max_bytes: int = 512 * 1024 * 1024,
+    ):
+        self.max_entries = max_entries
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.disk_max_bytes = disk_max_bytes
+
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes = 0
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if self.disk_dir:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            self._disk_bytes = sum(p.stat().st_size for p in self.disk_dir.glob("*.json.gz"))
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return value
+
+        value = self._read_disk(key)
+
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            self._remember(key, value)
+            return value
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        with self._lock:
+            self._remember(key, value)
+        self._write_disk(key, value)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_max_entries": self.max_entries,
+                "disk_enabled": self.disk_dir is not None,
+                "disk_bytes": self._disk_bytes,
+                "disk_max_bytes": self.disk_max_bytes,
+            }
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+
+    def _remember(self, key: str, value: Dict[str, Any]) -> None:
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_path(self, key: str) -> Path:
+        return self.disk_dir / f"{key}.json.gz"
+
+    def _read_disk(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                value = json.load(f, object_hook=_decode_json)
+            os.utime(path)  # mtime doubles as last-access for eviction
+            return value
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            log(f"result cache: dropping unreadable entry {path.name}: {e!r}")
+            path.unlink(missing_ok=True)
+            return None
+
+    def _write_disk(self, key: str, value: Dict[str, Any]) -> None:
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp = path.with_suffix(".tmp")
+        try:
+            with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=3) as f:
+                json.dump(value, f, separators=(",", ":"), default=_encode_json)
+            old = path.stat().st_size if path.exists() else 0
+            tmp.replace(path)
+        except OSError as e:
+            log(f"result cache: disk write failed for {path.name}: {e!r}")
+            tmp.unlink(missing_ok=True)
+            return
+
+        with self._lock:
+            self._disk_bytes += path.stat().st_size - old
+            if self._disk_bytes > self.disk_max_bytes:
+                self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        entries = sorted(
+            (p.stat().st_mtime, p.stat().st_size, p)
+            for p in self.disk_dir.glob("*.json.gz")
+        )
+        for _, size, path in entries:
+            if self._disk_bytes <= self.disk_max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            self._disk_bytes -= size
+
+
+def _encode_json(value):
+    if isinstance(value, RouteGeometry):
+        return {_GEOMETRY_KEY: value.to_dict()}
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _decode_json(obj: dict):
+    if _GEOMETRY_KEY in obj:
+        return RouteGeometry.from_dict(obj[_GEOMETRY_KEY])
+    return obj
+
+
+RESULT_CACHE = ResultCache(
+    max_entries=int(os.getenv("RESULT_CACHE_SIZE", "128")),
+    disk_dir=os.getenv("RESULT_CACHE_DIR") or None,
+    disk_max_bytes=int(os.getenv("RESULT_CACHE_DISK_MB", "512")) * 1024 * 1024,
+)
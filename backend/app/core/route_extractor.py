@@ -1,24 +1,76 @@
-from typing import List, Tuple
-from pathlib import Path
-from app.cv.extractor import RouteCVExtractor
+import time
+from functools import partial
+
+import numpy as np
+
+from app.core.route_geometry import RouteGeometry
+from app.core.workers import report_progress
+from app.matching.georeference import make_georeferencer
+from app.core.polyline_codec import encode_many
+from app.core.simplify import simplify_mask
 from app.print_logging import log
 
+# OpenCV (cv.extractor) and scipy (core.refine) are imported on first use:
+# the API process imports this module for EXTRACTOR_CONFIG, but only
+# worker processes run the pipeline.
+
+# Extractor settings used by the API pipeline. Part of the result cache
+# key, so changing them invalidates cached results.
+EXTRACTOR_CONFIG: dict = {
+    "ordering": "skeleton_graph",
+    "min_spur_length": 10,
+    "ridge_frac": 0.5,
+    "min_route_length": 50,
+    # Threads measuring components within one image. The worker pool
+    # already runs one process per core, so more only oversubscribes them;
+    # raise it when running the extractor on its own.
+    "component_workers": 1,
+    # Coarse-to-fine mode for images whose long side >= pyramid_min_side
+    "pyramid": "auto",
+    "pyramid_min_side": 3000,
+    "pyramid_max_side": 1024,
+    "pyramid_roi_margin": 16,
+}
+
+DEFAULT_SIMPLIFY: dict = {
+    "method": "rdp",
+    "tolerance": 1.0,
+    "units": "px",
+}
 
-def extract_image_space_polyline(image_path: str) -> tuple[list[tuple[int, int]], tuple[int, int]]:
+
+def extract_image_space_polyline(
+    image_path: str | bytes,
+    progress=None,
+    config: dict | None = None,
+    debug_dir: str | None = None,
+    timings: dict | None = None,
+    intermediates: dict | None = None
+) -> tuple[np.ndarray, tuple[int, int], float]:
     """
+    image_path may also be the encoded image bytes (in-memory uploads).
+    Debug images are only written when debug_dir is given; extractor
+    stage timings (seconds) are added to timings when given, and the
+    packed mask/centerline refinement needs to intermediates.
+
     Returns:
-      - ordered pixel polyline [(x, y), ...]
+      - ordered pixel polyline, (N, 2) int32 x/y
       - image_size (width, height)
+      - confidence of the primary route (its share of the candidates' length)
     """
+    from app.cv.extractor import RouteCVExtractor
+
     log("extract_image_space_polyline called")
-    debug_dir = Path(image_path).parent / "debug"
-    debug_dir.mkdir(exist_ok=True)
 
     extractor = RouteCVExtractor(
-        debug=True,
-        debug_dir=str(debug_dir)
+        config=EXTRACTOR_CONFIG if config is None else config,
+        debug=debug_dir is not None,
+        debug_dir=debug_dir,
+        progress=progress
     )
     result = extractor.extract(image_path)
+    if timings is not None:
+        timings.update(result.timings)
 
     if result.primary_candidate_id is None:
         raise ValueError("No valid route detected in image")
@@ -33,10 +85,131 @@ def extract_image_space_polyline(image_path: str) -> tuple[list[tuple[int, int]]
         raise ValueError("No valid route extracted from image")
 
 
+    if intermediates is not None:
+        from app.core.refine import route_intermediates
+        intermediates.update(
+            route_intermediates(result.components, (result.image_width, result.image_height))
+        )
+
     log(
         f"Primary route selected: "
         f"points={len(primary.pixel_polyline)} "
         f"confidence={result.confidence:.2f}"
     )
 
-    return primary.pixel_polyline, (result.image_width, result.image_height)
+    return primary.pixel_polyline, (result.image_width, result.image_height), result.confidence
+
+
+def run_route_pipeline(
+    image_path: str | bytes,
+    bbox: dict,
+    job_id: str | None = None,
+    config: dict | None = None,
+    debug_dir: str | None = None,
+    simplify: dict | None = None,
+    georeference: dict | None = None,
+    progress=None,
+    keep_intermediates: bool = False
+) -> dict:
+    """
+    Image -> ordered pixel polyline -> simplified polyline -> geo polyline
+    -> encoded polyline.
+
+    simplify = {"method": "rdp" | "vw" | "none", "tolerance": float,
+                "units": "px" | "m"}
+    georeference: see georeference.make_georeferencer
+    progress: callback(stage, fraction); defaults to job progress reporting
+    keep_intermediates: also return what core.refine needs to edit the
+    route later ("intermediates")
+
+    The route comes back as one RouteGeometry (full-resolution arrays plus
+    the simplification mask and both encoded polylines), together with
+    point counts and per-stage timings.
+
+    Runs inside a CV worker process (see core.workers), so it only takes
+    and returns picklable values.
+    """
+    progress = progress or partial(report_progress, job_id)
+    simplify = {**DEFAULT_SIMPLIFY, **(simplify or {})}
+    timings = {}
+    intermediates = {} if keep_intermediates else None
+
+    t = time.perf_counter()
+    image_polyline, image_size, confidence = extract_image_space_polyline(
+        image_path, progress=progress, config=config, debug_dir=debug_dir,
+        timings=timings, intermediates=intermediates
+    )
+    timings["extract"] = time.perf_counter() - t
+
+    georef = make_georeferencer(bbox, image_size, georeference)
+
+    progress("simplify", 0.75)
+    t = time.perf_counter()
+    tolerance = simplify["tolerance"]
+    if simplify["units"] == "m":
+        tolerance /= georef.meters_per_pixel(image_size)
+    keep = simplify_mask(image_polyline, simplify["method"], tolerance)
+    timings["simplify"] = time.perf_counter() - t
+
+    progress("georeference", 0.8)
+    t = time.perf_counter()
+    geo = georef.pixels_to_geo(image_polyline)
+    geo_simplified = geo[keep]
+    timings["georeference"] = time.perf_counter() - t
+
+    progress("encode", 0.9)
+    t = time.perf_counter()
+    encoded, encoded_simplified = encode_many([geo, geo_simplified])[5]
+    timings["encode"] = time.perf_counter() - t
+
+    points_full = len(image_polyline)
+    points_simplified = len(geo_simplified)
+    log(
+        f"pipeline points={points_full}->{points_simplified} "
+        + " ".join(f"{k}={v * 1e3:.1f}ms" for k, v in timings.items())
+    )
+
+    if intermediates is not None:
+        intermediates.update({
+            "bbox": bbox,
+            "georeference": georeference,
+            "simplify_method": simplify["method"],
+            "tolerance_px": tolerance,
+        })
+
+    return {
+        "intermediates": intermediates,
+        "geometry": RouteGeometry(image_polyline, geo, keep, encoded, encoded_simplified),
+        "image_size": image_size,
+        "confidence": round(confidence, 4),
+        "stats": {
+            "points_full": points_full,
+            "points_simplified": points_simplified,
+            "reduction": 1.0 - points_simplified / points_full if points_full else 0.0,
+            "simplification": simplify,
+            "georeference": {"transform": georef.kind, "residual_m": georef.residual_m},
+            "timings_ms": {k: round(v * 1e3, 2) for k, v in timings.items()},
+        },
+    }
+
+
+def warm_up_pipeline() -> float:
+    """
+    Runs a tiny synthetic route through the pipeline so the calling
+    process has imported OpenCV/scipy and touched every stage once.
+    Returns the seconds it took.
+    """
+    import cv2
+
+    t = time.perf_counter()
+    img = np.full((120, 160, 3), 255, dtype=np.uint8)
+    cv2.ellipse(img, (80, 60), (60, 40), 0, 0, 300, (0, 0, 255), 4)
+    ok, png = cv2.imencode(".png", img)
+    run_route_pipeline(
+        png.tobytes(),
+        {"north": 0.01, "south": 0.0, "east": 0.01, "west": 0.0},
+        config=EXTRACTOR_CONFIG,
+        progress=lambda stage, fraction: None,
+        keep_intermediates=True,
+    )
+    return time.perf_counter() - t
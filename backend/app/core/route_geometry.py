@@ -0,0 +1,135 @@
+"""
+Compact route representation shared by the pipeline, the result cache
+and the API.
+
+A route is kept as three contiguous arrays instead of per-point Python
+objects: 30k points take ~0.7 MB rather than several MB of tuples and
+LatLng models. Points only become Python values when a response is
+written, and the JSON helpers below format them straight from the arrays.
+"""
+import base64
+
+import numpy as np
+
+RESOLUTIONS = ("full", "simplified")
+# What the API serves unless ?resolution= says otherwise, for previews
+# and downloads alike: the simplified polyline stays within the simplify
+# tolerance (1 px by default) of the full one at a fraction of the points
+DEFAULT_RESOLUTION = "simplified"
+
+# Decimals of lat/lon in JSON output: 1e-7 degrees is about 1 cm, far
+# below a pixel, and fixed-point formats ~4x faster than float repr()
+JSON_DECIMALS = 7
+_GEO_ROW = '{"lat":%%.%df,"lng":%%.%df}' % (JSON_DECIMALS, JSON_DECIMALS)
+
+
+class RouteGeometry:
+    """
+    Full-resolution polyline of one route:
+
+    - pixels: (N, 2) int32 image x/y
+    - geo:    (N, 2) float64 lat/lon of the same vertices
+    - keep:   (N,) bool, vertices of the simplified polyline
+
+    plus the encoded polyline of both resolutions. Treated as immutable
+    (edits build a new instance via splice), so one instance can be shared
+    by the result cache and any number of routes.
+    """
+
+    __slots__ = ("pixels", "geo", "keep", "encoded", "encoded_simplified")
+
+    def __init__(self, pixels, geo, keep, encoded: str = "", encoded_simplified: str = ""):
+        self.pixels = np.ascontiguousarray(pixels, dtype=np.int32).reshape(-1, 2)
+        self.geo = np.ascontiguousarray(geo, dtype=np.float64).reshape(-1, 2)
+        self.keep = np.ascontiguousarray(keep, dtype=bool).reshape(-1)
+        if not len(self.pixels) == len(self.geo) == len(self.keep):
+            raise ValueError("pixels, geo and keep must have the same length")
+        self.encoded = encoded
+        self.encoded_simplified = encoded_simplified
+
+    def __len__(self) -> int:
+        return len(self.pixels)
+
+    def __repr__(self) -> str:
+        return f"RouteGeometry(points={len(self)}, simplified={self.points_simplified})"
+
+    @property
+    def points_simplified(self) -> int:
+        return int(np.count_nonzero(self.keep))
+
+    @property
+    def nbytes(self) -> int:
+        return self.pixels.nbytes + self.geo.nbytes + self.keep.nbytes
+
+    def pixel_points(self, resolution: str = "full") -> np.ndarray:
+        return self.pixels[self.keep] if _simplified(resolution) else self.pixels
+
+    def geo_points(self, resolution: str = "full") -> np.ndarray:
+        return self.geo[self.keep] if _simplified(resolution) else self.geo
+
+    def encoded_at(self, resolution: str = "full") -> str:
+        return self.encoded_simplified if _simplified(resolution) else self.encoded
+
+    def splice(self, i0: int, i1: int, pixels, geo, keep) -> "RouteGeometry":
+        """
+        New geometry with vertices i0..i1 (inclusive) replaced. The encoded
+        polylines are left empty; the caller re-encodes once after a
+        series of splices.
+        """
+        return RouteGeometry(
+            np.concatenate([self.pixels[:i0], np.asarray(pixels, dtype=np.int32), self.pixels[i1 + 1:]]),
+            np.concatenate([self.geo[:i0], geo, self.geo[i1 + 1:]]),
+            np.concatenate([self.keep[:i0], keep, self.keep[i1 + 1:]]),
+        )
+
+    # ------------------------------------------------------------------
+    # Serialization
+    # ------------------------------------------------------------------
+
+    def geo_json(self, resolution: str = "full") -> str:
+        """JSON array of {"lat", "lng"} objects, formatted in one pass."""
+        return _format_rows(_GEO_ROW, self.geo_points(resolution))
+
+    def pixels_json(self, resolution: str = "full") -> str:
+        """JSON array of [x, y] pairs."""
+        return _format_rows("[%d,%d]", self.pixel_points(resolution))
+
+    def to_dict(self) -> dict:
+        """JSON-safe form for the result cache: raw little-endian arrays, base64."""
+        return {
+            "points": len(self),
+            "pixels": _b64(self.pixels.astype("<i4", copy=False)),
+            "geo": _b64(self.geo.astype("<f8", copy=False)),
+            "keep": _b64(np.packbits(self.keep)),
+            "encoded": self.encoded,
+            "encoded_simplified": self.encoded_simplified,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "RouteGeometry":
+        n = data["points"]
+        return cls(
+            np.frombuffer(base64.b64decode(data["pixels"]), dtype="<i4").reshape(n, 2),
+            np.frombuffer(base64.b64decode(data["geo"]), dtype="<f8").reshape(n, 2),
+            np.unpackbits(np.frombuffer(base64.b64decode(data["keep"]), dtype=np.uint8), count=n).astype(bool),
+            data["encoded"],
+            data["encoded_simplified"],
+        )
+
+
+def _simplified(resolution: str) -> bool:
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"Unknown resolution: {resolution}")
+    return resolution == "simplified"
+
+
+def _format_rows(row: str, values: np.ndarray) -> str:
+    # One %-format over a repeated template: no per-point dicts or tuples
+    if not len(values):
+        return "[]"
+    return "[" + ",".join([row] * len(values)) % tuple(values.ravel().tolist()) + "]"
+
+
+def _b64(array: np.ndarray) -> str:
+    return base64.b64encode(np.ascontiguousarray(array).tobytes()).decode("ascii")
+
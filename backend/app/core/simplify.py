@@ -0,0 +1,113 @@
+import heapq
+from typing import Literal
+
+import numpy as np
+
+SimplifyMethod = Literal["rdp", "vw", "none"]
+
+
+def rdp_mask(points, tolerance: float) -> np.ndarray:
+    """
+    Ramer–Douglas–Peucker. Returns a boolean mask of the points to keep.
+
+    Iterative (no recursion limit on long routes); each split measures all
+    perpendicular distances of its span in one vectorized step.
+    """
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    n = len(pts)
+    keep = np.zeros(n, dtype=bool)
+    if n < 3:
+        keep[:] = True
+        return keep
+
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+
+        a, b = pts[start], pts[end]
+        span = pts[start + 1:end]
+        dx, dy = b - a
+        norm = np.hypot(dx, dy)
+        if norm == 0.0:
+            # Closed loops start and end on the same point
+            dist = np.hypot(span[:, 0] - a[0], span[:, 1] - a[1])
+        else:
+            dist = np.abs(dx * (span[:, 1] - a[1]) - dy * (span[:, 0] - a[0])) / norm
+
+        i = int(np.argmax(dist))
+        if dist[i] > tolerance:
+            split = start + 1 + i
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+
+    return keep
+
+
+def visvalingam_mask(points, tolerance: float) -> np.ndarray:
+    """
+    Visvalingam–Whyatt. Repeatedly drops the point whose triangle with
+    its neighbours has the smallest area, until every remaining triangle
+    is at least tolerance**2 / 2 (so tolerance reads as a length, like
+    RDP). Returns a boolean mask of the points to keep.
+    """
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    n = len(pts)
+    if n < 3:
+        return np.ones(n, dtype=bool)
+
+    threshold = tolerance * tolerance / 2.0
+    xs, ys = pts[:, 0].tolist(), pts[:, 1].tolist()
+
+    def area(i, j, k):
+        return 0.5 * abs(
+            (xs[j] - xs[i]) * (ys[k] - ys[i]) - (xs[k] - xs[i]) * (ys[j] - ys[i])
+        )
+
+    # Initial areas for all interior points in one shot
+    a, b, c = pts[:-2], pts[1:-1], pts[2:]
+    initial = 0.5 * np.abs(
+        (b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1])
+        - (c[:, 0] - a[:, 0]) * (b[:, 1] - a[:, 1])
+    )
+
+    areas = [float("inf")] + initial.tolist() + [float("inf")]
+    prev = list(range(-1, n - 1))
+    nxt = list(range(1, n + 1))
+    heap = [(areas[i], i) for i in range(1, n - 1)]
+    heapq.heapify(heap)
+
+    alive = [True] * n
+    while heap:
+        value, i = heapq.heappop(heap)
+        if not alive[i] or value != areas[i]:
+            continue  # stale entry
+        if value >= threshold:
+            break
+
+        alive[i] = False
+        p, q = prev[i], nxt[i]
+        nxt[p], prev[q] = q, p
+
+        # Neighbours never drop below the area just removed, which keeps
+        # the elimination order monotonic
+        for j in (p, q):
+            if 0 < j < n - 1:
+                areas[j] = max(area(prev[j], j, nxt[j]), value)
+                heapq.heappush(heap, (areas[j], j))
+
+    return np.array(alive, dtype=bool)
+
+
+def simplify_mask(points, method: SimplifyMethod = "rdp", tolerance: float = 1.0) -> np.ndarray:
+    if method == "none" or tolerance <= 0:
+        return np.ones(len(points), dtype=bool)
+    if method == "rdp":
+        return rdp_mask(points, tolerance)
+    if method == "vw":
+        return visvalingam_mask(points, tolerance)
+    raise ValueError(f"Unknown simplification method: {method}")
@@ -1,8 +1,11 @@
 import uuid
-from typing import Dict, Any
+from typing import Dict, Any, List
 
 ROUTES: Dict[str, Dict[str, Any]] = {}
 JOBS: Dict[str, Dict[str, Any]] = {}
+BATCHES: Dict[str, Dict[str, Any]] = {}
+
+TERMINAL_JOB_STATES = ("completed", "failed")
 
 
 def create_route() -> str:
@@ -10,18 +13,51 @@ def create_route() -> str:
     ROUTES[route_id] = {
         "status": "uploaded",
         "image_path": None,
-        "polyline": None,
+        "image_bytes": None,
+        "image_hash": None,
+        "geometry": None,  # RouteGeometry once processed
         "confidence": None,
-        "search_scope": None
+        "search_scope": None,
+        "job_id": None,
+        "debug_dir": None
     }
     return route_id
 
 
+def create_batch(items: List[Dict[str, Any]]) -> str:
+    """items: one {"filename", "route_id", "error"} per uploaded file."""
+    batch_id = f"bt_{uuid.uuid4().hex[:8]}"
+    BATCHES[batch_id] = {
+        "status": "uploaded",
+        "items": items,
+    }
+    return batch_id
+
+
 def create_job(route_id: str) -> str:
     job_id = f"job_{uuid.uuid4().hex[:8]}"
     JOBS[job_id] = {
         "route_id": route_id,
         "status": "processing",
-        "progress": 0.0
+        "stage": "queued",
+        "progress": 0.0,
+        "error": None
     }
     return job_id
+
+
+def update_job_progress(job_id: str, stage: str, progress: float) -> None:
+    job = JOBS.get(job_id)
+    # Progress messages can arrive after the job finished; never regress it.
+    if job is None or job["status"] in TERMINAL_JOB_STATES:
+        return
+    job["stage"] = stage
+    job["progress"] = max(job["progress"], progress)
+
+
+def route_progress(route: Dict[str, Any]) -> tuple:
+    """(progress, message) of a route's current job."""
+    job = JOBS.get(route.get("job_id"))
+    if job is None:
+        return (1.0 if route["status"] == "completed" else 0.0), None
+    return job["progress"], job["error"] or job["stage"]
@@ -0,0 +1,75 @@
+import asyncio
+import importlib
+import os
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+from app.core.workers import MAX_WORKERS, discard_executor, get_executor
+from app.print_logging import log
+
+# WARMUP=0 skips the warm-up; the service is then ready immediately and
+# the first requests pay for worker start-up and imports instead.
+WARMUP_ENABLED = os.getenv("WARMUP", "1") != "0"
+
+# Lazily imported modules the API process itself runs (refine pulls in
+# scipy); imported off the event loop during warm-up.
+API_MODULES = (
+    "app.core.refine",
+)
+
+# "pending" -> "warming" -> "ready" | "failed"; read by GET /ready
+WARMUP_STATE: dict = {
+    "status": "ready" if not WARMUP_ENABLED else "pending",
+    "seconds": None,
+    "workers": 0,
+    "error": None,
+}
+
+_task: asyncio.Task | None = None
+
+
+def is_ready() -> bool:
+    return WARMUP_STATE["status"] == "ready"
+
+
+def start_warmup() -> asyncio.Task | None:
+    """Schedules the warm-up in the background; call once at startup."""
+    global _task
+    if not WARMUP_ENABLED or _task is not None:
+        return _task
+    _task = asyncio.create_task(_warm_up())
+    return _task
+
+
+async def _warm_up() -> None:
+    from app.core.route_extractor import warm_up_pipeline
+
+    WARMUP_STATE["status"] = "warming"
+    started = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    try:
+        await asyncio.to_thread(_import_api_modules)
+        # One tiny job per worker slot: the pool spawns a process for each
+        # while the others are busy, so every worker gets imported and warm
+        executor = get_executor()
+        seconds = await asyncio.gather(*(
+            loop.run_in_executor(executor, warm_up_pipeline) for _ in range(MAX_WORKERS)
+        ))
+    except Exception as e:
+        if isinstance(e, BrokenProcessPool):
+            discard_executor(executor)
+        log(f"warm-up failed: {e!r}", level="error")
+        WARMUP_STATE.update({"status": "failed", "error": str(e)})
+        return
+
+    WARMUP_STATE.update({
+        "status": "ready",
+        "seconds": round(time.perf_counter() - started, 3),
+        "workers": len(seconds),
+    })
+    log(f"warm-up done workers={len(seconds)} seconds={WARMUP_STATE['seconds']}")
+
+
+def _import_api_modules() -> None:
+    for name in API_MODULES:
+        importlib.import_module(name)
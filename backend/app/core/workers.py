@@ -0,0 +1,109 @@
+import multiprocessing as mp
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from app.core.job_events import publish_job
+from app.core.storage import update_job_progress
+from app.print_logging import log
+
+# Size of the CV worker pool. Defaults to one process per core.
+MAX_WORKERS = int(os.getenv("ROUTE_WORKERS", "0")) or (os.cpu_count() or 1)
+
+_executor: ProcessPoolExecutor | None = None
+_progress_queue = None
+_drain_thread: threading.Thread | None = None
+_lock = threading.Lock()
+
+# Set inside worker processes by _init_worker.
+_worker_queue = None
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """Returns the shared CV process pool, creating it on first use."""
+    global _executor, _progress_queue, _drain_thread
+
+    with _lock:
+        if _executor is None:
+            # spawn, not fork: the API process runs threads (uvicorn, the
+            # progress drain) that must not be duplicated into workers.
+            ctx = mp.get_context("spawn")
+            _progress_queue = ctx.Queue()
+            _drain_thread = threading.Thread(
+                target=_drain_progress, args=(_progress_queue,), daemon=True
+            )
+            _drain_thread.start()
+            _executor = ProcessPoolExecutor(
+                max_workers=MAX_WORKERS,
+                mp_context=ctx,
+                initializer=_init_worker,
+                initargs=(_progress_queue,),
+            )
+            log(f"CV worker pool started workers={MAX_WORKERS}")
+
+    return _executor
+
+
+def discard_executor(executor: ProcessPoolExecutor) -> None:
+    """
+    Drops a pool that raised BrokenProcessPool (a worker died: OOM kill,
+    segfault in native code). A broken pool never recovers, so the next
+    get_executor() starts a fresh one. No-op when the pool was already
+    replaced by another job that hit the same failure.
+    """
+    global _executor, _progress_queue, _drain_thread
+
+    with _lock:
+        if executor is not _executor:
+            return
+        executor.shutdown(wait=False, cancel_futures=True)
+        _progress_queue.put(None)
+        _executor = _progress_queue = _drain_thread = None
+        log("CV worker pool broken, a new one starts on the next job", level="error")
+
+
+def shutdown_executor() -> None:
+    global _executor, _progress_queue, _drain_thread
+
+    with _lock:
+        if _executor is None:
+            return
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _progress_queue.put(None)
+        _drain_thread.join(timeout=5)
+        _executor = _progress_queue = _drain_thread = None
+        log("CV worker pool stopped")
+
+
+def report_progress(job_id: str | None, stage: str, progress: float) -> None:
+    """
+    Records per-stage progress for a job. Safe to call from a worker
+    process (goes through the progress queue) or from the API process.
+    """
+    if job_id is None:
+        return
+    if _worker_queue is not None:
+        _worker_queue.put((job_id, stage, progress))
+    else:
+        update_job_progress(job_id, stage, progress)
+        publish_job(job_id)
+
+
+def _init_worker(queue) -> None:
+    global _worker_queue
+    _worker_queue = queue
+
+    # One process per core already; OpenCV's own thread pool would only
+    # oversubscribe the machine.
+    import cv2
+    cv2.setNumThreads(1)
+
+
+def _drain_progress(queue) -> None:
+    while True:
+        item = queue.get()
+        if item is None:
+            return
+        job_id, stage, progress = item
+        update_job_progress(job_id, stage, progress)
+        publish_job(job_id)
@@ -0,0 +1,60 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict
+
+import cv2
+
+from app.print_logging import log
+
+# PNG encoding of full-resolution debug images is slow; do it off the
+# extraction path. One thread keeps disk writes sequential.
+_ENCODER = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cv-debug")
+
+
+class DebugArtifactWriter:
+    """
+    Queues debug images for PNG encoding on a background thread.
+
+    Images are written as-is later, so callers must not modify an array
+    after handing it to save(), and must flush() before reporting the
+    artifacts as available.
+    """
+
+    def __init__(self, debug_dir: str):
+        self.debug_dir = Path(debug_dir)
+        self.debug_dir.mkdir(parents=True, exist_ok=True)
+        self.paths: Dict[str, str] = {}
+        self._pending = []
+
+    def save(self, name: str, image) -> None:
+        path = self.debug_dir / f"{name}.png"
+        self.paths[name] = str(path)
+        self._pending.append((name, _ENCODER.submit(_write_png, path, image)))
+
+    def flush(self) -> None:
+        """
+        Waits for every queued image. A failed write is logged and dropped
+        from paths; debug output never fails the extraction.
+        """
+        for name, future in self._pending:
+            try:
+                future.result()
+            except Exception as e:
+                self.paths.pop(name, None)
+                log(f"[CV] debug artifact {name} not written: {e!r}", level="error")
+        self._pending.clear()
+
+
+def _write_png(path: Path, image) -> None:
+    ok, png = cv2.imencode(".png", image)
+    if not ok:
+        raise ValueError(f"PNG encoding failed for {path.name}")
+    # Write under a name the *.png listing never matches, so readers never
+    # see a partial file
+    tmp = path.with_name(path.name + ".part")
+    try:
+        tmp.write_bytes(png.tobytes())
+        tmp.replace(path)
+    except OSError:
+        tmp.unlink(missing_ok=True)
+        raise
@@ -1,108 +1,147 @@
 import cv2
 import numpy as np
-from typing import List
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, NamedTuple, Tuple
 
 from .models import RouteComponent, CVExtractionResult
 from .utils import (
     extract_centerline,
     order_points_nearest_neighbor,
     compute_polyline_length,
+    compute_turning_curvature,
 )
+from .skeleton_graph import build_skeleton_graph, order_skeleton_graph
+from .debug_artifacts import DebugArtifactWriter
+from app.ai.llm_client import LLMClient
+from app.ai.route_reasoner import RouteReasoner
+from app.core.metrics import span
 from app.print_logging import log
 
 
+class _ComponentSpec(NamedTuple):
+    mask: np.ndarray                      # component crop with a 1px border
+    offset: Tuple[int, int]               # crop origin in image space
+    color_counts: Dict[str, int]
+    area: int
+    bounding_box: Tuple[int, int, int, int]
+
+
 class RouteCVExtractor:
-    def __init__(self, config=None, debug: bool = False, debug_dir: str | None = None):
+    def __init__(self, config=None, debug: bool = False, debug_dir: str | None = None, progress=None, reasoner=None):
         self.config = config or {}
         self.debug = debug
         self.debug_dir = debug_dir
+        # Optional callback(stage, fraction) for job progress reporting
+        self.progress = progress
+        self.reasoner = reasoner or RouteReasoner(LLMClient())
 
     # ------------------------------------------------------------------
     # Public entry
     # ------------------------------------------------------------------
 
-    def extract(self, image_path: str) -> CVExtractionResult:
-        log(f"[CV] extract start: {image_path}")
+    def extract(self, image_path: str | bytes) -> CVExtractionResult:
+        timings: Dict[str, float] = {}
+        with span("decode", timings):
+            img = self._load_image(image_path)
 
-        img = cv2.imread(image_path)
-        if img is None:
-            raise ValueError("Invalid image path")
+        artifacts = DebugArtifactWriter(self.debug_dir) if self.debug else None
+        try:
+            return self._extract(img, artifacts, timings)
+        finally:
+            # PNGs encode in the background while extraction goes on; they
+            # are all on disk before anyone is told where they are
+            if artifacts:
+                artifacts.flush()
 
+    def _extract(self, img, artifacts, timings: Dict[str, float]) -> CVExtractionResult:
         h, w = img.shape[:2]
-        hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
 
-        # 1. Color segmentation
-        mask = self._segment_route(hsv)
-        if self.debug:
-            cv2.imwrite(f"{self.debug_dir}/01_mask.png", mask)
+        if self._use_pyramid(w, h):
+            # 1-3. Coarse segmentation to find route ROIs, then full
+            # resolution segmentation/cleanup inside them only
+            specs = self._pyramid_components(img, artifacts, timings)
+        else:
+            # 1. Color segmentation
+            self._report("segment", 0.1)
+            with span("segment", timings):
+                hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
+                colors = self._color_masks(hsv)
+                mask = self._segment_route(hsv, colors)
+            if artifacts:
+                artifacts.save("01_mask", mask)
 
-        # 2. Cleanup
-        mask = self._cleanup(mask)
-        if self.debug:
-            cv2.imwrite(f"{self.debug_dir}/02_cleaned.png", mask)
+            # 2. Cleanup
+            self._report("cleanup", 0.2)
+            with span("cleanup", timings):
+                mask = self._cleanup(mask)
+            if artifacts:
+                artifacts.save("02_cleaned", mask)
 
-        # 3. Centerline extraction (KEY CHANGE)
-        centerline = extract_centerline(mask)
-        if self.debug:
-            cv2.imwrite(f"{self.debug_dir}/03_centerline.png", centerline)
+            # 3. Split into connected components, dropping small noise
+            self._report("components", 0.25)
+            with span("components", timings):
+                specs = self._split_components(mask, colors, image_size=(w, h))
 
-        ys, xs = np.where(centerline > 0)
-        points = list(zip(xs.tolist(), ys.tolist()))
+        if not specs:
+            log("[CV] no components above min area")
+            return self._empty_result(w, h, timings)
 
-        if len(points) < 20:
+        # 4. Centerline, ordering and metrics per component (in parallel)
+        self._report("centerline", 0.3)
+        components = self._measure_components(specs, timings)
+        if not components:
             log("[CV] centerline too small")
-            return self._empty_result(w, h)
+            return self._empty_result(w, h, timings)
 
-        # 4. Order into polyline
-        ordered = order_points_nearest_neighbor(points)
-        length = compute_polyline_length(ordered)
-
-        component = RouteComponent(
-            id=1,
-            pixel_polyline=ordered,
-            pixel_length=length,
-            endpoints=[ordered[0], ordered[-1]],
-            loops=False,
-            avg_width=3.0,
-            width_std=0.5,
-            curvature=0.0,
-            self_intersections=0,
-            color_profile={},
-            dominant_color="red",
-            is_closed_shape=False,
-            is_candidate_route=True,
-            bounding_box=(
-                min(xs), min(ys), max(xs), max(ys)
-            ),
-        )
+        with span("choose", timings):
+            primary, confidence = self._choose_primary(components)
 
-        # Debug overlay
-        if self.debug:
-            vis = img.copy()
-            for x, y in ordered:
-                cv2.circle(vis, (x, y), 1, (0, 255, 0), -1)
-            cv2.imwrite(f"{self.debug_dir}/04_polyline.png", vis)
+        if artifacts:
+            self._save_overlays(artifacts, img, components, primary)
 
-        log(f"[CV] extracted route points={len(ordered)} length={length:.1f}")
+        log(
+            f"[CV] extracted components={len(components)} primary={primary.id} "
+            f"points={len(primary.pixel_polyline)} length={primary.pixel_length:.1f}"
+        )
 
         return CVExtractionResult(
             image_width=w,
             image_height=h,
-            components=[component],
-            primary_candidate_id=1,
-            confidence=1.0,
-            debug_artifacts={},
+            components=components,
+            primary_candidate_id=primary.id,
+            confidence=confidence,
+            debug_artifacts=artifacts.paths if artifacts else {},
+            timings=timings,
         )
 
     # ------------------------------------------------------------------
     # Helpers
     # ------------------------------------------------------------------
 
-    def _segment_route(self, hsv):
+    def _load_image(self, source):
+        # Encoded bytes are decoded straight from memory, paths from disk.
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            log(f"[CV] extract start: <{len(source)} bytes in memory>")
+            img = cv2.imdecode(np.frombuffer(source, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if img is None:
+                raise ValueError("Invalid image data")
+            return img
+
+        log(f"[CV] extract start: {source}")
+        img = cv2.imread(source)
+        if img is None:
+            raise ValueError("Invalid image path")
+        return img
+
+    def _color_masks(self, hsv) -> Dict[str, np.ndarray]:
         blue = cv2.inRange(hsv, (90, 50, 50), (130, 255, 255))
         red1 = cv2.inRange(hsv, (0, 50, 50), (10, 255, 255))
         red2 = cv2.inRange(hsv, (170, 50, 50), (180, 255, 255))
-        return cv2.bitwise_or(blue, red1 | red2)
+        return {"red": red1 | red2, "blue": blue}
+
+    def _segment_route(self, hsv, colors=None):
+        colors = colors or self._color_masks(hsv)
+        return cv2.bitwise_or(colors["blue"], colors["red"])
 
     def _cleanup(self, mask):
         kernel = np.ones((3, 3), np.uint8)
@@ -110,7 +149,268 @@ class RouteCVExtractor:
         mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel, iterations=1)
         return mask
 
-    def _empty_result(self, w, h):
+    def _use_pyramid(self, w, h) -> bool:
+        mode = self.config.get("pyramid", False)
+        if mode == "auto":
+            return max(w, h) >= self.config.get("pyramid_min_side", 3000)
+        return bool(mode)
+
+    def _pyramid_components(self, img, artifacts, timings: Dict[str, float]) -> List[tuple]:
+        """
+        Segments a downscaled copy (long side = pyramid_max_side) to find
+        route regions, then segments, cleans and labels only those regions
+        at full resolution. Offsets keep everything in original image space.
+
+        Lower pyramid_max_side is faster but may lose very thin or faint
+        lines; pyramid_roi_margin (full-res px) pads each region.
+        """
+        h, w = img.shape[:2]
+        # Integer factors keep INTER_AREA on its fast path
+        factor = max(int(np.ceil(max(w, h) / self.config.get("pyramid_max_side", 1024))), 1)
+        scale = 1.0 / factor
+
+        self._report("segment", 0.1)
+        with span("segment_lowres", timings):
+            small = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            small_mask = self._segment_route(cv2.cvtColor(small, cv2.COLOR_BGR2HSV))
+            # Thin lines get diluted by the downscale; grow them back a little
+            small_mask = cv2.dilate(small_mask, np.ones((3, 3), np.uint8))
+            rois = self._pyramid_rois(small_mask, scale, w, h)
+        if artifacts:
+            artifacts.save("01_mask_lowres", small_mask)
+
+        log(f"[CV] pyramid scale={scale:.3f} rois={len(rois)}")
+
+        self._report("cleanup", 0.2)
+        specs = []
+        for x0, y0, x1, y1 in rois:
+            with span("segment", timings):
+                hsv = cv2.cvtColor(img[y0:y1, x0:x1], cv2.COLOR_BGR2HSV)
+                colors = self._color_masks(hsv)
+                mask = self._segment_route(hsv, colors)
+            with span("cleanup", timings):
+                mask = self._cleanup(mask)
+            with span("components", timings):
+                specs.extend(self._split_components(mask, colors, offset=(x0, y0), image_size=(w, h)))
+
+        if artifacts:
+            vis = img.copy()
+            for x0, y0, x1, y1 in rois:
+                cv2.rectangle(vis, (x0, y0), (x1 - 1, y1 - 1), (255, 0, 255), 3)
+            artifacts.save("02_rois", vis)
+
+        # Keep ids ordered by size across regions
+        specs.sort(key=lambda spec: -spec.area)
+        return specs
+
+    def _pyramid_rois(self, small_mask, scale, w, h) -> List[tuple]:
+        n, _, stats, _ = cv2.connectedComponentsWithStats(small_mask, connectivity=8)
+        min_area = self.config.get("min_component_area", max(50, int(2e-5 * w * h))) * scale * scale
+        margin = self.config.get("pyramid_roi_margin", 16)
+
+        boxes = []
+        for x, y, bw, bh, area in stats[1:].tolist():
+            if area < max(min_area, 1):
+                continue
+            boxes.append([
+                max(int(x / scale) - margin, 0),
+                max(int(y / scale) - margin, 0),
+                min(int(np.ceil((x + bw) / scale)) + margin, w),
+                min(int(np.ceil((y + bh) / scale)) + margin, h),
+            ])
+
+        # Merge overlapping boxes so no component is split between regions
+        merged = True
+        while merged:
+            merged = False
+            out = []
+            for box in boxes:
+                for other in out:
+                    if box[0] < other[2] and other[0] < box[2] and box[1] < other[3] and other[1] < box[3]:
+                        other[:] = [
+                            min(box[0], other[0]), min(box[1], other[1]),
+                            max(box[2], other[2]), max(box[3], other[3]),
+                        ]
+                        merged = True
+                        break
+                else:
+                    out.append(box)
+            boxes = out
+
+        return [tuple(b) for b in boxes]
+
+    def _split_components(self, mask, colors, offset=(0, 0), image_size=None) -> List[_ComponentSpec]:
+        """
+        Labels the cleaned mask and returns a spec per component that is
+        large enough, largest first.
+        """
+        n, labels, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+        if n <= 1:
+            return []
+
+        w, h = image_size or mask.shape[1::-1]
+        min_area = self.config.get("min_component_area", max(50, int(2e-5 * w * h)))
+        areas = stats[:, cv2.CC_STAT_AREA]
+        keep = np.flatnonzero(areas >= min_area)
+        keep = keep[keep != 0]
+        keep = keep[np.argsort(-areas[keep], kind="stable")]
+
+        # Coloured pixel counts for every label in one bincount per colour
+        color_counts = {
+            name: np.bincount(labels[cm > 0], minlength=n)
+            for name, cm in colors.items()
+        }
+
+        specs = []
+        for label in keep.tolist():
+            x, y, bw, bh = stats[label, :4].tolist()
+            sub = (labels[y:y + bh, x:x + bw] == label).astype(np.uint8) * 255
+            sub = cv2.copyMakeBorder(sub, 1, 1, 1, 1, cv2.BORDER_CONSTANT, value=0)
+            gx, gy = offset[0] + x, offset[1] + y
+            specs.append(_ComponentSpec(
+                mask=sub,
+                offset=(gx - 1, gy - 1),
+                color_counts={name: int(c[label]) for name, c in color_counts.items()},
+                area=int(areas[label]),
+                bounding_box=(gx, gy, gx + bw - 1, gy + bh - 1),
+            ))
+
+        log(f"[CV] components kept={len(specs)} dropped={n - 1 - len(specs)} min_area={min_area}")
+        return specs
+
+    def _measure_components(self, specs, timings: Dict[str, float]) -> List[RouteComponent]:
+        workers = min(self.config.get("component_workers", 1), len(specs))
+        total = len(specs)
+        results = [None] * total
+        # One timings dict per component so threads never share one
+        parts = [{} for _ in specs]
+
+        if workers <= 1:
+            for i, spec in enumerate(specs):
+                results[i] = self._measure_component(i + 1, spec, parts[i])
+                self._report("ordering", 0.3 + 0.4 * (i + 1) / total)
+        else:
+            # OpenCV and numpy release the GIL for the heavy parts
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = {
+                    pool.submit(self._measure_component, i + 1, spec, parts[i]): i
+                    for i, spec in enumerate(specs)
+                }
+                for done, future in enumerate(as_completed(futures), start=1):
+                    results[futures[future]] = future.result()
+                    self._report("ordering", 0.3 + 0.4 * done / total)
+
+        for part in parts:
+            for stage, seconds in part.items():
+                timings[stage] = timings.get(stage, 0.0) + seconds
+
+        return [c for c in results if c is not None]
+
+    def _measure_component(self, component_id, spec: _ComponentSpec, timings: Dict[str, float]) -> RouteComponent | None:
+        with span("centerline", timings):
+            centerline, dist = extract_centerline(
+                spec.mask,
+                ridge_frac=self.config.get("ridge_frac", 0.5),
+                return_distance=True,
+            )
+            graph = build_skeleton_graph(centerline)
+        if graph.size < 20:
+            return None
+
+        ox, oy = spec.offset
+        with span("ordering", timings):
+            local = np.asarray(self._order(graph), dtype=np.int64)
+        ordered_arr = local + (ox, oy)
+        length = compute_polyline_length(ordered_arr)
+
+        # Route width = twice the distance to background along the centerline
+        widths = 2.0 * dist[graph.ys, graph.xs]
+        avg_width = float(widths.mean())
+
+        # Cyclomatic number E - V + C counts independent loops in the skeleton
+        pieces = cv2.connectedComponents(centerline, connectivity=8)[0] - 1
+        cycles = max(graph.edge_count - graph.size + pieces, 0)
+
+        ends = graph.endpoints()
+        gap = float(np.hypot(*(ordered_arr[0] - ordered_arr[-1])))
+        is_closed = len(ends) == 0 or gap <= max(3.0 * avg_width, 5.0)
+        # A closed course is one loop by itself; any extra loop is a crossing
+        self_intersections = max(cycles - (1 if is_closed else 0), 0)
+
+        color_counts = spec.color_counts
+        total = sum(color_counts.values())
+        color_profile = {
+            name: (count / total if total else 0.0)
+            for name, count in color_counts.items()
+        }
+
+        return RouteComponent(
+            id=component_id,
+            pixel_polyline=ordered_arr.astype(np.int32),
+            pixel_length=length,
+            endpoints=list(zip((graph.xs[ends] + ox).tolist(), (graph.ys[ends] + oy).tolist())),
+            loops=cycles > 0,
+            avg_width=avg_width,
+            width_std=float(widths.std()),
+            curvature=compute_turning_curvature(ordered_arr),
+            self_intersections=self_intersections,
+            color_profile=color_profile,
+            dominant_color=max(color_counts, key=color_counts.get) if total else "unknown",
+            is_closed_shape=is_closed,
+            is_candidate_route=length >= self.config.get("min_route_length", 50),
+            bounding_box=spec.bounding_box,
+            mask=spec.mask,
+            centerline=centerline,
+            offset=spec.offset,
+        )
+
+    def _choose_primary(self, components: List[RouteComponent]):
+        candidates = [c for c in components if c.is_candidate_route] or components
+
+        chosen = None
+        try:
+            chosen = self.reasoner.choose_primary(candidates)
+        except Exception as e:
+            log(f"[CV] route reasoner failed, using longest component: {e!r}")
+
+        by_id = {c.id: c for c in candidates}
+        primary = by_id.get(chosen) or max(candidates, key=lambda c: c.pixel_length)
+
+        total_length = sum(c.pixel_length for c in candidates)
+        confidence = primary.pixel_length / total_length if total_length else 0.0
+        return primary, confidence
+
+    def _save_overlays(self, artifacts, img, components, primary):
+        centerlines = np.zeros(img.shape[:2], dtype=np.uint8)
+        vis = img.copy()
+        for c in components:
+            pts = c.pixel_polyline
+            centerlines[pts[:, 1], pts[:, 0]] = 255
+            if c is not primary:
+                cv2.polylines(vis, [pts.reshape(-1, 1, 2)], False, (0, 200, 255), 1)
+        pts = primary.pixel_polyline.reshape(-1, 1, 2)
+        cv2.polylines(vis, [pts], False, (0, 255, 0), 2)
+
+        artifacts.save("03_centerline", centerlines)
+        artifacts.save("04_polyline", vis)
+
+    def _report(self, stage: str, fraction: float):
+        if self.progress:
+            self.progress(stage, fraction)
+
+    def _order(self, graph):
+        # "skeleton_graph" walks the centerline in linear time; "greedy" is
+        # the original nearest-neighbour ordering, kept as a fallback.
+        if self.config.get("ordering", "skeleton_graph") == "greedy":
+            return order_points_nearest_neighbor(
+                list(zip(graph.xs.tolist(), graph.ys.tolist()))
+            )
+        return order_skeleton_graph(
+            graph,
+            min_spur_length=self.config.get("min_spur_length", 10),
+        )
+
+    def _empty_result(self, w, h, timings=None):
         return CVExtractionResult(
             image_width=w,
             image_height=h,
@@ -118,4 +418,5 @@ class RouteCVExtractor:
             primary_candidate_id=None,
             confidence=0.0,
             debug_artifacts={},
+            timings=timings or {},
         )
@@ -1,11 +1,13 @@
-from dataclasses import dataclass
-from typing import List, Tuple, Dict, Optional
+from dataclasses import dataclass, field
+from typing import Any, List, Tuple, Dict, Optional
+
+import numpy as np
 
 
 @dataclass
 class RouteComponent:
     id: int
-    pixel_polyline: List[Tuple[int, int]]
+    pixel_polyline: np.ndarray  # (N, 2) int32 image x/y, in route order
     pixel_length: float
     endpoints: List[Tuple[int, int]]
     loops: bool
@@ -18,6 +20,11 @@ class RouteComponent:
     is_closed_shape: bool
     is_candidate_route: bool
     bounding_box: Tuple[int, int, int, int]
+    # Component-local binary mask and centerline (uint8 {0,255}); pixel
+    # (x, y) of either is image pixel (x + offset[0], y + offset[1])
+    mask: Any = field(default=None, repr=False)
+    centerline: Any = field(default=None, repr=False)
+    offset: Tuple[int, int] = (0, 0)
 
 
 @dataclass
@@ -28,3 +35,5 @@ class CVExtractionResult:
     primary_candidate_id: Optional[int]
     confidence: float
     debug_artifacts: Dict
+    # Seconds per extractor stage; component stages are summed over components
+    timings: Dict[str, float] = field(default_factory=dict)
@@ -0,0 +1,469 @@
+import heapq
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+
+# Odd nodes are paired only within this many spur lengths of each other:
+# the two junctions of a thinned crossing sit a line width or so apart,
+# and an unbounded search per node is quadratic on junction-dense skeletons
+PAIR_RADIUS_SPURS = 4
+
+# (dy, dx) offsets of the 8-neighbourhood, orthogonal first.
+_ORTHOGONAL = ((-1, 0), (0, -1), (0, 1), (1, 0))
+_DIAGONAL = ((-1, -1), (-1, 1), (1, -1), (1, 1))
+
+
+# ---------------------------------------------------------------------
+# Graph construction
+# ---------------------------------------------------------------------
+
+@dataclass
+class SkeletonGraph:
+    """
+    8-neighbour adjacency of a 1px centerline.
+
+    Pixel i lives at (xs[i], ys[i]); neighbors[i] holds up to 8 pixel
+    indices, padded with -1.
+    """
+    xs: np.ndarray
+    ys: np.ndarray
+    neighbors: np.ndarray
+    degree: np.ndarray
+
+    @property
+    def size(self) -> int:
+        return len(self.xs)
+
+    @property
+    def edge_count(self) -> int:
+        return int(self.degree.sum()) // 2
+
+    def endpoints(self) -> np.ndarray:
+        return np.flatnonzero(self.degree == 1)
+
+    def junctions(self) -> np.ndarray:
+        return np.flatnonzero(self.degree >= 3)
+
+    def adjacency(self) -> List[List[int]]:
+        """Neighbour lists as plain Python lists, for the walking code."""
+        flat = self.neighbors[self.neighbors >= 0].tolist()
+        offsets = np.concatenate(([0], np.cumsum(self.degree, dtype=np.int64))).tolist()
+        return [flat[offsets[i]:offsets[i + 1]] for i in range(self.size)]
+
+
+def build_skeleton_graph(centerline: np.ndarray) -> SkeletonGraph:
+    """
+    Builds 8-neighbour adjacency for every non-zero pixel of a centerline.
+
+    Diagonal links are dropped when the two pixels already touch through a
+    shared orthogonal neighbour, otherwise every staircase step of the
+    thinning output would show up as a junction.
+
+    Input: binary centerline {0,255}
+    Output: SkeletonGraph
+    """
+    ys, xs = np.nonzero(centerline)
+    n = len(xs)
+
+    # np.nonzero is row-major, so the padded linear keys are already sorted
+    # and neighbour lookups reduce to a vectorized binary search.
+    stride = centerline.shape[1] + 2
+    keys = (ys.astype(np.int64) + 1) * stride + (xs.astype(np.int64) + 1)
+
+    def lookup(dy: int, dx: int) -> np.ndarray:
+        target = keys + dy * stride + dx
+        pos = np.minimum(np.searchsorted(keys, target), max(n - 1, 0))
+        return np.where(keys[pos] == target, pos, -1).astype(np.int32)
+
+    neighbors = np.full((n, 8), -1, dtype=np.int32)
+    if n:
+        for k, (dy, dx) in enumerate(_ORTHOGONAL):
+            neighbors[:, k] = lookup(dy, dx)
+
+        for k, (dy, dx) in enumerate(_DIAGONAL, start=4):
+            nb = lookup(dy, dx)
+            shortcut = (lookup(dy, 0) >= 0) | (lookup(0, dx) >= 0)
+            nb[shortcut] = -1
+            neighbors[:, k] = nb
+
+    # Keep valid neighbours left-aligned so adjacency() can slice rows.
+    neighbors = -np.sort(-neighbors, axis=1)
+    degree = (neighbors >= 0).sum(axis=1).astype(np.int8)
+
+    return SkeletonGraph(
+        xs=xs.astype(np.int32),
+        ys=ys.astype(np.int32),
+        neighbors=neighbors,
+        degree=degree,
+    )
+
+
+# ---------------------------------------------------------------------
+# Branch tracing
+# ---------------------------------------------------------------------
+
+@dataclass
+class Branch:
+    """Pixel chain between two nodes (endpoints / junctions).
+
+    Closed cycles without any node have start == end == -1.
+    """
+    pixels: List[int]
+    start: int
+    end: int
+
+    @property
+    def length(self) -> int:
+        return max(len(self.pixels) - 1, 1)
+
+
+def trace_branches(graph: SkeletonGraph) -> List[Branch]:
+    """
+    Splits the skeleton into branches. Every pixel is visited a constant
+    number of times, so this is linear in the centerline size.
+    """
+    adj = graph.adjacency()
+    is_node = (graph.degree != 2).tolist()
+    visited = bytearray(graph.size)
+    node_pairs = set()
+    branches: List[Branch] = []
+
+    for start in np.flatnonzero(graph.degree != 2).tolist():
+        if not adj[start]:
+            branches.append(Branch(pixels=[start], start=start, end=start))
+            continue
+
+        for step in adj[start]:
+            if is_node[step]:
+                pair = (min(start, step), max(start, step))
+                if pair in node_pairs:
+                    continue
+                node_pairs.add(pair)
+                branches.append(Branch(pixels=[start, step], start=start, end=step))
+                continue
+
+            if visited[step]:
+                continue
+
+            chain = [start]
+            prev, cur = start, step
+            while not is_node[cur]:
+                visited[cur] = 1
+                chain.append(cur)
+                a, b = adj[cur]
+                prev, cur = cur, (b if a == prev else a)
+            chain.append(cur)
+            branches.append(Branch(pixels=chain, start=start, end=cur))
+
+    # Whatever is left are closed loops made only of degree-2 pixels.
+    for seed in range(graph.size):
+        if is_node[seed] or visited[seed]:
+            continue
+        chain = [seed]
+        visited[seed] = 1
+        prev, cur = seed, adj[seed][0]
+        while cur != seed:
+            visited[cur] = 1
+            chain.append(cur)
+            a, b = adj[cur]
+            prev, cur = cur, (b if a == prev else a)
+        branches.append(Branch(pixels=chain, start=-1, end=-1))
+
+    return branches
+
+
+# ---------------------------------------------------------------------
+# Ordering
+# ---------------------------------------------------------------------
+
+def order_skeleton_points(
+    centerline: np.ndarray,
+    min_spur_length: int = 10,
+) -> np.ndarray:
+    """
+    Orders a 1px centerline into a single polyline by walking its
+    skeleton graph instead of searching nearest neighbours.
+
+    Short spurs left by thinning are pruned. Each connected piece is then
+    walked as an Euler trail. Where none exists (self-crossings thin into
+    pairs of 3-way junctions, so most crossing routes have more than two
+    odd nodes) the shortest branch paths between nearby odd nodes are
+    walked twice, Chinese-postman style, so every kept branch is still
+    covered. Odd nodes with no partner nearby split the walk into pieces,
+    and pieces are joined end-to-end, nearest first.
+
+    Input: binary centerline {0,255}
+    Output: (N, 2) int32 array of x, y
+    """
+    return order_skeleton_graph(build_skeleton_graph(centerline), min_spur_length)
+
+
+def order_skeleton_graph(
+    graph: SkeletonGraph,
+    min_spur_length: int = 10,
+) -> np.ndarray:
+    """order_skeleton_points for an already built graph."""
+    if graph.size < 2:
+        return np.column_stack([graph.xs, graph.ys]).astype(np.int32)
+
+    branches = trace_branches(graph)
+    pieces = [
+        piece
+        for ids in _branch_components(branches)
+        for piece in _walk_component(branches, ids, min_spur_length)
+    ]
+    ordered = _join_pieces(pieces, graph.xs, graph.ys)
+
+    return np.column_stack([graph.xs[ordered], graph.ys[ordered]]).astype(np.int32)
+
+
+def _branch_components(branches: List[Branch]) -> List[List[int]]:
+    """Groups branch ids that share nodes."""
+    incident: Dict[int, List[int]] = {}
+    for b, br in enumerate(branches):
+        if br.start >= 0:
+            incident.setdefault(br.start, []).append(b)
+            incident.setdefault(br.end, []).append(b)
+
+    seen = [False] * len(branches)
+    components = []
+    for b, br in enumerate(branches):
+        if seen[b]:
+            continue
+        seen[b] = True
+        ids = [b]
+        stack = [br.start, br.end] if br.start >= 0 else []
+        visited_nodes = set(stack)
+        while stack:
+            node = stack.pop()
+            for other in incident[node]:
+                if not seen[other]:
+                    seen[other] = True
+                    ids.append(other)
+                for nxt in (branches[other].start, branches[other].end):
+                    if nxt not in visited_nodes:
+                        visited_nodes.add(nxt)
+                        stack.append(nxt)
+        components.append(ids)
+
+    return components
+
+
+def _walk_component(
+    branches: List[Branch],
+    ids: List[int],
+    min_spur_length: int,
+) -> List[List[int]]:
+    """Pixel walks covering one connected set of branches."""
+    if len(ids) == 1:
+        return [list(branches[ids[0]].pixels)]
+
+    incident = _incidence(branches, ids)
+
+    # Prune short dead-end spurs hanging off junctions.
+    kept = [
+        b for b in ids
+        if not (
+            branches[b].length < min_spur_length
+            and branches[b].start != branches[b].end
+            and min(len(incident[branches[b].start]), len(incident[branches[b].end])) == 1
+            and max(len(incident[branches[b].start]), len(incident[branches[b].end])) >= 3
+        )
+    ]
+    if kept and len(kept) != len(ids):
+        ids = kept
+        incident = _incidence(branches, ids)
+
+    odd = [node for node, inc in incident.items() if len(inc) % 2]
+    if len(odd) > 2:
+        branches, incident, odd = _pair_odd_nodes(
+            branches, incident, odd, PAIR_RADIUS_SPURS * min_spur_length
+        )
+    # Start at a dead end when there is one, so the walk runs end to end
+    odd.sort(key=lambda node: len(incident[node]))
+    start = odd[0] if odd else next(iter(incident))
+
+    # Odd nodes left unpaired are linked by jumps that the walk takes but
+    # does not draw: each jump ends one piece and starts the next
+    jumps = set()
+    if len(odd) > 2:
+        branches = list(branches)
+        incident = {node: list(inc) for node, inc in incident.items()}
+        for a, b in zip(odd[2::2], odd[3::2]):
+            jumps.add(len(branches))
+            incident[a].append(len(branches))
+            incident[b].append(len(branches))
+            branches.append(Branch(pixels=[a, b], start=a, end=b))
+    steps = _euler_trail(branches, incident, start)
+
+    pieces: List[List[int]] = [[]]
+    for node, b in steps:
+        if b in jumps:
+            pieces.append([])
+            continue
+        pixels = branches[b].pixels
+        if pixels[0] != node:
+            pixels = pixels[::-1]
+        walk = pieces[-1]
+        walk.extend(pixels if not walk else pixels[1:])
+
+    return [walk for walk in pieces if walk]
+
+
+def _incidence(branches: List[Branch], ids: List[int]) -> Dict[int, List[int]]:
+    incident: Dict[int, List[int]] = {}
+    for b in ids:
+        incident.setdefault(branches[b].start, []).append(b)
+        incident.setdefault(branches[b].end, []).append(b)
+    return incident
+
+
+def _other_end(branch: Branch, node: int) -> int:
+    return branch.end if branch.start == node else branch.start
+
+
+def _euler_trail(
+    branches: List[Branch],
+    incident: Dict[int, List[int]],
+    start: int,
+) -> List[Tuple[int, int]]:
+    """Hierholzer's algorithm; returns (from_node, branch_id) steps."""
+    used = set()
+    cursor = {node: 0 for node in incident}
+    stack: List[Tuple[int, int]] = [(start, -1)]
+    trail: List[Tuple[int, int]] = []
+
+    while stack:
+        node, via = stack[-1]
+        inc = incident[node]
+        while cursor[node] < len(inc) and inc[cursor[node]] in used:
+            cursor[node] += 1
+        if cursor[node] == len(inc):
+            stack.pop()
+            trail.append((node, via))
+        else:
+            b = inc[cursor[node]]
+            used.add(b)
+            stack.append((_other_end(branches[b], node), b))
+
+    trail.reverse()
+    return [(trail[i - 1][0], trail[i][1]) for i in range(1, len(trail))]
+
+
+def _pair_odd_nodes(
+    branches: List[Branch],
+    incident: Dict[int, List[int]],
+    odd: List[int],
+    radius: int,
+) -> Tuple[List[Branch], Dict[int, List[int]], List[int]]:
+    """
+    Makes all but two odd nodes even by duplicating the branches on a
+    shortest path between pairs of them, closest pairs first (greedy
+    rather than minimum-weight matching: the pairs are almost always the
+    two junctions of one thinned crossing, a few pixels apart). Only
+    pairs within radius pixels of each other are considered, so the
+    search stays local and the whole pass linear in the number of nodes.
+
+    Dead ends (a single branch) are the route's own start and finish, so
+    when there are at most two they stay unpaired. Returns the extended
+    branch list and incidence, and the nodes left odd.
+    """
+    ends = [node for node in odd if len(incident[node]) == 1]
+    reserved = set(ends) if len(ends) <= 2 else set()
+    candidates = [node for node in odd if node not in reserved]
+    unpaired = 2 - len(reserved)
+
+    paths = {node: _shortest_paths(branches, incident, node, radius) for node in candidates}
+    # Each pair once, from the nodes each search actually reached
+    pairs = sorted(
+        (d, a, b)
+        for a in candidates
+        for b, d in paths[a][0].items()
+        if a < b and b in paths
+    )
+
+    branches = list(branches)
+    incident = {node: list(inc) for node, inc in incident.items()}
+    left = set(candidates)
+    for _, a, b in pairs:
+        if len(left) <= unpaired:
+            break
+        if a not in left or b not in left:
+            continue
+        left -= {a, b}
+        prev = paths[a][1]
+        node = b
+        while node != a:
+            parent, via = prev[node]
+            copy = len(branches)
+            branches.append(branches[via])
+            incident[parent].append(copy)
+            incident[node].append(copy)
+            node = parent
+
+    return branches, incident, sorted(left | reserved)
+
+
+def _shortest_paths(branches: List[Branch], incident: Dict[int, List[int]], source: int, cutoff: int):
+    """
+    Dijkstra over the branch graph, weighted by pixel length, up to cutoff
+    pixels from source: (dist, prev).
+    """
+    dist = {source: 0}
+    prev: Dict[int, Tuple[int, int]] = {}
+    heap = [(0, source)]
+
+    while heap:
+        d, node = heapq.heappop(heap)
+        if d > dist[node]:
+            continue
+        for b in incident[node]:
+            other = _other_end(branches[b], node)
+            nd = d + branches[b].length
+            if nd <= cutoff and nd < dist.get(other, float("inf")):
+                dist[other] = nd
+                prev[other] = (node, b)
+                heapq.heappush(heap, (nd, other))
+
+    return dist, prev
+
+
+def _join_pieces(pieces: List[List[int]], xs: np.ndarray, ys: np.ndarray) -> List[int]:
+    """Chains pieces end-to-end, starting from the largest one and
+    attaching whichever remaining piece is closest to either end."""
+    pieces = sorted(pieces, key=len, reverse=True)
+    ordered = list(pieces[0])
+    rest = pieces[1:]
+    if not rest:
+        return ordered
+
+    heads = np.array([p[0] for p in rest])
+    tails = np.array([p[-1] for p in rest])
+    ends_xy = np.stack([
+        np.stack([xs[heads], ys[heads]], axis=1),
+        np.stack([xs[tails], ys[tails]], axis=1),
+    ]).astype(np.float64)  # (2, k, 2)
+    remaining = np.ones(len(rest), dtype=bool)
+
+    for _ in range(len(rest)):
+        first = np.array([xs[ordered[0]], ys[ordered[0]]], dtype=np.float64)
+        last = np.array([xs[ordered[-1]], ys[ordered[-1]]], dtype=np.float64)
+
+        # d[attach_at, piece_end, piece]; attach_at 0 = before head, 1 = after tail
+        d = np.stack([
+            np.hypot(*(ends_xy - first).transpose(2, 0, 1)),
+            np.hypot(*(ends_xy - last).transpose(2, 0, 1)),
+        ])
+        d[:, :, ~remaining] = np.inf
+        attach_at, piece_end, k = np.unravel_index(np.argmin(d), d.shape)
+        remaining[k] = False
+
+        piece = rest[k]
+        if attach_at == 1:
+            ordered.extend(piece if piece_end == 0 else piece[::-1])
+        else:
+            ordered[:0] = piece if piece_end == 1 else piece[::-1]
+
+    return ordered
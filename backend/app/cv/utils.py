@@ -8,13 +8,14 @@ from collections import deque
 # Centerline extraction via distance transform
 # ---------------------------------------------------------------------
 
-def extract_centerline(mask: np.ndarray, ridge_frac: float = 0.5) -> np.ndarray:
+def extract_centerline(mask: np.ndarray, ridge_frac: float = 0.5, return_distance: bool = False):
     """
     Extracts a 1px-wide centerline from a thick route mask
     using distance transform ridge detection.
 
     Input: binary mask {0,255}
     Output: binary centerline {0,255}
+            (centerline, distance transform) if return_distance
     """
     # Ensure binary
     mask = (mask > 0).astype(np.uint8) * 255
@@ -30,9 +31,34 @@ def extract_centerline(mask: np.ndarray, ridge_frac: float = 0.5) -> np.ndarray:
     # Thin ridge to single pixel
     ridge = cv2.ximgproc.thinning(ridge)
 
+    if return_distance:
+        return ridge, dist
     return ridge
 
 
+# ---------------------------------------------------------------------
+# Bitmap packing
+# ---------------------------------------------------------------------
+
+def pack_mask(mask: np.ndarray) -> np.ndarray:
+    """
+    Binary (H, W) image -> (H, ceil(W / 8)) uint8, 1 bit per pixel. Rows
+    stay separate so unpack_mask can cut out a window without unpacking
+    the whole image.
+    """
+    return np.packbits(mask > 0, axis=1)
+
+
+def unpack_mask(packed: np.ndarray, width: int, x0: int = 0, y0: int = 0,
+                x1: int | None = None, y1: int | None = None) -> np.ndarray:
+    """Window [y0:y1, x0:x1] of a pack_mask() image as a bool array."""
+    x1 = width if x1 is None else x1
+    rows = packed[y0:y1, x0 // 8:(x1 + 7) // 8]
+    bits = np.unpackbits(rows, axis=1)
+    start = x0 - (x0 // 8) * 8
+    return bits[:, start:start + (x1 - x0)].astype(bool)
+
+
 # ---------------------------------------------------------------------
 # Polyline ordering
 # ---------------------------------------------------------------------
@@ -63,9 +89,25 @@ def order_points_nearest_neighbor(points):
 # Metrics
 # ---------------------------------------------------------------------
 
+def compute_turning_curvature(points, step: int = 5) -> float:
+    """
+    Mean absolute turning angle per pixel of path length, measured on
+    every step-th point so pixel staircases do not count as turns.
+    """
+    pts = np.asarray(points, dtype=np.float64)[::step]
+    if len(pts) < 3:
+        return 0.0
+
+    seg = np.diff(pts, axis=0)
+    heading = np.arctan2(seg[:, 1], seg[:, 0])
+    turn = np.angle(np.exp(1j * np.diff(heading)))  # wrap to [-pi, pi]
+    length = np.hypot(seg[:, 0], seg[:, 1]).sum()
+
+    return float(np.abs(turn).sum() / length) if length else 0.0
+
+
 def compute_polyline_length(points):
-    return sum(
-        hypot(points[i + 1][0] - points[i][0],
-              points[i + 1][1] - points[i][1])
-        for i in range(len(points) - 1)
-    )
+    if len(points) < 2:
+        return 0.0
+    seg = np.diff(np.asarray(points, dtype=np.float64), axis=0)
+    return float(np.hypot(seg[:, 0], seg[:, 1]).sum())
@@ -1,11 +1,31 @@
+import sys
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from app.api.v1 import routes, export, health
+from app.api.v1 import routes, events, batches, export, downloads, health, metrics
 from fastapi.middleware.cors import CORSMiddleware
+from app.core.workers import shutdown_executor
+from app.core.metrics import MetricsMiddleware
+from app.core.image_loader import UploadLimitMiddleware, upload_request_limit
+from app.core.warmup import start_warmup
 from app.print_logging import log
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Serve /health right away; /ready flips once the pool is warm
+    start_warmup()
+    yield
+    shutdown_executor()
+    if "app.matching.road_provider" in sys.modules:
+        from app.matching.road_provider import close_road_provider
+        await close_road_provider()
+
+
 app = FastAPI(
     title="Route From Image API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 origins = [
     "http://localhost:5173",
@@ -18,10 +38,23 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Content-Disposition"],
+)
+app.add_middleware(
+    UploadLimitMiddleware,
+    limits={
+        "/api/v1/routes/upload": upload_request_limit(),
+        "/api/v1/batches/upload": upload_request_limit(batches.MAX_BATCH_FILES),
+    },
 )
+app.add_middleware(MetricsMiddleware)
 
 log("FastAPI app instantiated")
 
 app.include_router(health.router, prefix="/api/v1", tags=["health"])
+app.include_router(metrics.router, prefix="/api/v1", tags=["metrics"])
 app.include_router(routes.router, prefix="/api/v1/routes", tags=["routes"])
+app.include_router(events.router, prefix="/api/v1/routes", tags=["events"])
+app.include_router(batches.router, prefix="/api/v1/batches", tags=["batches"])
 app.include_router(export.router, prefix="/api/v1/routes", tags=["export"])
+app.include_router(downloads.router, prefix="/downloads", tags=["export"])
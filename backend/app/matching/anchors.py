@@ -1,7 +1,78 @@
-def compute_anchor_bonus(route_endpoints, road_nodes):
-    bonus = 0.0
-    for p in route_endpoints:
-        for r in road_nodes:
-            if abs(p[0] - r[0]) < 0.0001:
-                bonus += 0.5
-    return bonus
+from typing import Dict
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from app.core.geo_utils import to_local_meters
+
+# A road node this close to an anchor (route start/finish, user anchor
+# point) counts as the road passing through it.
+ANCHOR_METERS = 15.0
+ANCHOR_WEIGHT = 0.5
+
+
+class AnchorIndex:
+    """
+    KD-tree over road nodes in local metres. Build once per road dataset
+    and query it for every candidate and any number of anchors.
+
+    labels optionally tags each node (e.g. with its OSM way id) so
+    bonuses can be handed out per way in one pass.
+    """
+
+    def __init__(self, road_nodes, labels=None):
+        nodes = np.asarray(road_nodes, dtype=np.float64).reshape(-1, 2)
+        self.origin = nodes.mean(axis=0) if len(nodes) else np.zeros(2)
+        self.tree = cKDTree(to_local_meters(nodes, self.origin))
+        self.labels = None if labels is None else np.asarray(labels)
+
+    @property
+    def size(self) -> int:
+        return self.tree.n
+
+    def counts(self, anchors, threshold_m: float = ANCHOR_METERS) -> np.ndarray:
+        """(M,) number of road nodes within threshold_m of each anchor."""
+        xy = self._anchor_xy(anchors)
+        if len(xy) == 0 or self.size == 0:
+            return np.zeros(len(xy), dtype=np.int64)
+        return np.asarray(self.tree.query_ball_point(xy, threshold_m, return_length=True))
+
+    def label_bonus(
+        self,
+        anchors,
+        threshold_m: float = ANCHOR_METERS,
+        weight: float = ANCHOR_WEIGHT
+    ) -> Dict[int, float]:
+        """
+        {label: weight * number of anchors the label's nodes pass within
+        threshold_m of}. Requires labels.
+        """
+        if self.labels is None:
+            raise ValueError("AnchorIndex was built without labels")
+
+        xy = self._anchor_xy(anchors)
+        if len(xy) == 0 or self.size == 0:
+            return {}
+
+        bonus: Dict[int, float] = {}
+        for near in self.tree.query_ball_point(xy, threshold_m):
+            for label in np.unique(self.labels[near]).tolist():
+                bonus[label] = bonus.get(label, 0.0) + weight
+        return bonus
+
+    def _anchor_xy(self, anchors) -> np.ndarray:
+        return to_local_meters(anchors, self.origin)
+
+
+def compute_anchor_bonus(
+    route_endpoints,
+    road_nodes,
+    threshold_m: float = ANCHOR_METERS,
+    weight: float = ANCHOR_WEIGHT
+):
+    """
+    weight for every route endpoint with a road node within threshold_m
+    metres. Pass a prebuilt AnchorIndex as road_nodes to reuse it.
+    """
+    index = road_nodes if isinstance(road_nodes, AnchorIndex) else AnchorIndex(road_nodes)
+    return weight * int((index.counts(route_endpoints, threshold_m) > 0).sum())
@@ -0,0 +1,273 @@
+import math
+from dataclasses import dataclass, field
+from typing import Literal, Sequence
+
+import numpy as np
+
+from app.core.geo_utils import normalize_bbox
+
+EARTH_RADIUS = 6_378_137.0  # Web Mercator sphere (EPSG:3857)
+MAX_MERCATOR_LAT = 85.05112878
+
+Plane = Literal["lonlat", "mercator"]
+ControlPointModel = Literal["affine", "homography"]
+
+
+# -------------------------
+# Plane <-> lat/lon
+# -------------------------
+
+def lonlat_to_mercator(lon, lat):
+    lon = np.asarray(lon, dtype=np.float64)
+    lat = np.clip(np.asarray(lat, dtype=np.float64), -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT)
+    x = np.radians(lon) * EARTH_RADIUS
+    y = np.log(np.tan(np.pi / 4 + np.radians(lat) / 2)) * EARTH_RADIUS
+    return x, y
+
+
+def mercator_to_lonlat(x, y):
+    lon = np.degrees(np.asarray(x, dtype=np.float64) / EARTH_RADIUS)
+    lat = np.degrees(2 * np.arctan(np.exp(np.asarray(y, dtype=np.float64) / EARTH_RADIUS)) - np.pi / 2)
+    return lon, lat
+
+
+# -------------------------
+# Georeferencer
+# -------------------------
+
+@dataclass
+class Georeferencer:
+    """
+    Maps pixel (x, y) arrays to (lat, lon) arrays and back.
+
+    Every transform is a 3x3 projective matrix from homogeneous pixels to
+    a plane: plain lon/lat degrees ("lonlat") or Web Mercator metres
+    ("mercator"). Linear and affine fits are just matrices with a
+    [0, 0, 1] last row.
+
+    Scratch buffers are kept between calls, so reuse one instance for a
+    batch of polylines (not thread-safe).
+    """
+    matrix: np.ndarray
+    plane: Plane
+    kind: str
+    residual_m: float | None = None
+    _inverse: np.ndarray | None = field(default=None, repr=False)
+    _buf: np.ndarray = field(default_factory=lambda: np.empty((0, 3)), repr=False)
+
+    def pixels_to_geo(self, points, out: np.ndarray | None = None) -> np.ndarray:
+        """(N, 2) pixel x/y -> (N, 2) lat/lon."""
+        plane = self._apply(self.matrix, points)
+        if out is None:
+            out = np.empty((len(plane), 2))
+
+        if self.plane == "mercator":
+            lon, lat = mercator_to_lonlat(plane[:, 0], plane[:, 1])
+            out[:, 0] = lat
+            out[:, 1] = lon
+        else:
+            out[:, 0] = plane[:, 1]
+            out[:, 1] = plane[:, 0]
+        return out
+
+    def geo_to_pixels(self, latlon) -> np.ndarray:
+        """(N, 2) lat/lon -> (N, 2) pixel x/y."""
+        latlon = np.asarray(latlon, dtype=np.float64).reshape(-1, 2)
+        if self.plane == "mercator":
+            x, y = lonlat_to_mercator(latlon[:, 1], latlon[:, 0])
+            plane = np.column_stack([x, y])
+        else:
+            plane = latlon[:, ::-1]
+
+        if self._inverse is None:
+            self._inverse = np.linalg.inv(self.matrix)
+        return self._apply(self._inverse, plane).copy()
+
+    def pixels_to_geo_many(self, polylines: Sequence) -> list[np.ndarray]:
+        """
+        Georeferences several polylines with one matrix product and
+        splits the result back per polyline.
+        """
+        arrays = [np.asarray(p, dtype=np.float64).reshape(-1, 2) for p in polylines]
+        if not arrays:
+            return []
+        geo = self.pixels_to_geo(np.concatenate(arrays))
+        bounds = np.cumsum([len(a) for a in arrays])[:-1]
+        return np.split(geo, bounds)
+
+    def meters_per_pixel(self, image_size: tuple[int, int]) -> float:
+        """Local ground resolution at the image centre."""
+        cx, cy = image_size[0] / 2, image_size[1] / 2
+        (lat0, lon0), (lat1, lon1), (lat2, lon2) = self.pixels_to_geo(
+            [(cx, cy), (cx + 1, cy), (cx, cy + 1)]
+        )
+        k = math.cos(math.radians(lat0))
+        dx = math.hypot((lat1 - lat0), (lon1 - lon0) * k)
+        dy = math.hypot((lat2 - lat0), (lon2 - lon0) * k)
+        return math.radians((dx + dy) / 2) * EARTH_RADIUS
+
+    def _apply(self, matrix: np.ndarray, points) -> np.ndarray:
+        pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        n = len(pts)
+        if len(self._buf) < n:
+            self._buf = np.empty((max(n, 2 * len(self._buf)), 3))
+
+        # Homogeneous coordinates in the reused buffer: [x, y, 1] @ M.T
+        homo = self._buf[:n]
+        homo[:, :2] = pts
+        homo[:, 2] = 1.0
+        plane = homo @ matrix.T
+
+        if self.kind == "homography":
+            plane[:, :2] /= plane[:, 2:3]
+        return plane[:, :2]
+
+
+# -------------------------
+# Bbox transforms
+# -------------------------
+
+def _bbox_matrix(x0: float, y0: float, x1: float, y1: float, image_size) -> np.ndarray:
+    """Pixel (0, 0) -> (x0, y1) top-left, (w, h) -> (x1, y0) bottom-right."""
+    img_w, img_h = image_size
+    return np.array([
+        [(x1 - x0) / img_w, 0.0, x0],
+        [0.0, -(y1 - y0) / img_h, y1],
+        [0.0, 0.0, 1.0],
+    ])
+
+
+def linear_georeferencer(bbox: dict, image_size: tuple[int, int]) -> Georeferencer:
+    """Lat/lon scaled linearly across the bbox."""
+    bbox = normalize_bbox(bbox)
+    matrix = _bbox_matrix(
+        bbox["min_lon"], bbox["min_lat"], bbox["max_lon"], bbox["max_lat"], image_size
+    )
+    return Georeferencer(matrix=matrix, plane="lonlat", kind="linear")
+
+
+def mercator_georeferencer(bbox: dict, image_size: tuple[int, int]) -> Georeferencer:
+    """
+    Bbox of a Web Mercator map screenshot: pixels are linear in mercator
+    metres, so latitude spacing grows towards the poles.
+    """
+    bbox = normalize_bbox(bbox)
+    (x0, x1), (y0, y1) = lonlat_to_mercator(
+        [bbox["min_lon"], bbox["max_lon"]], [bbox["min_lat"], bbox["max_lat"]]
+    )
+    matrix = _bbox_matrix(x0, y0, x1, y1, image_size)
+    return Georeferencer(matrix=matrix, plane="mercator", kind="mercator")
+
+
+# -------------------------
+# Control points
+# -------------------------
+
+def fit_control_points(
+    pixels,
+    latlon,
+    model: ControlPointModel = "affine"
+) -> Georeferencer:
+    """
+    Least-squares fit of pixel -> Web Mercator metres from matched
+    control points. Affine needs >= 3 points, homography >= 4.
+    """
+    src = np.asarray(pixels, dtype=np.float64).reshape(-1, 2)
+    latlon = np.asarray(latlon, dtype=np.float64).reshape(-1, 2)
+    if len(src) != len(latlon):
+        raise ValueError("Control points need one lat/lon per pixel")
+
+    x, y = lonlat_to_mercator(latlon[:, 1], latlon[:, 0])
+    dst = np.column_stack([x, y])
+
+    # Centre both sides so the solve is well conditioned with metre-scale
+    # mercator values
+    src_t = _normalizer(src)
+    dst_t = _normalizer(dst)
+    s = _apply_h(src_t, src)
+    d = _apply_h(dst_t, dst)
+
+    if model == "affine":
+        if len(src) < 3:
+            raise ValueError("Affine fit needs at least 3 control points")
+        A = np.column_stack([s, np.ones(len(s))])
+        coef, *_ = np.linalg.lstsq(A, d, rcond=None)
+        h = np.vstack([coef.T, [0.0, 0.0, 1.0]])
+    elif model == "homography":
+        if len(src) < 4:
+            raise ValueError("Homography fit needs at least 4 control points")
+        h = _dlt(s, d)
+    else:
+        raise ValueError(f"Unknown control point model: {model}")
+
+    matrix = np.linalg.inv(dst_t) @ h @ src_t
+    matrix /= matrix[2, 2]
+
+    georef = Georeferencer(matrix=matrix, plane="mercator", kind=model)
+    fitted = georef._apply(matrix, src)
+    # Mercator metres -> ground metres at the control points' latitude
+    scale = math.cos(math.radians(latlon[:, 0].mean()))
+    georef.residual_m = float(np.sqrt(np.mean(np.sum((fitted - dst) ** 2, axis=1)))) * scale
+    return georef
+
+
+def _normalizer(pts: np.ndarray) -> np.ndarray:
+    centre = pts.mean(axis=0)
+    spread = np.sqrt(np.mean(np.sum((pts - centre) ** 2, axis=1))) or 1.0
+    k = math.sqrt(2) / spread
+    return np.array([
+        [k, 0.0, -k * centre[0]],
+        [0.0, k, -k * centre[1]],
+        [0.0, 0.0, 1.0],
+    ])
+
+
+def _apply_h(h: np.ndarray, pts: np.ndarray) -> np.ndarray:
+    return pts @ h[:2, :2].T + h[:2, 2]
+
+
+def _dlt(s: np.ndarray, d: np.ndarray) -> np.ndarray:
+    n = len(s)
+    x, y = s[:, 0], s[:, 1]
+    u, v = d[:, 0], d[:, 1]
+    zero, one = np.zeros(n), np.ones(n)
+
+    rows = np.empty((2 * n, 9))
+    rows[0::2] = np.column_stack([-x, -y, -one, zero, zero, zero, u * x, u * y, u])
+    rows[1::2] = np.column_stack([zero, zero, zero, -x, -y, -one, v * x, v * y, v])
+
+    _, _, vt = np.linalg.svd(rows)
+    return vt[-1].reshape(3, 3)
+
+
+# -------------------------
+# Factory
+# -------------------------
+
+def make_georeferencer(
+    bbox: dict,
+    image_size: tuple[int, int],
+    options: dict | None = None
+) -> Georeferencer:
+    """
+    options = {
+      "projection": "linear" | "mercator",
+      "control_points": [{"x", "y", "lat", "lng"}, ...] | None,
+      "model": "affine" | "homography"
+    }
+
+    bbox may be in any format geo_utils.normalize_bbox accepts. Control
+    points, when given, take precedence over the bbox.
+    """
+    options = options or {}
+    points = options.get("control_points")
+    if points:
+        return fit_control_points(
+            [(p["x"], p["y"]) for p in points],
+            [(p["lat"], p["lng"]) for p in points],
+            options.get("model", "affine")
+        )
+
+    if options.get("projection", "linear") == "mercator":
+        return mercator_georeferencer(bbox, image_size)
+    return linear_georeferencer(bbox, image_size)
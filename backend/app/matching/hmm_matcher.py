@@ -0,0 +1,251 @@
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.matching.segment_graph import (
+    Candidates,
+    SegmentGraph,
+    ShortestPathCache,
+    find_candidates,
+)
+
+# Newson & Krumm style defaults, in metres
+HMM_CONFIG: dict = {
+    "radius": 50.0,            # candidate search radius
+    "max_candidates": 8,       # per trace point
+    "sigma": 10.0,             # GPS-like noise of the trace (emission)
+    "beta": 30.0,              # route vs straight-line mismatch (transition)
+    "max_transition": 2000.0,  # hard cap on the Dijkstra search radius
+    "route_factor": 4.0,       # detour allowed relative to the longest step
+    "window": 200,             # trace points per Viterbi window
+    "overlap": 20,             # points re-decided by the next window
+}
+
+
+@dataclass
+class MatchResult:
+    points: np.ndarray        # (N, 2) snapped lat/lon, nan where unmatched
+    segments: np.ndarray      # (N,) segment index, -1 where unmatched
+    way_ids: np.ndarray       # (N,) OSM way id, -1 where unmatched
+    polyline: List[tuple]     # road-following lat/lon path through the matches
+    breaks: int               # times the chain had to restart
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def matched_fraction(self) -> float:
+        return float((self.segments >= 0).mean()) if len(self.segments) else 0.0
+
+
+class HMMMatcher:
+    """
+    Hidden Markov map matching: hidden states are candidate projections
+    of each trace point onto nearby road segments.
+
+    - emission: Gaussian in the point-to-segment distance
+    - transition: exponential in |network distance - straight distance|
+      between consecutive points, network distances from a cached
+      bounded Dijkstra
+    - decoding: Viterbi in fixed-size windows; each window commits all
+      but its last `overlap` points and the next window is seeded from the
+      last committed state, so memory stays bounded on long traces
+    """
+
+    def __init__(self, graph: SegmentGraph, config: Optional[dict] = None):
+        self.graph = graph
+        self.config = {**HMM_CONFIG, **(config or {})}
+        self.paths: ShortestPathCache | None = None
+
+    def match(self, latlon) -> MatchResult:
+        cfg = self.config
+        timings = {}
+        latlon = np.asarray(latlon, dtype=np.float64).reshape(-1, 2)
+        n = len(latlon)
+
+        t = time.perf_counter()
+        xy = self.graph.to_xy(latlon)
+        cands = find_candidates(self.graph, xy, cfg["radius"], cfg["max_candidates"])
+        timings["candidates"] = time.perf_counter() - t
+
+        # Points without any candidate are left unmatched
+        seq = np.flatnonzero(np.diff(cands.bounds) > 0)
+
+        # Search only as far as a plausible detour between neighbouring
+        # points; rows are reused while the limit stays the same
+        steps = np.hypot(*np.diff(xy[seq], axis=0).T) if len(seq) > 1 else np.zeros(1)
+        limit = min(cfg["max_transition"], float(steps.max()) * cfg["route_factor"] + 2 * cfg["radius"])
+        if self.paths is None or self.paths.limit_m < limit:
+            self.paths = ShortestPathCache(self.graph, limit)
+        choice = np.full(n, -1, dtype=np.int64)  # candidate row per point
+
+        t = time.perf_counter()
+        self._transition_time = 0.0
+        breaks = 0
+        window = max(2, int(cfg["window"]))
+        overlap = min(max(0, int(cfg["overlap"])), window - 1)
+
+        pos, prev = 0, None
+        while pos < len(seq):
+            end = min(pos + window, len(seq))
+            rows, window_breaks = self._viterbi(xy, cands, seq[pos:end], prev)
+            commit = end if end == len(seq) else end - overlap
+            choice[seq[pos:commit]] = rows[:commit - pos]
+            breaks += window_breaks
+            prev = (seq[commit - 1], rows[commit - pos - 1])
+            pos = commit
+        timings["transitions"] = self._transition_time
+        timings["viterbi"] = time.perf_counter() - t - self._transition_time
+
+        t = time.perf_counter()
+        matched = choice >= 0
+        rows = choice[matched]
+        points = np.full((n, 2), np.nan)
+        segments = np.full(n, -1, dtype=np.int64)
+        way_ids = np.full(n, -1, dtype=np.int64)
+        if len(rows):
+            points[matched] = self.graph.to_latlon(cands.xy[rows])
+            segments[matched] = cands.segment[rows]
+            way_ids[matched] = self.graph.seg_way[cands.segment[rows]]
+        polyline = self._route_polyline(cands, rows)
+        timings["path"] = time.perf_counter() - t
+
+        return MatchResult(
+            points=points,
+            segments=segments,
+            way_ids=way_ids,
+            polyline=polyline,
+            breaks=breaks,
+            timings=timings,
+        )
+
+    # ------------------------------------------------------------------
+    # Viterbi
+    # ------------------------------------------------------------------
+
+    def _viterbi(self, xy, cands: Candidates, steps: np.ndarray, prev) -> tuple[np.ndarray, int]:
+        """
+        Most likely candidate row for each point in steps. prev is the
+        (point, row) committed just before this window, or None.
+        """
+        sigma = self.config["sigma"]
+
+        # Shortest-path rows for every segment end in the window, batched
+        rows = np.concatenate([np.arange(*cands.bounds[k:k + 2]) for k in steps])
+        segs = cands.segment[rows]
+        self.paths.prefetch(np.concatenate([self.graph.seg_u[segs], self.graph.seg_v[segs]]))
+
+        emissions = [-0.5 * (cands.distance[cands.rows(k)] / sigma) ** 2 for k in steps]
+
+        scores = emissions[0]
+        if prev is not None:
+            seeded = self._transition(xy, cands, prev[0], steps[0], np.array([prev[1]]))[0] + scores
+            if np.isfinite(seeded).any():
+                scores = seeded
+
+        breaks = 0
+        chosen = np.empty(len(steps), dtype=np.int64)
+        backpointers = []
+        chain_start = 0
+
+        for i in range(1, len(steps)):
+            total = scores[:, None] + self._transition(xy, cands, steps[i - 1], steps[i])
+            best = np.argmax(total, axis=0)
+            best_scores = total[best, np.arange(total.shape[1])]
+
+            if not np.isfinite(best_scores).any():
+                # No connected path: close the chain and restart here
+                chosen[chain_start:i] = _backtrack(scores, backpointers)
+                breaks += 1
+                chain_start, backpointers = i, []
+                scores = emissions[i]
+                continue
+
+            backpointers.append(best)
+            scores = best_scores + emissions[i]
+
+        chosen[chain_start:] = _backtrack(scores, backpointers)
+        # Local candidate index -> global candidate row
+        return cands.bounds[steps] + chosen, breaks
+
+    def _transition(self, xy, cands: Candidates, a: int, b: int, rows_a=None) -> np.ndarray:
+        """Log transition matrix between the candidates of points a and b."""
+        t = time.perf_counter()
+        g = self.graph
+        rows_a = np.arange(*cands.bounds[a:a + 2]) if rows_a is None else rows_a
+        rows_b = np.arange(*cands.bounds[b:b + 2])
+
+        seg_a, off_a = cands.segment[rows_a], cands.offset[rows_a]
+        seg_b, off_b = cands.segment[rows_b], cands.offset[rows_b]
+        len_a, len_b = g.seg_len[seg_a], g.seg_len[seg_b]
+
+        # Leave a's segment by either end, enter b's segment by either end
+        ends_a = np.stack([g.seg_u[seg_a], g.seg_v[seg_a]])     # (2, ka)
+        ends_b = np.stack([g.seg_u[seg_b], g.seg_v[seg_b]])     # (2, kb)
+        exit_cost = np.stack([off_a, len_a - off_a])            # (2, ka)
+        entry_cost = np.stack([off_b, len_b - off_b])           # (2, kb)
+
+        sources, src_idx = np.unique(ends_a, return_inverse=True)
+        targets, tgt_idx = np.unique(ends_b, return_inverse=True)
+        network = self.paths.matrix(sources, targets)
+        src_idx = src_idx.reshape(ends_a.shape)
+        tgt_idx = tgt_idx.reshape(ends_b.shape)
+
+        route = np.full((len(rows_a), len(rows_b)), np.inf)
+        for i in range(2):
+            for j in range(2):
+                d = network[src_idx[i][:, None], tgt_idx[j][None, :]]
+                route = np.minimum(route, exit_cost[i][:, None] + d + entry_cost[j][None, :])
+
+        same = seg_a[:, None] == seg_b[None, :]
+        route = np.where(same, np.minimum(route, np.abs(off_b[None, :] - off_a[:, None])), route)
+
+        straight = np.hypot(*(xy[b] - xy[a]))
+        log_p = -np.abs(route - straight) / self.config["beta"]
+        log_p[~np.isfinite(route)] = -np.inf
+
+        self._transition_time += time.perf_counter() - t
+        return log_p
+
+    # ------------------------------------------------------------------
+    # Output
+    # ------------------------------------------------------------------
+
+    def _route_polyline(self, cands: Candidates, rows: np.ndarray) -> List[tuple]:
+        """Snapped points joined by the shortest road paths between them."""
+        xy = []
+        for i, row in enumerate(rows.tolist()):
+            if i:
+                xy.extend(self._connect(cands, rows[i - 1], row))
+            xy.append(cands.xy[row])
+        if not xy:
+            return []
+        return [tuple(p) for p in self.graph.to_latlon(np.array(xy)).tolist()]
+
+    def _connect(self, cands: Candidates, row_a: int, row_b: int) -> List[np.ndarray]:
+        g = self.graph
+        seg_a, seg_b = cands.segment[row_a], cands.segment[row_b]
+        if seg_a == seg_b:
+            return []
+
+        off_a, off_b = cands.offset[row_a], cands.offset[row_b]
+        best, best_path = np.inf, []
+        for end_a, exit_cost in ((g.seg_u[seg_a], off_a), (g.seg_v[seg_a], g.seg_len[seg_a] - off_a)):
+            for end_b, entry_cost in ((g.seg_u[seg_b], off_b), (g.seg_v[seg_b], g.seg_len[seg_b] - off_b)):
+                d = self.paths.matrix(np.array([end_a]), np.array([end_b]))[0, 0]
+                if exit_cost + d + entry_cost < best:
+                    best = exit_cost + d + entry_cost
+                    best_path = (int(end_a), int(end_b))
+
+        if not best_path:
+            return []  # chain break: jump straight to the next match
+        return [g.node_xy[node] for node in self.paths.path(*best_path)]
+
+
+def _backtrack(scores: np.ndarray, backpointers: List[np.ndarray]) -> np.ndarray:
+    state = int(np.argmax(scores))
+    states = [state]
+    for bp in reversed(backpointers):
+        state = int(bp[state])
+        states.append(state)
+    return np.array(states[::-1], dtype=np.int64)
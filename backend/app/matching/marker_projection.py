@@ -1,11 +1,91 @@
-def project_point_to_polyline(point, polyline):
-    closest = None
-    min_dist = float("inf")
+from dataclasses import dataclass
+
+import numpy as np
+import shapely
+from shapely import STRtree
+
+from app.core.geo_utils import from_local_meters, to_local_meters
+
+
+@dataclass
+class MarkerProjection:
+    """Batch projection result, one row per marker."""
+    point: np.ndarray     # (M, 2) snapped point, in the polyline's coordinates
+    segment: np.ndarray   # (M,) index i of segment polyline[i] -> polyline[i + 1]
+    fraction: np.ndarray  # (M,) position along that segment, 0..1
+    along: np.ndarray     # (M,) distance from the polyline start
+    distance: np.ndarray  # (M,) marker-to-polyline distance
+
+
+class PolylineIndex:
+    """
+    Segment-level STRtree over one polyline, for snapping many markers
+    (start/finish, km markers, anchor points) onto it.
+
+    With geo=True points are (lat, lon) and distances are metres
+    (equirectangular around the polyline); otherwise coordinates are
+    planar (e.g. image pixels) and distances use the same units.
+    """
+
+    def __init__(self, polyline, geo: bool = False):
+        self.vertices = np.asarray(polyline, dtype=np.float64).reshape(-1, 2)
+        if len(self.vertices) == 0:
+            raise ValueError("Cannot project onto an empty polyline")
+
+        self.geo = geo
+        self._origin = self.vertices.mean(axis=0)
+
+        xy = self._to_xy(self.vertices)
+        if len(xy) == 1:
+            xy = np.vstack([xy, xy])  # single point: one zero-length segment
+        self._a, self._b = xy[:-1], xy[1:]
+        self._ab = self._b - self._a
+        self.lengths = np.hypot(*self._ab.T)
+        self.cumulative = np.concatenate([[0.0], np.cumsum(self.lengths)])
+        self.tree = STRtree(shapely.linestrings(np.stack([self._a, self._b], axis=1)))
 
-    for p in polyline:
-        d = abs(point[0] - p[0]) + abs(point[1] - p[1])
-        if d < min_dist:
-            min_dist = d
-            closest = p
+    @property
+    def length(self) -> float:
+        return float(self.cumulative[-1])
 
-    return closest
+    def project(self, points) -> MarkerProjection:
+        pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if len(pts) == 0:
+            empty = np.empty(0)
+            return MarkerProjection(np.empty((0, 2)), empty.astype(np.int64), empty, empty, empty)
+        if not np.isfinite(pts).all():
+            raise ValueError("Markers must have finite coordinates")
+
+        p = self._to_xy(pts)
+        # Nearest segment per marker in one indexed query
+        marker_idx, seg = self.tree.query_nearest(shapely.points(p), all_matches=False)
+        seg = seg[np.argsort(marker_idx)]
+
+        a, ab, length = self._a[seg], self._ab[seg], self.lengths[seg]
+        t = np.einsum("ij,ij->i", p - a, ab) / np.maximum(length, 1e-12) ** 2
+        t = np.clip(t, 0.0, 1.0)
+        snapped = a + t[:, None] * ab
+
+        return MarkerProjection(
+            point=self._from_xy(snapped),
+            segment=seg,
+            fraction=t,
+            along=self.cumulative[seg] + t * length,
+            distance=np.hypot(*(p - snapped).T),
+        )
+
+    def _to_xy(self, pts: np.ndarray) -> np.ndarray:
+        return to_local_meters(pts, self._origin) if self.geo else pts
+
+    def _from_xy(self, xy: np.ndarray) -> np.ndarray:
+        return from_local_meters(xy, self._origin) if self.geo else xy
+
+
+def project_points(points, polyline, geo: bool = False) -> MarkerProjection:
+    """One-off batch projection; build a PolylineIndex to reuse it."""
+    return PolylineIndex(polyline, geo=geo).project(points)
+
+
+def project_point_to_polyline(point, polyline):
+    """Closest point on the polyline's segments to a single point."""
+    return tuple(project_points([point], polyline).point[0].tolist())
@@ -1,15 +1,41 @@
+import numpy as np
+
 from .models import MapMatchCandidate
 from .shape_similarity import hausdorff
 from .scoring import score_candidate
+from .road_index import RoadIndex, CORRIDOR_METERS
+
 
+def match_route(
+    geo_polyline,
+    osm_ways=None,
+    index: RoadIndex | None = None,
+    buffer_m=CORRIDOR_METERS,
+    anchors=None
+):
+    """
+    Scores the ways within buffer_m metres of the route. Pass a prebuilt
+    index (e.g. RoadProvider.get_index) to skip building one from osm_ways.
 
-def match_route(geo_polyline, osm_ways):
+    Ways passing through anchors (lat, lon; default: the route's start and
+    finish) get the anchor bonus.
+    """
     candidates = []
+    route = np.asarray(geo_polyline, dtype=np.float64)
+
+    if index is None:
+        index = RoadIndex.from_ways(osm_ways or [])
 
-    for way in osm_ways:
+    if anchors is None:
+        anchors = route[[0, -1]] if len(route) else []
+    bonus = index.anchors.label_bonus(anchors) if index.size else {}
+
+    for way in index.ways_near(route, buffer_m):
         road = [(n["lat"], n["lon"]) for n in way["geometry"]]
-        shape = hausdorff(geo_polyline, road)
-        score = score_candidate(abs(len(geo_polyline) - len(road)), shape, 0)
+        shape = hausdorff(route, road)
+        score = score_candidate(
+            abs(len(geo_polyline) - len(road)), shape, bonus.get(way["id"], 0.0)
+        )
         candidates.append(
             MapMatchCandidate(
                 osm_way_id=way["id"],
@@ -1,14 +1,39 @@
-import requests
+import os
 
+import httpx
 
-OVERPASS_URL = "https://overpass-api.de/api/interpreter"
 
+OVERPASS_URL = os.getenv("OVERPASS_URL", "https://overpass-api.de/api/interpreter")
 
-def query_roads(bbox):
-    query = f"""
-    [out:json];
-    way["highway"]({bbox});
+# Server-side query budget (seconds) and the client timeout around it
+OVERPASS_QUERY_TIMEOUT = 25
+OVERPASS_HTTP_TIMEOUT = httpx.Timeout(OVERPASS_QUERY_TIMEOUT + 5, connect=5.0)
+
+
+def build_query(bbox: dict) -> str:
+    """
+    Overpass QL for all highway ways (with geometry and node ids) in a
+    normalized bbox.
+    """
+    area = f'{bbox["min_lat"]},{bbox["min_lon"]},{bbox["max_lat"]},{bbox["max_lon"]}'
+    return f"""
+    [out:json][timeout:{OVERPASS_QUERY_TIMEOUT}];
+    way["highway"]({area});
     out geom;
     """
-    res = requests.post(OVERPASS_URL, data=query)
+
+
+def query_roads(bbox: dict) -> dict:
+    """
+    Blocking one-off query. Servers should go through
+    road_provider.get_road_provider(), which tiles, caches and pools.
+    """
+    res = httpx.post(OVERPASS_URL, data={"data": build_query(bbox)}, timeout=OVERPASS_HTTP_TIMEOUT)
+    res.raise_for_status()
+    return res.json()
+
+
+async def query_roads_async(client: httpx.AsyncClient, bbox: dict) -> dict:
+    res = await client.post(OVERPASS_URL, data={"data": build_query(bbox)})
+    res.raise_for_status()
     return res.json()
@@ -0,0 +1,95 @@
+import math
+from typing import List
+
+import numpy as np
+import shapely
+from shapely import STRtree
+
+from app.matching.anchors import AnchorIndex
+from app.matching.georeference import lonlat_to_mercator
+from app.matching.road_provider import COORD_SCALE, RoadTile
+
+# Default half-width of the corridor around a route that candidate ways
+# must intersect.
+CORRIDOR_METERS = 75.0
+
+
+class RoadIndex:
+    """
+    STRtree over the ways of a RoadTile, in Web Mercator metres.
+
+    Build once per road dataset (RoadProvider keeps one per cached tile)
+    and query it for every route.
+    """
+
+    def __init__(self, tile: RoadTile):
+        self.tile = tile
+
+        lat = tile.coords[:, 0] / COORD_SCALE
+        lon = tile.coords[:, 1] / COORD_SCALE
+        x, y = lonlat_to_mercator(lon, lat)
+        way_index = np.repeat(np.arange(tile.size), np.diff(tile.offsets))
+
+        # Single-node ways cannot form a line; give them a zero-length one
+        counts = np.diff(tile.offsets)
+        if (counts == 1).any():
+            lone = np.flatnonzero(counts[way_index] == 1)
+            x = np.insert(x, lone, x[lone])
+            y = np.insert(y, lone, y[lone])
+            way_index = np.insert(way_index, lone, way_index[lone])
+
+        self.lines = (
+            shapely.linestrings(x, y, indices=way_index)
+            if tile.size else np.empty(0, dtype=object)
+        )
+        self.tree = STRtree(self.lines)
+        self._anchors: AnchorIndex | None = None
+
+    @classmethod
+    def from_ways(cls, ways: List[dict]) -> "RoadIndex":
+        return cls(RoadTile.from_elements(ways))
+
+    @property
+    def size(self) -> int:
+        return self.tile.size
+
+    @property
+    def anchors(self) -> AnchorIndex:
+        """KD-tree over the road nodes labelled by way id, built on first use."""
+        if self._anchors is None:
+            self._anchors = AnchorIndex(
+                self.tile.coords / COORD_SCALE,
+                labels=np.repeat(self.tile.way_ids, np.diff(self.tile.offsets))
+            )
+        return self._anchors
+
+    def corridor_mask(self, route, buffer_m: float = CORRIDOR_METERS) -> np.ndarray:
+        """
+        Boolean mask over the index's ways: True where a way intersects
+        the route (lat/lon points) buffered by buffer_m metres.
+        """
+        mask = np.zeros(self.size, dtype=bool)
+        corridor = route_corridor(route, buffer_m)
+        if corridor is None or self.size == 0:
+            return mask
+        mask[self.tree.query(corridor, predicate="intersects")] = True
+        return mask
+
+    def ways_near(self, route, buffer_m: float = CORRIDOR_METERS) -> List[dict]:
+        return self.tile.to_elements(self.corridor_mask(route, buffer_m))
+
+
+def route_corridor(route, buffer_m: float):
+    """
+    Route (lat/lon) buffered by buffer_m ground metres, as a mercator
+    polygon. Mercator stretches lengths by 1 / cos(lat), so the buffer is
+    scaled the same way.
+    """
+    pts = np.asarray(route, dtype=np.float64).reshape(-1, 2)
+    if len(pts) == 0:
+        return None
+
+    x, y = lonlat_to_mercator(pts[:, 1], pts[:, 0])
+    scale = 1.0 / math.cos(math.radians(float(pts[:, 0].mean())))
+    geom = shapely.points(x[0], y[0]) if len(pts) == 1 else shapely.linestrings(x, y)
+    return shapely.buffer(geom, buffer_m * scale)
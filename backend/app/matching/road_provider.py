@@ -0,0 +1,437 @@
+import asyncio
+import json
+import math
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Protocol, Tuple
+
+import httpx
+import numpy as np
+
+from app.core.geo_utils import METERS_PER_DEGREE, normalize_bbox
+from app.matching.georeference import EARTH_RADIUS, MAX_MERCATOR_LAT
+from app.matching.osm_client import OVERPASS_HTTP_TIMEOUT, query_roads_async
+from app.print_logging import log
+
+if TYPE_CHECKING:
+    from app.matching.road_index import RoadIndex
+
+# z14 tiles are ~2.4 km wide at the equator: a typical search bbox
+# touches a handful of them and neighbouring requests share most.
+TILE_ZOOM = 14
+COORD_SCALE = 1e7  # lat/lon stored as int32 fixed point, like OSM itself
+
+Tile = Tuple[int, int, int]  # (zoom, x, y)
+
+
+# -------------------------
+# Tile math
+# -------------------------
+
+def tiles_for_bbox(bbox: dict, zoom: int = TILE_ZOOM) -> List[Tile]:
+    """Web Mercator (slippy map) tiles covering a bbox."""
+    bbox = normalize_bbox(bbox)
+    x0, y0 = _tile_xy(bbox["min_lon"], bbox["max_lat"], zoom)
+    x1, y1 = _tile_xy(bbox["max_lon"], bbox["min_lat"], zoom)
+    return [(zoom, x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+
+
+def tile_bbox(tile: Tile) -> dict:
+    zoom, x, y = tile
+    n = 2 ** zoom
+
+    def lat(ty):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * ty / n))))
+
+    return {
+        "min_lat": lat(y + 1),
+        "max_lat": lat(y),
+        "min_lon": x / n * 360.0 - 180.0,
+        "max_lon": (x + 1) / n * 360.0 - 180.0,
+    }
+
+
+def _tile_xy(lon: float, lat: float, zoom: int) -> Tuple[int, int]:
+    n = 2 ** zoom
+    lat = max(-MAX_MERCATOR_LAT, min(MAX_MERCATOR_LAT, lat))
+    mx = math.radians(lon) * EARTH_RADIUS
+    my = math.log(math.tan(math.pi / 4 + math.radians(lat) / 2)) * EARTH_RADIUS
+    half = math.pi * EARTH_RADIUS
+    x = int((mx + half) / (2 * half) * n)
+    y = int((half - my) / (2 * half) * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+# -------------------------
+# Compact tile storage
+# -------------------------
+
+@dataclass
+class RoadTile:
+    """
+    Ways of one tile as flat arrays; way i spans
+    coords[offsets[i]:offsets[i + 1]].
+    """
+    way_ids: np.ndarray   # (W,) int64
+    offsets: np.ndarray   # (W + 1,) int64
+    coords: np.ndarray    # (P, 2) int32 lat/lon * COORD_SCALE
+    node_ids: np.ndarray  # (P,) int64, 0 when unknown
+    highway: np.ndarray   # (W,) str
+
+    @property
+    def size(self) -> int:
+        return len(self.way_ids)
+
+    @classmethod
+    def from_elements(cls, elements: List[dict]) -> "RoadTile":
+        ways = [e for e in elements if e.get("type", "way") == "way" and e.get("geometry")]
+        coords = [
+            (round(n["lat"] * COORD_SCALE), round(n["lon"] * COORD_SCALE))
+            for w in ways for n in w["geometry"]
+        ]
+        node_ids = []
+        for w in ways:
+            nodes = w.get("nodes") or []
+            node_ids.extend(nodes if len(nodes) == len(w["geometry"]) else [0] * len(w["geometry"]))
+
+        return cls(
+            way_ids=np.array([w["id"] for w in ways], dtype=np.int64),
+            offsets=np.cumsum([0] + [len(w["geometry"]) for w in ways], dtype=np.int64),
+            coords=np.array(coords, dtype=np.int32).reshape(-1, 2),
+            node_ids=np.array(node_ids, dtype=np.int64),
+            highway=np.array([w.get("tags", {}).get("highway", "") for w in ways], dtype=str),
+        )
+
+    def to_elements(self, keep: Optional[np.ndarray] = None) -> List[dict]:
+        """Overpass-style way dicts, as matcher.match_route consumes them."""
+        latlon = (self.coords / COORD_SCALE).tolist()
+        node_ids = self.node_ids.tolist()
+        offsets = self.offsets.tolist()
+        indices = range(self.size) if keep is None else np.flatnonzero(keep).tolist()
+
+        ways = []
+        for i in indices:
+            a, b = offsets[i], offsets[i + 1]
+            ways.append({
+                "type": "way",
+                "id": int(self.way_ids[i]),
+                "nodes": node_ids[a:b],
+                "geometry": [{"lat": lat, "lon": lon} for lat, lon in latlon[a:b]],
+                "tags": {"highway": str(self.highway[i])},
+            })
+        return ways
+
+    def way_bounds(self) -> np.ndarray:
+        """(W, 4) min_lat, min_lon, max_lat, max_lon per way."""
+        if self.size == 0:
+            return np.empty((0, 4))
+        starts = self.offsets[:-1]
+        lo = np.minimum.reduceat(self.coords, starts, axis=0)
+        hi = np.maximum.reduceat(self.coords, starts, axis=0)
+        return np.hstack([lo, hi]) / COORD_SCALE
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp.npz")
+        np.savez_compressed(
+            tmp,
+            way_ids=self.way_ids,
+            offsets=self.offsets,
+            coords=self.coords,
+            node_ids=self.node_ids,
+            highway=self.highway,
+        )
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> "RoadTile":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(**{name: data[name] for name in data.files})
+
+
+# -------------------------
+# Backends
+# -------------------------
+
+class RoadBackend(Protocol):
+    async def fetch(self, bbox: dict) -> List[dict]:
+        """Overpass-style way elements intersecting a normalized bbox."""
+
+    async def close(self) -> None: ...
+
+
+class FixtureRoadBackend:
+    """
+    Serves ways from local Overpass JSON files (a file or a directory of
+    *.json), so matching runs without network access.
+    """
+
+    def __init__(self, path: str):
+        root = Path(path)
+        files = sorted(root.glob("*.json")) if root.is_dir() else [root]
+
+        elements = {}
+        for file in files:
+            with open(file, encoding="utf-8") as f:
+                for e in json.load(f).get("elements", []):
+                    if e.get("type", "way") == "way" and e.get("geometry"):
+                        elements[e["id"]] = e
+
+        self._tile = RoadTile.from_elements(list(elements.values()))
+        self._bounds = self._tile.way_bounds()
+        log(f"road fixtures loaded ways={self._tile.size} files={len(files)}")
+
+    async def fetch(self, bbox: dict) -> List[dict]:
+        return self._tile.to_elements(_intersects(self._bounds, bbox))
+
+    async def close(self) -> None:
+        pass
+
+
+class OverpassRoadBackend:
+    """Live Overpass queries over one pooled, keep-alive HTTP client."""
+
+    def __init__(self, max_connections: int = 2):
+        self._client = httpx.AsyncClient(
+            timeout=OVERPASS_HTTP_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections
+            ),
+            headers={"User-Agent": "WorkoutMapCreator/1.0"},
+        )
+
+    async def fetch(self, bbox: dict) -> List[dict]:
+        data = await query_roads_async(self._client, bbox)
+        return data.get("elements", [])
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+def _merge_tiles(tiles: List[RoadTile], masks: List[np.ndarray]) -> List[dict]:
+    """
+    Ways selected by each tile's mask, one per way id. Geometry is not
+    clipped: like an Overpass bbox query, a way comes back whole with all
+    its nodes, even where it runs outside the request bbox.
+    """
+    ways, seen = [], set()
+    for tile, mask in zip(tiles, masks):
+        if tile.size == 0:
+            continue
+        # Ways crossing tile edges are stored in every tile they touch
+        keep = mask & ~np.isin(tile.way_ids, list(seen))
+        seen.update(tile.way_ids[keep].tolist())
+        ways.extend(tile.to_elements(keep))
+    return ways
+
+
+def _intersects(bounds: np.ndarray, bbox: dict) -> np.ndarray:
+    return (
+        (bounds[:, 0] <= bbox["max_lat"]) & (bounds[:, 2] >= bbox["min_lat"])
+        & (bounds[:, 1] <= bbox["max_lon"]) & (bounds[:, 3] >= bbox["min_lon"])
+    )
+
+
+# -------------------------
+# Provider
+# -------------------------
+
+class RoadProvider:
+    """
+    Road ways for a bbox, assembled from cached Web Mercator tiles.
+
+    Lookup order per tile: memory LRU -> compressed .npz on disk ->
+    backend. Concurrent requests for the same missing tile share one
+    fetch, and fetches are capped at max_concurrency.
+    """
+
+    def __init__(
+        self,
+        backend: RoadBackend,
+        cache_dir: str | None = None,
+        zoom: int = TILE_ZOOM,
+        memory_tiles: int = 256,
+        max_age_s: float | None = None,
+        max_concurrency: int = 2,
+    ):
+        self.backend = backend
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.zoom = zoom
+        self.memory_tiles = memory_tiles
+        self.max_age_s = max_age_s
+
+        self._memory: "OrderedDict[Tile, RoadTile]" = OrderedDict()
+        self._inflight: Dict[Tile, asyncio.Task] = {}
+        self._indexes: Dict[Tile, "RoadIndex"] = {}
+        self._fetch_slots = asyncio.Semaphore(max_concurrency)
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.fetches = 0
+
+    async def get_ways(self, bbox: dict) -> List[dict]:
+        """
+        Overpass-style way dicts whose bounds intersect bbox, one per way
+        id, with full (unclipped) geometry.
+        """
+        bbox = normalize_bbox(bbox)
+        tiles = await asyncio.gather(*(self.get_tile(t) for t in tiles_for_bbox(bbox, self.zoom)))
+        return _merge_tiles(tiles, [_intersects(t.way_bounds(), bbox) for t in tiles])
+
+    async def ways_near(self, route, buffer_m: float | None = None) -> List[dict]:
+        """
+        Ways intersecting a corridor of buffer_m metres around a lat/lon
+        route, found through each tile's cached STRtree.
+        """
+        # Imported here: road_index builds on RoadTile from this module
+        from app.matching.road_index import CORRIDOR_METERS
+
+        buffer_m = CORRIDOR_METERS if buffer_m is None else buffer_m
+        pts = np.asarray(route, dtype=np.float64).reshape(-1, 2)
+        if len(pts) == 0:
+            return []
+
+        pad_lat = buffer_m / METERS_PER_DEGREE
+        pad_lon = pad_lat / max(math.cos(math.radians(float(pts[:, 0].mean()))), 1e-6)
+        bbox = {
+            "min_lat": float(pts[:, 0].min()) - pad_lat,
+            "max_lat": float(pts[:, 0].max()) + pad_lat,
+            "min_lon": float(pts[:, 1].min()) - pad_lon,
+            "max_lon": float(pts[:, 1].max()) + pad_lon,
+        }
+
+        keys = tiles_for_bbox(bbox, self.zoom)
+        tiles = await asyncio.gather(*(self.get_tile(t) for t in keys))
+        indexes = await asyncio.gather(*(self.get_index(k) for k in keys))
+        return _merge_tiles(tiles, [index.corridor_mask(pts, buffer_m) for index in indexes])
+
+    async def get_index(self, tile: Tile) -> "RoadIndex":
+        """STRtree index of a tile, built once and kept with the cached tile."""
+        from app.matching.road_index import RoadIndex
+
+        index = self._indexes.get(tile)
+        if index is None:
+            road_tile = await self.get_tile(tile)
+            index = await asyncio.to_thread(RoadIndex, road_tile)
+            if tile in self._memory:
+                self._indexes[tile] = index
+        return index
+
+    async def get_tile(self, tile: Tile) -> RoadTile:
+        cached = self._memory.get(tile)
+        if cached is not None:
+            self._memory.move_to_end(tile)
+            self.memory_hits += 1
+            return cached
+
+        task = self._inflight.get(tile)
+        if task is None:
+            task = asyncio.ensure_future(self._load_tile(tile))
+            self._inflight[tile] = task
+            task.add_done_callback(lambda _: self._inflight.pop(tile, None))
+        return await task
+
+    def stats(self) -> dict:
+        return {
+            "memory_tiles": len(self._memory),
+            "indexed_tiles": len(self._indexes),
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "fetches": self.fetches,
+            "zoom": self.zoom,
+        }
+
+    async def close(self) -> None:
+        await self.backend.close()
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+
+    async def _load_tile(self, tile: Tile) -> RoadTile:
+        road_tile = await asyncio.to_thread(self._read_disk, tile)
+        if road_tile is not None:
+            self.disk_hits += 1
+        else:
+            async with self._fetch_slots:
+                elements = await self.backend.fetch(tile_bbox(tile))
+            self.fetches += 1
+            road_tile = RoadTile.from_elements(elements)
+            await asyncio.to_thread(self._write_disk, tile, road_tile)
+
+        self._memory[tile] = road_tile
+        while len(self._memory) > self.memory_tiles:
+            evicted, _ = self._memory.popitem(last=False)
+            self._indexes.pop(evicted, None)
+        return road_tile
+
+    def _tile_path(self, tile: Tile) -> Path:
+        zoom, x, y = tile
+        return self.cache_dir / str(zoom) / str(x) / f"{y}.npz"
+
+    def _read_disk(self, tile: Tile) -> Optional[RoadTile]:
+        if not self.cache_dir:
+            return None
+        path = self._tile_path(tile)
+        try:
+            if self.max_age_s is not None and time.time() - path.stat().st_mtime > self.max_age_s:
+                return None
+            return RoadTile.load(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            log(f"road cache: dropping unreadable tile {path}: {e!r}")
+            path.unlink(missing_ok=True)
+            return None
+
+    def _write_disk(self, tile: Tile, road_tile: RoadTile) -> None:
+        if not self.cache_dir:
+            return
+        try:
+            road_tile.save(self._tile_path(tile))
+        except OSError as e:
+            log(f"road cache: disk write failed for {tile}: {e!r}")
+
+
+# -------------------------
+# Shared instance
+# -------------------------
+
+_provider: RoadProvider | None = None
+
+
+def get_road_provider() -> RoadProvider:
+    """
+    Shared provider configured from the environment:
+      ROAD_FIXTURES   Overpass JSON file/dir; set it to run offline
+      ROAD_CACHE_DIR  tile cache directory (default cache/road_tiles,
+                      off for fixtures unless set explicitly)
+      ROAD_CACHE_MAX_AGE_DAYS  refetch tiles older than this
+    """
+    global _provider
+    if _provider is None:
+        fixtures = os.getenv("ROAD_FIXTURES")
+        if fixtures:
+            backend = FixtureRoadBackend(fixtures)
+            cache_dir = os.getenv("ROAD_CACHE_DIR")
+        else:
+            backend = OverpassRoadBackend()
+            cache_dir = os.getenv("ROAD_CACHE_DIR", "cache/road_tiles")
+        max_age = os.getenv("ROAD_CACHE_MAX_AGE_DAYS")
+        _provider = RoadProvider(
+            backend,
+            cache_dir=cache_dir,
+            max_age_s=float(max_age) * 86400 if max_age else None,
+        )
+    return _provider
+
+
+async def close_road_provider() -> None:
+    global _provider
+    if _provider is not None:
+        await _provider.close()
+        _provider = None
@@ -0,0 +1,231 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List
+
+import numpy as np
+import shapely
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+from shapely import STRtree
+
+from app.core.geo_utils import from_local_meters, to_local_meters
+from app.matching.road_provider import COORD_SCALE, RoadTile
+
+
+# -------------------------
+# Segment graph
+# -------------------------
+
+class SegmentGraph:
+    """
+    Road network split into straight segments between consecutive way
+    nodes, in local metres around the network's centre.
+
+    Nodes are shared between ways by OSM node id (or by exact coordinate
+    when ids are missing), so crossings connect. Segments are undirected.
+    """
+
+    def __init__(self, tile: RoadTile):
+        lat_e7 = tile.coords[:, 0].astype(np.int64)
+        lon_e7 = tile.coords[:, 1].astype(np.int64)
+
+        # One key per point: the OSM node id, or a negative coordinate key
+        coord_key = -((lat_e7 + 900_000_000) * (1 << 32) + (lon_e7 + 1_800_000_000)) - 1
+        keys = np.where(tile.node_ids != 0, tile.node_ids, coord_key)
+        _, first, node_of_point = np.unique(keys, return_index=True, return_inverse=True)
+
+        latlon = tile.coords[first] / COORD_SCALE
+        self.origin = latlon.mean(axis=0) if len(latlon) else np.zeros(2)
+        self.node_xy = self.to_xy(latlon)
+
+        # Consecutive points of the same way form a segment
+        starts = np.arange(len(keys) - 1)
+        starts = starts[~np.isin(starts, tile.offsets[1:-1] - 1)]
+        u, v = node_of_point[starts], node_of_point[starts + 1]
+        way = np.repeat(np.arange(tile.size), np.diff(tile.offsets))[starts]
+        keep = u != v
+        u, v, way = u[keep], v[keep], way[keep]
+
+        self.seg_u = u
+        self.seg_v = v
+        self.seg_way = tile.way_ids[way] if tile.size else np.empty(0, dtype=np.int64)
+        self.seg_len = np.hypot(*(self.node_xy[v] - self.node_xy[u]).T)
+
+        # Node adjacency for shortest paths; parallel segments keep the
+        # shortest (csr_matrix would sum duplicates)
+        a, b = np.minimum(u, v), np.maximum(u, v)
+        order = np.lexsort((self.seg_len, b, a))
+        a, b, length = a[order], b[order], self.seg_len[order]
+        first_pair = np.ones(len(a), dtype=bool)
+        first_pair[1:] = (a[1:] != a[:-1]) | (b[1:] != b[:-1])
+        a, b, length = a[first_pair], b[first_pair], length[first_pair]
+
+        n = len(self.node_xy)
+        self.adjacency = csr_matrix(
+            (np.concatenate([length, length]), (np.concatenate([a, b]), np.concatenate([b, a]))),
+            shape=(n, n)
+        )
+
+        coords = np.stack([self.node_xy[u], self.node_xy[v]], axis=1)
+        self.tree = STRtree(shapely.linestrings(coords) if len(coords) else [])
+
+    @classmethod
+    def from_ways(cls, ways: List[dict]) -> "SegmentGraph":
+        return cls(RoadTile.from_elements(ways))
+
+    @property
+    def node_count(self) -> int:
+        return len(self.node_xy)
+
+    @property
+    def segment_count(self) -> int:
+        return len(self.seg_u)
+
+    def to_xy(self, latlon) -> np.ndarray:
+        """(N, 2) lat/lon -> (N, 2) local metres (equirectangular)."""
+        return to_local_meters(latlon, self.origin)
+
+    def to_latlon(self, xy) -> np.ndarray:
+        return from_local_meters(xy, self.origin)
+
+
+# -------------------------
+# Candidates
+# -------------------------
+
+@dataclass
+class Candidates:
+    """
+    Projections of trace points onto nearby segments, flattened and
+    grouped by point: point k owns rows bounds[k]:bounds[k + 1].
+    """
+    bounds: np.ndarray   # (N + 1,)
+    segment: np.ndarray  # (C,) segment index
+    offset: np.ndarray   # (C,) metres from seg_u along the segment
+    distance: np.ndarray # (C,) metres from the trace point
+    xy: np.ndarray       # (C, 2) projected point
+
+    def count(self, k: int) -> int:
+        return int(self.bounds[k + 1] - self.bounds[k])
+
+    def rows(self, k: int) -> slice:
+        return slice(int(self.bounds[k]), int(self.bounds[k + 1]))
+
+
+def find_candidates(
+    graph: SegmentGraph,
+    xy: np.ndarray,
+    radius: float,
+    max_candidates: int
+) -> Candidates:
+    """
+    All segment projections within radius metres of each point (one
+    STRtree query for the whole trace), keeping the closest
+    max_candidates per point.
+    """
+    n = len(xy)
+    if graph.segment_count == 0 or n == 0:
+        empty = np.empty(0)
+        return Candidates(np.zeros(n + 1, dtype=np.int64), empty.astype(np.int64), empty, empty, np.empty((0, 2)))
+
+    point_idx, seg = graph.tree.query(shapely.points(xy), predicate="dwithin", distance=radius)
+
+    a = graph.node_xy[graph.seg_u[seg]]
+    b = graph.node_xy[graph.seg_v[seg]]
+    p = xy[point_idx]
+    ab = b - a
+    length = graph.seg_len[seg]
+    t = np.clip(np.einsum("ij,ij->i", p - a, ab) / np.maximum(length, 1e-9) ** 2, 0.0, 1.0)
+    proj = a + t[:, None] * ab
+    dist = np.hypot(*(p - proj).T)
+
+    # Closest max_candidates per point
+    order = np.lexsort((dist, point_idx))
+    point_idx, seg, t, proj, dist = point_idx[order], seg[order], t[order], proj[order], dist[order]
+    counts = np.bincount(point_idx, minlength=n)
+    rank = np.arange(len(point_idx)) - np.repeat(np.cumsum(counts) - counts, counts)
+    keep = rank < max_candidates
+    counts = np.minimum(counts, max_candidates)
+
+    return Candidates(
+        bounds=np.concatenate([[0], np.cumsum(counts)]),
+        segment=seg[keep],
+        offset=t[keep] * graph.seg_len[seg[keep]],
+        distance=dist[keep],
+        xy=proj[keep],
+    )
+
+
+# -------------------------
+# Shortest paths
+# -------------------------
+
+class ShortestPathCache:
+    """
+    Network distances from source nodes, computed with a bounded
+    Dijkstra and kept per source as compact (sorted targets, distances,
+    predecessors) rows in an LRU.
+    """
+
+    def __init__(self, graph: SegmentGraph, limit_m: float, max_rows: int = 4096):
+        self.graph = graph
+        self.limit_m = limit_m
+        self.max_rows = max_rows
+        self._rows: "OrderedDict[int, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def matrix(self, sources: np.ndarray, targets: np.ndarray) -> np.ndarray:
+        """(len(sources), len(targets)) network distances, inf if farther than limit."""
+        self._ensure(sources)
+        out = np.full((len(sources), len(targets)), np.inf)
+        for i, s in enumerate(sources.tolist()):
+            nodes, dist, _ = self._rows[s]
+            pos = np.searchsorted(nodes, targets)
+            pos = np.minimum(pos, len(nodes) - 1)
+            found = nodes[pos] == targets
+            out[i, found] = dist[pos[found]]
+        return out
+
+    def path(self, source: int, target: int) -> List[int]:
+        """Node path source -> target (inclusive); [] if unreachable."""
+        self._ensure(np.array([source]))
+        nodes, _, pred = self._rows[source]
+        path = [target]
+        while path[-1] != source:
+            pos = np.searchsorted(nodes, path[-1])
+            if pos >= len(nodes) or nodes[pos] != path[-1] or pred[pos] < 0:
+                return []
+            path.append(int(pred[pos]))
+        return path[::-1]
+
+    def prefetch(self, sources: np.ndarray, batch: int = 64) -> None:
+        """Computes missing rows for many sources in a few Dijkstra calls."""
+        self._ensure(sources, batch)
+
+    def _ensure(self, sources: np.ndarray, batch: int = 64) -> None:
+        missing = []
+        for s in np.unique(sources).tolist():
+            if s in self._rows:
+                self._rows.move_to_end(s)
+                self.hits += 1
+            else:
+                missing.append(s)
+        if not missing:
+            return
+
+        self.misses += len(missing)
+        # The adjacency is already symmetric; directed=True skips scipy's
+        # per-call undirected conversion
+        for i in range(0, len(missing), batch):
+            chunk = missing[i:i + batch]
+            dist, pred = dijkstra(
+                self.graph.adjacency, directed=True, indices=chunk,
+                limit=self.limit_m, return_predecessors=True
+            )
+            for s, d, p in zip(chunk, dist, pred):
+                nodes = np.flatnonzero(np.isfinite(d))
+                self._rows[s] = (nodes, d[nodes], p[nodes])
+
+        while len(self._rows) > self.max_rows:
+            self._rows.popitem(last=False)
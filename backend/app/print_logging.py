@@ -1,10 +1,143 @@
-from datetime import datetime
+import atexit
+import json
+import os
+import queue
+import sys
+import threading
+import time
 
+LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40}
 
-def log(msg: str) -> None:
-    """Simple print-based logger for local debugging.
+# LOG_LEVEL drops messages below it before they cost anything;
+# LOG_FORMAT=json writes one JSON object per line for log shippers.
+_level = LEVELS.get(os.getenv("LOG_LEVEL", "info").lower(), LEVELS["info"])
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
 
-    Prefixes messages with UTC timestamp so prints are easier to read in logs.
+# Lines written per stream write once the writer falls behind
+_BATCH = 256
+
+# Records held while stdout is slow; past this, new records are dropped
+# and counted instead of growing memory without bound
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+_queue: "queue.Queue[tuple | threading.Event | None]" = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+_dropped = 0            # total since start, for metrics
+_dropped_unreported = 0  # since the writer last said so
+_dropped_lock = threading.Lock()
+_writer: threading.Thread | None = None
+_writer_pid: int | None = None
+_writer_lock = threading.Lock()
+
+
+def log(msg: str, level: str = "info", **fields) -> None:
+    """Structured, levelled logger.
+
+    Callers only enqueue the record; a background thread formats and
+    writes batches of lines, so logging never blocks a request on stdout.
+    When the queue is full the record is dropped and counted.
+    Extra keyword fields are appended as key=value (or JSON keys).
     """
-    ts = datetime.utcnow().isoformat(timespec="milliseconds") + "Z"
-    print(f"[backend] {ts} - {msg}")
+    global _dropped, _dropped_unreported
+    if LEVELS[level] < _level:
+        return
+    _ensure_writer()
+    try:
+        _queue.put_nowait((time.time(), level, msg, fields))
+    except queue.Full:
+        with _dropped_lock:
+            _dropped += 1
+            _dropped_unreported += 1
+
+
+def set_log_level(level: str) -> None:
+    global _level
+    _level = LEVELS[level]
+
+
+def log_enabled(level: str) -> bool:
+    """For callers that build expensive messages."""
+    return LEVELS[level] >= _level
+
+
+def dropped_log_count() -> int:
+    """Records dropped because the queue was full, in this process."""
+    return _dropped
+
+
+def flush_logs(timeout: float = 2.0) -> None:
+    """Blocks until everything logged so far is written."""
+    if _writer is None or _writer_pid != os.getpid():
+        return
+    done = threading.Event()
+    try:
+        _queue.put(done, timeout=timeout)
+    except queue.Full:
+        return
+    done.wait(timeout)
+
+
+# ---------------------------------------------------------------------
+# Writer
+# ---------------------------------------------------------------------
+
+def _ensure_writer() -> None:
+    global _writer, _writer_pid
+    # Worker processes get their own thread; a forked copy of the
+    # parent's handle would point at a thread that does not exist here
+    if _writer is not None and _writer_pid == os.getpid():
+        return
+    with _writer_lock:
+        if _writer is None or _writer_pid != os.getpid():
+            _writer_pid = os.getpid()
+            _writer = threading.Thread(target=_write_loop, name="log-writer", daemon=True)
+            _writer.start()
+
+
+def _format(record: tuple) -> str:
+    ts, level, msg, fields = record
+    stamp = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(ts)) + f".{int(ts % 1 * 1000):03d}Z"
+    if LOG_FORMAT == "json":
+        return json.dumps({"ts": stamp, "level": level, "msg": msg, **fields}, default=str)
+    extra = "".join(f" {k}={v}" for k, v in fields.items())
+    prefix = "" if level == "info" else f"{level.upper()} "
+    return f"[backend] {stamp} - {prefix}{msg}{extra}"
+
+
+def _take_dropped() -> int:
+    global _dropped_unreported
+    with _dropped_lock:
+        count, _dropped_unreported = _dropped_unreported, 0
+    return count
+
+
+def _write_loop() -> None:
+    while True:
+        item = _queue.get()
+        lines, waiters = [], []
+        dropped = _take_dropped()
+        if dropped:
+            lines.append(_format((time.time(), "warning", "log queue full, records dropped", {"dropped": dropped})))
+        while True:
+            if isinstance(item, threading.Event):
+                waiters.append(item)
+            elif item is not None:
+                lines.append(_format(item))
+            if len(lines) >= _BATCH:
+                break
+            try:
+                item = _queue.get_nowait()
+            except queue.Empty:
+                break
+
+        if lines:
+            try:
+                # sys.stdout is looked up per batch so redirection still works
+                sys.stdout.write("\n".join(lines) + "\n")
+                sys.stdout.flush()
+            except (OSError, ValueError):
+                pass
+        for waiter in waiters:
+            waiter.set()
+
+
+atexit.register(flush_logs)
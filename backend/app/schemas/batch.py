@@ -0,0 +1,40 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+from app.schemas.process import GeoreferenceOptions, ProcessRouteRequest, SearchScope
+
+
+class BatchItemStatus(BaseModel):
+    filename: Optional[str] = None
+    route_id: Optional[str] = None  # None when the upload was rejected
+    status: str
+    progress: Optional[float] = None
+    message: Optional[str] = None
+
+
+class BatchUploadResponse(BaseModel):
+    batch_id: str
+    status: str
+    items: List[BatchItemStatus]
+
+
+class BatchItemOptions(BaseModel):
+    # Per-image overrides of the shared options
+    route_id: str
+    search_scope: Optional[SearchScope] = None
+    georeference: Optional[GeoreferenceOptions] = None
+
+
+class BatchProcessRequest(ProcessRouteRequest):
+    # Shared options (search_scope, simplification, ...) come from
+    # ProcessRouteRequest and apply to every item without an override
+    items: List[BatchItemOptions] = []
+
+
+class BatchStatusResponse(BaseModel):
+    batch_id: str
+    status: str  # uploaded | processing | completed | partial | failed
+    total: int
+    completed: int
+    failed: int
+    items: List[BatchItemStatus]
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Literal, Optional
 
 class BoundingBox(BaseModel):
     north: float
@@ -18,9 +18,34 @@ class Assumptions(BaseModel):
     prefer_roads: bool = True
 
 
+class SimplificationOptions(BaseModel):
+    method: Literal["rdp", "vw", "none"] = "rdp"
+    tolerance: float = 1.0
+    units: Literal["px", "m"] = "px"
+
+
+class ControlPoint(BaseModel):
+    x: float  # image pixels
+    y: float
+    lat: float
+    lng: float
+
+
+class GeoreferenceOptions(BaseModel):
+    # "mercator" for Web Mercator map screenshots (bbox edges are exact,
+    # latitudes in between are not linear)
+    projection: Literal["linear", "mercator"] = "linear"
+    # When given, replaces the bbox with a least-squares fit
+    control_points: Optional[List[ControlPoint]] = None
+    model: Literal["affine", "homography"] = "affine"
+
+
 class ProcessRouteRequest(BaseModel):
     search_scope: Optional[SearchScope] = None
     assumptions: Optional[Assumptions] = None
+    simplification: SimplificationOptions = SimplificationOptions()
+    georeference: GeoreferenceOptions = GeoreferenceOptions()
+    debug: bool = False  # write intermediate CV images for this route
 
 
 class ProcessRouteResponse(BaseModel):
@@ -1,10 +1,22 @@
 from pydantic import BaseModel
-from typing import List
+from typing import Dict, List, Optional
 from app.schemas.common import LatLng
 
 class RefineRouteRequest(BaseModel):
     anchor_points: List[LatLng]
 
 
+class AnchorResult(BaseModel):
+    snapped: LatLng        # where the anchor met the previous route
+    offset_m: float        # anchor distance from the previous route
+    window: List[int]      # [start, end] vertex range that was recomputed
+    points: int            # vertices that replaced it
+
+
 class RefineRouteResponse(BaseModel):
     status: str
+    route_id: Optional[str] = None
+    anchors: List[AnchorResult] = []
+    points_full: Optional[int] = None
+    points_simplified: Optional[int] = None
+    timings_ms: Dict[str, float] = {}
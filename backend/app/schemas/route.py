@@ -1,6 +1,7 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from app.schemas.common import LatLng
+from app.core.route_geometry import DEFAULT_RESOLUTION
 
 class Polyline(BaseModel):
     geo: List[LatLng]
@@ -16,3 +17,10 @@ class RoutePreviewResponse(BaseModel):
     confidence: float
     polyline: Polyline
     polyline_image_space: ImageSpacePolyline
+    resolution: str = DEFAULT_RESOLUTION  # "full" | "simplified"
+    stats: Optional[Dict[str, Any]] = None
+
+
+class DebugArtifactsResponse(BaseModel):
+    route_id: str
+    artifacts: Dict[str, str]  # name -> download url
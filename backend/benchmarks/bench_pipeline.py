@@ -0,0 +1,292 @@
+"""
+Per-stage latency and memory benchmark of the route pipeline on
+deterministic synthetic images (see benchmarks.synthetic).
+
+Each case runs decode -> segment -> cleanup -> centerline -> ordering ->
+simplify -> georeference -> encode -> match stage by stage, plus the
+end-to-end RouteCVExtractor.extract for reference. Times are the best of
+--repeat runs; peak memory comes from one extra tracemalloc run (numpy
+buffers are traced, OpenCV-internal scratch memory is not).
+
+Run from backend/:
+    python -m benchmarks.bench_pipeline --json results/base.json
+    python -m benchmarks.bench_pipeline --json results/new.json --compare results/base.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+from app.core.polyline_codec import encode_many
+from app.core.route_extractor import EXTRACTOR_CONFIG
+from app.core.simplify import simplify_mask
+from app.cv.extractor import RouteCVExtractor
+from app.cv.skeleton_graph import build_skeleton_graph, order_skeleton_graph
+from app.cv.utils import extract_centerline, order_points_nearest_neighbor
+from app.matching.georeference import make_georeferencer
+from app.matching.hmm_matcher import HMMMatcher
+from app.matching.marker_projection import PolylineIndex
+from app.matching.segment_graph import SegmentGraph
+from app.print_logging import set_log_level
+from benchmarks.synthetic import (
+    DEFAULT_SPECS,
+    QUICK_SPECS,
+    SyntheticSpec,
+    encode_png,
+    make_route_image,
+    synthetic_bbox,
+    synthetic_roads,
+)
+
+# The greedy ordering is quadratic; skip it above this many centreline pixels
+GREEDY_MAX_POINTS = 6000
+
+Stage = Tuple[str, Callable[[dict], None]]
+
+
+def pipeline_stages(config: dict, greedy: bool) -> List[Stage]:
+    """
+    (name, fn(ctx)) in pipeline order; each fn reads and extends ctx and
+    returns False when it skipped its work.
+    """
+    extractor = RouteCVExtractor(config=config)
+
+    def decode(ctx):
+        ctx["img"] = cv2.imdecode(np.frombuffer(ctx["png"], np.uint8), cv2.IMREAD_COLOR)
+
+    def segment(ctx):
+        hsv = cv2.cvtColor(ctx["img"], cv2.COLOR_BGR2HSV)
+        ctx["colors"] = extractor._color_masks(hsv)
+        ctx["mask"] = extractor._segment_route(hsv, ctx["colors"])
+
+    def cleanup(ctx):
+        ctx["mask"] = extractor._cleanup(ctx["mask"])
+
+    def centerline(ctx):
+        h, w = ctx["mask"].shape
+        specs = extractor._split_components(ctx["mask"], ctx["colors"], image_size=(w, h))
+        if not specs:
+            raise ValueError("no route component")
+        ctx["component"] = specs[0]
+        ctx["centerline"] = extract_centerline(specs[0].mask, ridge_frac=config.get("ridge_frac", 0.5))
+
+    def ordering(ctx):
+        graph = build_skeleton_graph(ctx["centerline"])
+        ctx["graph"] = graph
+        local = np.asarray(order_skeleton_graph(graph, config.get("min_spur_length", 10)), dtype=np.int64)
+        ctx["pixels"] = local + ctx["component"].offset
+
+    def ordering_greedy(ctx):
+        graph = ctx["graph"]
+        if graph.size > GREEDY_MAX_POINTS:
+            return False
+        order_points_nearest_neighbor(list(zip(graph.xs.tolist(), graph.ys.tolist())))
+
+    def simplify(ctx):
+        ctx["keep"] = simplify_mask(ctx["pixels"].tolist(), "rdp", 1.0)
+
+    def georeference(ctx):
+        h, w = ctx["img"].shape[:2]
+        georef = make_georeferencer(ctx["bbox"], (w, h), {"projection": "linear"})
+        ctx["geo"] = georef.pixels_to_geo(ctx["pixels"])
+
+    def encode(ctx):
+        ctx["encoded"] = encode_many([ctx["geo"], ctx["geo"][ctx["keep"]]])[5]
+
+    def match(ctx):
+        graph = SegmentGraph.from_ways(ctx["roads"])
+        ctx["match"] = HMMMatcher(graph).match(ctx["geo"][ctx["keep"]])
+
+    stages = [
+        ("decode", decode),
+        ("segment", segment),
+        ("cleanup", cleanup),
+        ("centerline", centerline),
+        ("ordering", ordering),
+    ]
+    if greedy:
+        stages.append(("ordering_greedy", ordering_greedy))
+    stages += [
+        ("simplify", simplify),
+        ("georeference", georeference),
+        ("encode", encode),
+        ("match", match),
+    ]
+    return stages
+
+
+def prepare_case(spec: SyntheticSpec) -> dict:
+    """Inputs shared by every run of a case (kept out of the timings)."""
+    img, curve = make_route_image(spec)
+    bbox = synthetic_bbox(spec)
+    georef = make_georeferencer(bbox, (spec.width, spec.height), {"projection": "linear"})
+    return {
+        "png": encode_png(img),
+        "truth": curve,
+        "bbox": bbox,
+        "roads": synthetic_roads(georef.pixels_to_geo(curve), bbox),
+    }
+
+
+def run_case(spec: SyntheticSpec, config: dict, repeat: int, greedy: bool) -> dict:
+    base = prepare_case(spec)
+    stages = pipeline_stages(config, greedy)
+    times: Dict[str, List[float]] = {name: [] for name, _ in stages}
+    times["extract_total"] = []
+
+    for _ in range(repeat):
+        ctx = dict(base)
+        for name, fn in stages:
+            t = time.perf_counter()
+            if fn(ctx) is not False:
+                times[name].append(time.perf_counter() - t)
+
+        t = time.perf_counter()
+        RouteCVExtractor(config=config).extract(base["png"])
+        times["extract_total"].append(time.perf_counter() - t)
+
+    peaks = measure_memory(stages, base, config)
+
+    # Accuracy guard: a "faster" change that stops finding the route shows here
+    pixels = ctx["pixels"]
+    error = PolylineIndex(ctx["truth"]).project(pixels).distance
+    coverage = PolylineIndex(pixels).project(ctx["truth"]).distance
+
+    return {
+        "case": spec.name,
+        "spec": asdict(spec),
+        "points": int(len(pixels)),
+        "points_simplified": int(ctx["keep"].sum()),
+        "truth_error_px": {"mean": float(error.mean()), "p95": float(np.percentile(error, 95))},
+        "truth_coverage_px_p95": float(np.percentile(coverage, 95)),
+        "truth_coverage_px_max": float(coverage.max()),
+        "matched_fraction": ctx["match"].matched_fraction,
+        "stages": {
+            name: {
+                "ms": min(samples) * 1e3,
+                "median_ms": float(np.median(samples)) * 1e3,
+                "peak_kb": peaks.get(name),
+            } if samples else None
+            for name, samples in times.items()
+        },
+    }
+
+
+def measure_memory(stages: List[Stage], base: dict, config: dict) -> Dict[str, float]:
+    """Peak traced allocation per stage above what was live before it, KiB."""
+    peaks = {}
+    ctx = dict(base)
+    tracemalloc.start()
+    try:
+        for name, fn in stages:
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            fn(ctx)
+            peaks[name] = (tracemalloc.get_traced_memory()[1] - before) / 1024
+
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        RouteCVExtractor(config=config).extract(base["png"])
+        peaks["extract_total"] = (tracemalloc.get_traced_memory()[1] - before) / 1024
+    finally:
+        tracemalloc.stop()
+    return peaks
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def print_table(results: List[dict], baseline: Dict[str, dict] | None) -> None:
+    stage_names = list(results[0]["stages"]) if results else []
+    print(f"{'case':<44}" + "".join(f"{name[:12]:>13}" for name in stage_names) + f"{'err px':>9}{'cov px':>9}")
+    for result in results:
+        old = (baseline or {}).get(result["case"])
+        cells = []
+        for name in stage_names:
+            stage = result["stages"][name]
+            before = old["stages"].get(name) if old else None
+            if stage is None:
+                cell = "-"
+            elif before and before["ms"] > 0:
+                cell = f"{stage['ms']:.1f} {stage['ms'] / before['ms']:.2f}x"
+            else:
+                cell = f"{stage['ms']:.1f}"
+            cells.append(f"{cell:>13}")
+        print(
+            f"{result['case']:<44}" + "".join(cells)
+            + f"{result['truth_error_px']['mean']:>9.2f}{result['truth_coverage_px_max']:>9.2f}"
+        )
+    if baseline:
+        print("(Nx = time relative to the --compare run; < 1 is faster)")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--quick", action="store_true", help="two small cases only")
+    parser.add_argument("--cases", help="comma-separated substrings of case names to run")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--greedy", action="store_true",
+                        help="also time the quadratic nearest-neighbour ordering")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="earlier --json output to compare against")
+    args = parser.parse_args()
+
+    specs = QUICK_SPECS if args.quick else DEFAULT_SPECS
+    if args.cases:
+        wanted = args.cases.split(",")
+        specs = [s for s in specs if any(w in s.name for w in wanted)]
+
+    # Stage timings are single-threaded; the component pool is measured
+    # by extract_total only
+    config = {**EXTRACTOR_CONFIG, "component_workers": 1}
+    # The pipeline logs every step; keep the table readable
+    set_log_level("warning")
+
+    results = []
+    for spec in specs:
+        print(f"running {spec.name}", file=sys.stderr)
+        results.append(run_case(spec, config, args.repeat, args.greedy))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = {r["case"]: r for r in json.load(f)["results"]}
+
+    print_table(results, baseline)
+
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"environment": environment(), "config": config, "results": results}, f, indent=2)
+        print(f"wrote {args.json}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
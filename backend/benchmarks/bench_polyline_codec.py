@@ -0,0 +1,88 @@
+"""
+Throughput benchmark for core/polyline_codec against the original
+per-point string encoder. Correctness is covered by
+tests/test_polyline_codec.py, which shares reference_encode.
+
+Run from backend/:
+    python -m benchmarks.bench_polyline_codec
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.core.polyline_codec import decode_polyline, encode_many, encode_polyline
+
+
+def reference_encode(points, precision=5):
+    """The per-point str += encoder polyline_utils used to ship."""
+    def encode_value(value):
+        value = value << 1
+        if value < 0:
+            value = ~value
+        encoded = ""
+        while value >= 0x20:
+            encoded += chr((0x20 | (value & 0x1F)) + 63)
+            value >>= 5
+        return encoded + chr(value + 63)
+
+    factor = 10 ** precision
+    result, prev_lat, prev_lng = [], 0, 0
+    for lat, lng in points:
+        lat_i, lng_i = int(round(lat * factor)), int(round(lng * factor))
+        result.append(encode_value(lat_i - prev_lat))
+        result.append(encode_value(lng_i - prev_lng))
+        prev_lat, prev_lng = lat_i, lng_i
+    return "".join(result)
+
+
+def random_route(n, rng, scale=1e-4):
+    origin = rng.uniform([-80, -180], [80, 180])
+    steps = rng.normal(scale=scale, size=(n, 2))
+    return np.clip(origin + np.cumsum(steps, axis=0), [-90, -180], [90, 180])
+
+
+def timed(fn, *args, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        value = fn(*args)
+        best = min(best, time.perf_counter() - t)
+    return value, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="1000,10000,100000,1000000")
+    parser.add_argument("--batch", type=int, default=1000,
+                        help="routes in the encode_many batch")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+
+    print(f"{'points':>8} {'reference':>11} {'encode':>10} {'speedup':>8} {'decode':>10} {'Mpts/s':>7}")
+    for n in (int(s) for s in args.sizes.split(",")):
+        route = random_route(n, rng)
+        points = route.tolist()
+
+        fast, t_fast = timed(encode_polyline, route)
+        _, t_decode = timed(decode_polyline, fast)
+        _, t_ref = timed(reference_encode, points, repeat=1)
+
+        print(
+            f"{n:>8} {t_ref * 1e3:9.1f}ms {t_fast * 1e3:8.2f}ms {t_ref / t_fast:7.0f}x "
+            f"{t_decode * 1e3:8.2f}ms {n / t_fast / 1e6:7.1f}"
+        )
+
+    batch = [random_route(int(rng.integers(50, 2000)), rng) for _ in range(args.batch)]
+    total = sum(len(r) for r in batch)
+    _, t_many = timed(encode_many, batch, (5, 6))
+    _, t_loop = timed(lambda: [encode_polyline(r, p) for p in (5, 6) for r in batch])
+    print(
+        f"encode_many: {args.batch} routes / {total} points at 1e5+1e6 "
+        f"in {t_many * 1e3:.1f}ms (per-route loop {t_loop * 1e3:.1f}ms)"
+    )
+
+
+if __name__ == "__main__":
+    main()
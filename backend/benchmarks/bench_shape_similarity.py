@@ -0,0 +1,96 @@
+"""
+Benchmark for matching/shape_similarity against the original
+pure-Python Hausdorff.
+
+Run from backend/:
+    python -m benchmarks.bench_shape_similarity
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.matching.shape_similarity import hausdorff, frechet
+
+
+def reference_hausdorff(a, b):
+    """The per-pair np.array implementation shape_similarity used to ship."""
+    def dist(p, q):
+        return np.linalg.norm(np.array(p) - np.array(q))
+
+    def h(A, B):
+        return max(min(dist(a, b) for b in B) for a in A)
+
+    return max(h(a, b), h(b, a))
+
+
+def reference_frechet(P, Q):
+    """Textbook O(n*m) table DP, used only to check the vectorized sweep."""
+    n, m = len(P), len(Q)
+    ca = np.full((n, m), np.inf)
+    for i in range(n):
+        for j in range(m):
+            d = np.hypot(P[i][0] - Q[j][0], P[i][1] - Q[j][1])
+            if i == 0 and j == 0:
+                ca[i, j] = d
+            else:
+                best = min(
+                    ca[i - 1, j] if i else np.inf,
+                    ca[i - 1, j - 1] if i and j else np.inf,
+                    ca[i, j - 1] if j else np.inf,
+                )
+                ca[i, j] = max(d, best)
+    return ca[n - 1, m - 1]
+
+
+def random_route(n, rng, origin=(12.96, 77.64)):
+    steps = rng.normal(scale=1e-4, size=(n, 2))
+    return (np.asarray(origin) + np.cumsum(steps, axis=0)).tolist()
+
+
+def timed(fn, *args, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        value = fn(*args)
+        best = min(best, time.perf_counter() - t)
+    return value, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="200,1000,5000")
+    parser.add_argument("--road-points", type=int, default=300)
+    parser.add_argument("--reference-limit", type=int, default=1000,
+                        help="skip the slow reference above this route size")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+
+    # Correctness first, on sizes the reference can handle.
+    for n, m in [(1, 1), (7, 3), (40, 55)]:
+        a, b = random_route(n, rng), random_route(m, rng)
+        assert np.isclose(hausdorff(a, b), reference_hausdorff(a, b))
+        assert np.isclose(frechet(a, b), reference_frechet(a, b))
+
+    print(f"{'route':>7} {'road':>6} {'reference':>12} {'hausdorff':>12} {'speedup':>9} {'frechet':>12}")
+    for n in (int(s) for s in args.sizes.split(",")):
+        route = random_route(n, rng)
+        road = random_route(args.road_points, rng)
+
+        fast, t_fast = timed(hausdorff, route, road)
+        _, t_frechet = timed(frechet, route, road)
+
+        if n <= args.reference_limit:
+            ref, t_ref = timed(reference_hausdorff, route, road, repeat=1)
+            assert np.isclose(fast, ref)
+            ref_col = f"{t_ref * 1e3:10.1f}ms"
+            speedup = f"{t_ref / t_fast:8.0f}x"
+        else:
+            ref_col, speedup = f"{'skipped':>12}", f"{'-':>9}"
+
+        print(f"{n:>7} {args.road_points:>6} {ref_col} {t_fast * 1e3:10.2f}ms {speedup} {t_frechet * 1e3:10.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
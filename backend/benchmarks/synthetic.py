@@ -0,0 +1,197 @@
+"""
+Deterministic synthetic route maps for benchmarks.
+
+A route is a smooth curve (optionally closed, optionally with small
+self-crossing loops) drawn in the colour the extractor segments, over a
+light background with grey streets, noise and distractor labels. The same
+spec always produces the same pixels, so timings compare across versions.
+
+Write a sample set to disk from backend/:
+    python -m benchmarks.synthetic /tmp/synthetic
+"""
+import argparse
+import json
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import List, Tuple
+
+import cv2
+import numpy as np
+
+# BGR colours the extractor picks up (see RouteCVExtractor._color_masks)
+ROUTE_COLORS = {
+    "red": (30, 30, 220),
+    "blue": (200, 80, 20),
+}
+
+BACKGROUND = (236, 233, 228)
+STREET = (190, 190, 190)
+
+# Metres per pixel of the bbox synthetic_bbox() returns
+GROUND_RESOLUTION_M = 2.0
+ORIGIN = (12.95, 77.60)
+
+_WORDS = ("START", "FINISH", "PARK", "Main St", "LAKE", "1 km", "Aid", "CP2", "Legend")
+
+
+@dataclass(frozen=True)
+class SyntheticSpec:
+    width: int = 1200
+    height: int = 900
+    line_width: int = 6
+    color: str = "red"          # key of ROUTE_COLORS
+    closed: bool = True         # loop course vs point-to-point
+    loops: int = 0              # extra self-crossing loops along the route
+    noise: float = 0.0          # gaussian pixel noise sigma (0-255 scale)
+    speckle: float = 0.0        # fraction of pixels set to the route colour
+    text: int = 0               # distractor labels, some in the route colour
+    streets: int = 12           # grey background streets
+    seed: int = 0
+
+    @property
+    def name(self) -> str:
+        shape = "loop" if self.closed else "open"
+        return (
+            f"{self.width}x{self.height}-w{self.line_width}-{self.color}-{shape}"
+            f"-l{self.loops}-n{self.noise:g}-s{self.speckle:g}-t{self.text}"
+        )
+
+
+def route_curve(spec: SyntheticSpec, samples: int = 4000) -> np.ndarray:
+    """
+    (N, 2) float pixel coordinates of the route centreline: an ellipse
+    (or 85% of one) with `loops` epicycles large enough to cross itself.
+    """
+    w, h = spec.width, spec.height
+    t = np.linspace(0.0, 2 * np.pi if spec.closed else 1.7 * np.pi, samples)
+    k = spec.loops
+    # Epicycles of radius r with r * k > the ellipse radius trace a small
+    # closed loop each; shrink the ellipse so everything stays in frame
+    fit = 1.0 / (1.0 + 2.0 / k) if k else 1.0
+    rx, ry = 0.38 * w * fit, 0.38 * h * fit
+    x = w / 2 + rx * np.cos(t)
+    y = h / 2 + ry * np.sin(t)
+    if k:
+        r = 2.0 * min(rx, ry) / k
+        x += r * np.cos(k * t)
+        y += r * np.sin(k * t)
+    return np.stack([x, y], axis=1)
+
+
+def make_route_image(spec: SyntheticSpec) -> Tuple[np.ndarray, np.ndarray]:
+    """BGR image and the (N, 2) pixel centreline it was drawn from."""
+    rng = np.random.default_rng(spec.seed)
+    w, h = spec.width, spec.height
+    img = np.empty((h, w, 3), np.uint8)
+    img[:] = BACKGROUND
+
+    # Streets: long grey lines the colour masks must ignore
+    for _ in range(spec.streets):
+        p = rng.uniform((0, 0), (w, h), size=(2, 2)).astype(np.int32)
+        cv2.line(img, tuple(p[0].tolist()), tuple(p[1].tolist()), STREET,
+                 int(rng.integers(3, 9)), cv2.LINE_AA)
+
+    curve = route_curve(spec)
+    color = ROUTE_COLORS[spec.color]
+    cv2.polylines(img, [np.round(curve).astype(np.int32).reshape(-1, 1, 2)],
+                  spec.closed, color, spec.line_width, cv2.LINE_AA)
+
+    # Labels, every other one in the route colour so they reach the mask
+    other = ROUTE_COLORS["blue" if spec.color == "red" else "red"]
+    scale = max(w, h) / 1200
+    for i in range(spec.text):
+        word = _WORDS[int(rng.integers(len(_WORDS)))]
+        org = (int(rng.integers(0, int(w * 0.85))), int(rng.integers(int(30 * scale), h)))
+        cv2.putText(img, word, org, cv2.FONT_HERSHEY_SIMPLEX, 1.1 * scale,
+                    color if i % 2 == 0 else other, max(1, int(2 * scale)), cv2.LINE_AA)
+
+    if spec.speckle > 0:
+        count = int(spec.speckle * w * h)
+        img[rng.integers(0, h, count), rng.integers(0, w, count)] = color
+
+    if spec.noise > 0:
+        noisy = img.astype(np.int16) + rng.normal(0, spec.noise, img.shape).astype(np.int16)
+        img = np.clip(noisy, 0, 255).astype(np.uint8)
+
+    return img, curve
+
+
+def encode_png(img: np.ndarray) -> bytes:
+    ok, buf = cv2.imencode(".png", img)
+    if not ok:
+        raise ValueError("PNG encoding failed")
+    return buf.tobytes()
+
+
+def synthetic_bbox(spec: SyntheticSpec) -> dict:
+    """bbox placing the image at GROUND_RESOLUTION_M metres per pixel."""
+    lat0, lon0 = ORIGIN
+    dlat = spec.height * GROUND_RESOLUTION_M / 111_320
+    dlon = spec.width * GROUND_RESOLUTION_M / (111_320 * np.cos(np.radians(lat0)))
+    return {"min_lat": lat0, "min_lon": lon0, "max_lat": lat0 + dlat, "max_lon": lon0 + dlon}
+
+
+def synthetic_roads(route_latlon: np.ndarray, bbox: dict, spacing_m: float = 150.0) -> List[dict]:
+    """
+    Overpass-style ways: the route itself split into ~50-node ways plus a
+    street grid over the bbox, so map matching has real choices to make.
+    """
+    ways = []
+    step = max(1, len(route_latlon) // 40)
+    route = route_latlon[::step]
+    for i in range(0, len(route) - 1, 50):
+        part = route[i:i + 51]
+        ways.append({"type": "way", "id": len(ways) + 1, "tags": {"highway": "footway"},
+                     "geometry": [{"lat": lat, "lon": lon} for lat, lon in part.tolist()]})
+
+    dlat = spacing_m / 111_320
+    dlon = spacing_m / (111_320 * np.cos(np.radians(bbox["min_lat"])))
+    for lat in np.arange(bbox["min_lat"], bbox["max_lat"], dlat).tolist():
+        lons = np.linspace(bbox["min_lon"], bbox["max_lon"], 20).tolist()
+        ways.append({"type": "way", "id": len(ways) + 1, "tags": {"highway": "residential"},
+                     "geometry": [{"lat": lat, "lon": lon} for lon in lons]})
+    for lon in np.arange(bbox["min_lon"], bbox["max_lon"], dlon).tolist():
+        lats = np.linspace(bbox["min_lat"], bbox["max_lat"], 20).tolist()
+        ways.append({"type": "way", "id": len(ways) + 1, "tags": {"highway": "residential"},
+                     "geometry": [{"lat": lat, "lon": lon} for lat in lats]})
+    return ways
+
+
+# Cases the benchmark suite runs by default: each varies one axis from the
+# 1200x900 baseline, plus a large image for the coarse-to-fine path.
+DEFAULT_SPECS: List[SyntheticSpec] = [
+    SyntheticSpec(),
+    SyntheticSpec(closed=False),
+    SyntheticSpec(color="blue"),
+    SyntheticSpec(line_width=2),
+    SyntheticSpec(line_width=14),
+    SyntheticSpec(loops=3),
+    SyntheticSpec(loops=8),
+    SyntheticSpec(noise=12.0),
+    SyntheticSpec(speckle=0.002),
+    SyntheticSpec(text=12),
+    SyntheticSpec(width=2400, height=1800, line_width=10),
+    SyntheticSpec(width=4000, height=3000, line_width=14, text=8),
+]
+
+QUICK_SPECS: List[SyntheticSpec] = DEFAULT_SPECS[:1] + [SyntheticSpec(loops=3, text=6, noise=8.0)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("out", help="directory to write PNGs and specs.json to")
+    args = parser.parse_args()
+
+    out = Path(args.out)
+    out.mkdir(parents=True, exist_ok=True)
+    specs = {}
+    for spec in DEFAULT_SPECS:
+        img, _ = make_route_image(spec)
+        cv2.imwrite(str(out / f"{spec.name}.png"), img)
+        specs[spec.name] = asdict(spec)
+    (out / "specs.json").write_text(json.dumps(specs, indent=2))
+    print(f"wrote {len(specs)} images to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import numpy as np
+import pytest
+
+from app.core.polyline_codec import decode_polyline, encode_many, encode_polyline
+from benchmarks.bench_polyline_codec import random_route, reference_encode
+
+# Known vector from Google's polyline documentation
+GOOGLE_POINTS = [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+GOOGLE_ENCODED = "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+
+
+def _assert_round_trip(points, precision):
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    encoded = encode_polyline(points, precision)
+    assert encoded == reference_encode(points.tolist(), precision)
+
+    decoded = decode_polyline(encoded, precision)
+    quantized = np.rint(points * 10.0 ** precision) / 10.0 ** precision
+    assert decoded.shape == points.shape
+    np.testing.assert_allclose(decoded, quantized, rtol=0, atol=1e-9)
+    # Decoding is the exact inverse on quantized input
+    assert encode_polyline(decoded, precision) == encoded
+
+
+def test_google_vector():
+    assert encode_polyline(GOOGLE_POINTS) == GOOGLE_ENCODED
+    np.testing.assert_allclose(decode_polyline(GOOGLE_ENCODED), GOOGLE_POINTS)
+
+
+def test_empty():
+    assert encode_polyline([]) == ""
+    assert encode_polyline(np.empty((0, 2))) == ""
+    assert decode_polyline("").shape == (0, 2)
+    assert encode_many([], (5, 6)) == {5: [], 6: []}
+    assert encode_many([[], np.empty((0, 2))]) == {5: ["", ""]}
+
+
+@pytest.mark.parametrize("precision", [5, 6])
+@pytest.mark.parametrize("point", [(0.0, 0.0), (38.5, -120.2), (-33.8688, 151.2093), (-90.0, -180.0), (90.0, 180.0)])
+def test_single_point(point, precision):
+    _assert_round_trip([point], precision)
+
+
+def test_single_point_encoding():
+    assert encode_polyline([(0.0, 0.0)]) == "??"
+    assert encode_polyline([(38.5, -120.2)]) == GOOGLE_ENCODED[:10]
+
+
+@pytest.mark.parametrize("precision", [5, 6])
+@pytest.mark.parametrize("points", [
+    # Southern and western hemispheres
+    [(-33.8688, 151.2093), (-33.87, 151.21), (-34.0, 151.0)],
+    [(-22.9068, -43.1729), (-22.91, -43.17), (-22.9, -43.2)],
+    # Across the antimeridian both ways: the longitude delta jumps by ~360
+    [(-17.7, 179.99999), (-17.7, -179.99999), (-17.71, 179.9)],
+    [(65.0, -179.5), (65.1, 179.5), (65.2, -179.0)],
+    # Poles and corners of the coordinate range
+    [(-90.0, -180.0), (90.0, 180.0), (-90.0, 180.0), (90.0, -180.0)],
+])
+def test_negative_and_antimeridian(points, precision):
+    _assert_round_trip(points, precision)
+
+
+@pytest.mark.parametrize("precision", [5, 6, 7])
+def test_rounding_at_half_units(precision):
+    # Coordinates exactly halfway between two representable values, and
+    # just either side of them
+    unit = 10.0 ** -precision
+    base = np.array([[12.34, 56.78], [-12.34, -56.78]])
+    points = np.concatenate([base + unit * k for k in (0.5, 1.5, 2.5, -0.5, -1.5, 0.4999, 0.5001)])
+    _assert_round_trip(points, precision)
+
+
+@pytest.mark.parametrize("precision", [5, 6])
+def test_chunk_boundaries(precision):
+    # Deltas whose zigzag value sits on either side of each 5-bit chunk
+    # boundary (0x20, 0x400, ...), up to a full 180 degree step
+    unit = 10.0 ** -precision
+    steps = []
+    for bits in range(5, 35, 5):
+        for zigzag in ((1 << bits) - 1, 1 << bits):
+            delta = zigzag >> 1 if zigzag % 2 == 0 else -(zigzag + 1 >> 1)
+            steps.append(delta * unit)
+    steps = np.array([s for s in steps if abs(s) <= 180.0])
+    points = np.column_stack([np.zeros(len(steps)), steps])
+    points = np.repeat(points, 2, axis=0)
+    points[::2] = 0.0
+    _assert_round_trip(points, precision)
+
+
+@pytest.mark.parametrize("precision", [5, 6])
+def test_matches_reference_on_random_routes(precision):
+    rng = np.random.default_rng(precision)
+    for _ in range(200):
+        n = int(rng.integers(1, 400))
+        # Mix of tiny steps, long jumps and exact repeats
+        route = random_route(n, rng, scale=float(rng.choice([1e-6, 1e-4, 1.0])))
+        route[rng.random(n) < 0.1] = route[0]
+        _assert_round_trip(route, precision)
+
+
+def test_encode_many_matches_encode_polyline():
+    rng = np.random.default_rng(11)
+    batch = [random_route(int(rng.integers(0, 50)), rng) for _ in range(40)]
+    batch[3] = np.empty((0, 2))
+    many = encode_many(batch, (5, 6))
+    for precision in (5, 6):
+        assert many[precision] == [encode_polyline(r, precision) for r in batch]
+
+
+@pytest.mark.parametrize("points", [[(np.nan, 1.0)], [(1.0, np.inf), (0.0, 0.0)]])
+def test_rejects_non_finite(points):
+    with pytest.raises(ValueError):
+        encode_polyline(points)
+    with pytest.raises(ValueError):
+        encode_many([points])
+
+
+@pytest.mark.parametrize("bad", ["_p~iF~ps|U_", "_p~iF~ps|U_ulLnnqC_mqNvxq", "abc\x10", "_p~iF", "é"])
+def test_decode_rejects_malformed(bad):
+    with pytest.raises(ValueError):
+        decode_polyline(bad)
@@ -0,0 +1,58 @@
+import threading
+
+import numpy as np
+
+from app.core.refine import apply_anchors
+from app.core.route_extractor import EXTRACTOR_CONFIG, run_route_pipeline
+from app.matching.georeference import make_georeferencer
+from benchmarks.synthetic import SyntheticSpec, encode_png, make_route_image, synthetic_bbox
+
+
+def _completed_route(spec: SyntheticSpec):
+    img, truth = make_route_image(spec)
+    b = synthetic_bbox(spec)
+    bbox = {"north": b["max_lat"], "south": b["min_lat"], "east": b["max_lon"], "west": b["min_lon"]}
+    result = run_route_pipeline(
+        encode_png(img), bbox, config=EXTRACTOR_CONFIG,
+        progress=lambda stage, fraction: None, keep_intermediates=True,
+    )
+    route = {
+        "geometry": result["geometry"],
+        "stats": result["stats"],
+        "intermediates": result["intermediates"],
+        "refine_context": None,
+    }
+    georef = make_georeferencer(bbox, (spec.width, spec.height), None)
+    return route, truth, georef
+
+
+def test_concurrent_first_edits_share_one_context():
+    route, truth, georef = _completed_route(SyntheticSpec())
+    # Two detours on opposite sides of the loop
+    anchors = [truth[1000] + (0, 30), truth[3000] + (0, -30)]
+    # Converted up front: a Georeferencer is not thread-safe
+    anchors_latlon = [georef.pixels_to_geo(anchor[None, :]).tolist() for anchor in anchors]
+    start = threading.Barrier(len(anchors))
+    errors = []
+
+    def edit(latlon):
+        start.wait()
+        try:
+            apply_anchors(route, latlon)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=edit, args=(latlon,)) for latlon in anchors_latlon]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert not errors
+    ctx = route["refine_context"]
+    assert route["geometry"] is ctx.geometry
+    assert route["stats"]["refine"] == {**route["stats"]["refine"], "anchors": 2, "edits": 2}
+    # Neither edit was lost: the final polyline passes through both anchors
+    pixels = route["geometry"].pixels.astype(np.float64)
+    for anchor in anchors:
+        assert np.hypot(*(pixels - anchor).T).min() <= 1.5
@@ -0,0 +1,82 @@
+import time
+
+import numpy as np
+import pytest
+
+from app.core.route_extractor import EXTRACTOR_CONFIG
+from app.cv.extractor import RouteCVExtractor
+from app.cv.skeleton_graph import build_skeleton_graph, order_skeleton_graph
+from app.matching.marker_projection import PolylineIndex
+from benchmarks.synthetic import SyntheticSpec, encode_png, make_route_image
+
+# Routes that cross themselves: thinning turns each crossing into a pair
+# of 3-way junctions, so the skeleton has no Euler trail
+LOOP_SPECS = [
+    SyntheticSpec(loops=3),
+    SyntheticSpec(loops=8),
+    SyntheticSpec(closed=False, loops=3),
+    SyntheticSpec(width=2400, height=1800, line_width=10, loops=2),
+]
+
+
+def _primary_polyline(spec: SyntheticSpec, ordering: str) -> tuple[np.ndarray, np.ndarray]:
+    img, truth = make_route_image(spec)
+    config = {**EXTRACTOR_CONFIG, "component_workers": 1, "ordering": ordering}
+    result = RouteCVExtractor(config=config).extract(encode_png(img))
+    primary = next(c for c in result.components if c.id == result.primary_candidate_id)
+    return primary.pixel_polyline, truth
+
+
+@pytest.mark.parametrize("spec", LOOP_SPECS, ids=lambda spec: spec.name)
+def test_crossing_routes_are_fully_covered(spec):
+    pixels, truth = _primary_polyline(spec, "skeleton_graph")
+
+    # truth -> extracted: every part of the drawn route is on the polyline
+    coverage = PolylineIndex(pixels).project(truth).distance
+    assert coverage.max() <= spec.line_width
+    # extracted -> truth: and nothing else is
+    error = PolylineIndex(truth).project(pixels).distance
+    assert error.max() <= spec.line_width
+
+
+def test_crossing_route_matches_greedy_ordering():
+    spec = SyntheticSpec(loops=3)
+    pixels, _ = _primary_polyline(spec, "skeleton_graph")
+    greedy, _ = _primary_polyline(spec, "greedy")
+
+    # Retraced crossings add a few pixels, never drop any
+    assert len(pixels) >= len(greedy)
+    assert {tuple(p) for p in greedy.tolist()} <= {tuple(p) for p in pixels.tolist()}
+
+
+def _brick_wall(rows: int, cols: int, height: int = 12, width: int = 24) -> np.ndarray:
+    """1px centerline of a brick pattern: every junction is a 3-way T."""
+    img = np.zeros((rows * height + 1, cols * width + 1), np.uint8)
+    img[::height, :] = 255
+    for r in range(rows):
+        offset = 0 if r % 2 == 0 else width // 2
+        img[r * height:(r + 1) * height + 1, offset::width] = 255
+    return img
+
+
+def _ordering_seconds(graph) -> float:
+    best = float("inf")
+    for _ in range(2):
+        t = time.perf_counter()
+        order_skeleton_graph(graph)
+        best = min(best, time.perf_counter() - t)
+    return best
+
+
+def test_ordering_time_is_linear_in_junctions():
+    small = build_skeleton_graph(_brick_wall(20, 20))
+    large = build_skeleton_graph(_brick_wall(40, 40))
+    assert len(large.junctions()) >= 4 * len(small.junctions())
+
+    # Every pixel is still on the walk
+    ordered = order_skeleton_graph(large)
+    assert len({tuple(p) for p in ordered.tolist()}) == large.size
+
+    # 4x the junctions: ~4x the time, where pairing every odd node with
+    # every other took ~18x
+    assert _ordering_seconds(large) < 8 * _ordering_seconds(small)
@@ -0,0 +1,54 @@
+import asyncio
+import os
+
+import pytest
+
+from app.core import jobs, workers
+from app.core.storage import JOBS, ROUTES, create_job, create_route
+
+BBOX = {"north": 0.01, "south": 0.0, "east": 0.01, "west": 0.0}
+
+
+def _crash(*args, **kwargs):
+    # What an OOM kill or a segfault in cv2 looks like to the pool
+    os._exit(1)
+
+
+@pytest.fixture
+def pool():
+    yield
+    workers.shutdown_executor()
+
+
+def _run_job(route_id: str) -> str:
+    job_id = create_job(route_id)
+    asyncio.run(jobs._run_route_job(route_id, job_id, BBOX, False, None, None))
+    return job_id
+
+
+def test_dead_worker_fails_only_its_job(pool, monkeypatch, tmp_path):
+    monkeypatch.setattr(jobs, "run_route_pipeline", _crash)
+    image = tmp_path / "route.png"
+    image.write_bytes(b"not decoded: the pipeline is replaced")
+    route_id = create_route()
+    ROUTES[route_id].update({"image_path": str(image), "image_hash": "crash-test"})
+
+    broken = workers.get_executor()
+    job_id = _run_job(route_id)
+
+    assert JOBS[job_id]["status"] == "failed"
+    assert ROUTES[route_id]["status"] == "failed"
+
+    # The next job gets a fresh pool instead of the broken one
+    fresh = workers.get_executor()
+    assert fresh is not broken
+    assert fresh.submit(pow, 2, 10).result(timeout=60) == 1024
+
+
+def test_discard_is_idempotent(pool):
+    executor = workers.get_executor()
+    workers.discard_executor(executor)
+    replacement = workers.get_executor()
+    # A second job failing on the old pool must not drop the new one
+    workers.discard_executor(executor)
+    assert workers.get_executor() is replacement
@@ -27,6 +27,55 @@ export async function processRoute(routeId: string, bbox: any) {
   return res.data;
 }
 
+export async function fetchStatus(routeId: string) {
+  const res = await axios.get(`${API_BASE}/routes/${routeId}/status`);
+  return res.data; // { route_id, status, progress, message }
+}
+
+export async function waitForRoute(routeId: string, intervalMs = 1000) {
+  // /process returns immediately; the pipeline runs in the background and
+  // pushes progress over Server-Sent Events. Fall back to polling /status
+  // when EventSource is unavailable or the stream drops.
+  if (typeof EventSource === "undefined") {
+    return pollRoute(routeId, intervalMs);
+  }
+  return new Promise((resolve, reject) => {
+    const source = new EventSource(`${API_BASE}/routes/${routeId}/events`);
+    let done = false;
+    const finish = (fn: () => void) => {
+      done = true;
+      source.close();
+      fn();
+    };
+    source.addEventListener("progress", (e) => {
+      console.log("api.waitForRoute: progress", JSON.parse((e as MessageEvent).data));
+    });
+    source.addEventListener("completed", () => {
+      finish(() => resolve(fetchStatus(routeId)));
+    });
+    source.addEventListener("failed", (e) => {
+      const job = JSON.parse((e as MessageEvent).data);
+      finish(() => reject(new Error(job.error || "Route processing failed")));
+    });
+    source.onerror = () => {
+      if (done) return;
+      finish(() => pollRoute(routeId, intervalMs).then(resolve, reject));
+    };
+  });
+}
+
+async function pollRoute(routeId: string, intervalMs: number) {
+  for (;;) {
+    const status = await fetchStatus(routeId);
+    console.log("api.waitForRoute: status", status);
+    if (status.status === "completed") return status;
+    if (status.status === "failed") {
+      throw new Error(status.message || "Route processing failed");
+    }
+    await new Promise((resolve) => setTimeout(resolve, intervalMs));
+  }
+}
+
 export async function fetchPreview(routeId: string) {
   console.log("api.fetchPreview: fetching preview for", routeId);
   const res = await axios.get(`${API_BASE}/routes/${routeId}/preview`);
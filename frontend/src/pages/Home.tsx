@@ -3,7 +3,7 @@ import { MapContainer, TileLayer } from "react-leaflet";
 import RouteUploader from "../components/RouteUploader";
 import MapBoxSelector from "../components/MapBoxSelector";
 import RoutePreview from "../components/RoutePreview";
-import { processRoute, fetchPreview } from "../api/routes";
+import { processRoute, waitForRoute, fetchPreview } from "../api/routes";
 
 export default function Home() {
   const [routeId, setRouteId] = useState<string | null>(null);
@@ -47,6 +47,7 @@ export default function Home() {
 
     try {
       await processRoute(routeId, bbox);
+      await waitForRoute(routeId);
       const preview = await fetchPreview(routeId);
       setPolyline(preview.polyline.geo); // Array of {lat,lng}
     } catch (err) {